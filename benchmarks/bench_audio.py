@@ -0,0 +1,67 @@
+"""
+Benchmark AudioGenerator throughput with the offline stub TTS backend.
+
+Voices a synthetic word list three times: with a single worker, with
+`--workers` workers, and again with the same workers on a warm audio cache.
+`--latency-ms` is how long the stub takes per clip, to approximate a network
+or local engine.
+
+Usage:
+    python benchmarks/bench_audio.py --texts 500 --workers 8 --latency-ms 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from manki.tts.audio import AudioGenerator
+from manki.tts.backends import StubBackend
+from manki.tts.cache import AudioCache
+
+
+def run_phase(name, generator, texts):
+    start = time.perf_counter()
+    filenames = generator.generate_audio_files(texts)
+    elapsed = time.perf_counter() - start
+    return name, elapsed, sum(filename is not None for filename in filenames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    texts = [f"mot numéro {i}" for i in range(args.texts)]
+    backend = StubBackend(latency=args.latency_ms / 1000)
+    work_dir = tempfile.mkdtemp()
+    cache = AudioCache(os.path.join(work_dir, "cache"))
+
+    def generator(folder, max_workers, cache=None):
+        media_folder = os.path.join(work_dir, folder)
+        os.makedirs(media_folder)
+        return AudioGenerator(
+            lang="fr",
+            anki_media_folder=media_folder,
+            max_workers=max_workers,
+            cache=cache,
+            backend=backend,
+        )
+
+    results = [
+        run_phase("1 worker", generator("serial", 1), texts),
+        run_phase(
+            f"{args.workers} workers", generator("cold", args.workers, cache), texts
+        ),
+        run_phase("warm cache", generator("warm", args.workers, cache), texts),
+    ]
+
+    print(f"{'phase':<14}{'seconds':>10}{'clips/s':>12}{'clips':>8}")
+    for name, elapsed, clips in results:
+        print(f"{name:<14}{elapsed:>10.2f}{clips / elapsed:>12.0f}{clips:>8}")
+
+
+if __name__ == "__main__":
+    main()
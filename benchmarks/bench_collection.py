@@ -0,0 +1,94 @@
+"""
+Benchmark reading a deck straight from a collection file versus through
+AnkiConnect.
+
+Builds a synthetic vocabulary deck, serves it from the in-process fake
+AnkiConnect server and saves it as a `collection.anki2` file, then times
+exporting the deck to a txt file and indexing it for the `deck` match
+strategy through both backends. `--latency-ms` and `--jitter-ms` delay every
+HTTP request to approximate a slow (e.g. WSL) link.
+
+Usage:
+    python benchmarks/bench_collection.py --notes 100000 --latency-ms 1
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("API_VERSION", "6")
+
+from manki.anki.collection import AnkiCollectionReader  # noqa: E402
+from manki.anki.connection import AnkiConnection  # noqa: E402
+from manki.anki.fake import FakeAnkiCollection, FakeAnkiConnectServer  # noqa: E402
+from manki.anki.xport import AnkiImporterExporter  # noqa: E402
+
+DECK_NAME = "Vocabulary"
+
+
+def create_collection(n_notes):
+    # Notes are stored directly: adding them one by one checks duplicates against the whole deck.
+    collection = FakeAnkiCollection()
+    collection.createDeck(DECK_NAME)
+    for i in range(n_notes):
+        note_id = 1_600_000_000_000 + i
+        collection.notes[note_id] = {
+            "noteId": note_id,
+            "deckName": DECK_NAME,
+            "modelName": "basic",
+            "fields": {"front": f"word{i} (noun)", "back": f"mot{i}"},
+            "tags": ["en", "fr"],
+            "mod": 1_700_000_000,
+        }
+    return collection
+
+
+def run_phases(name, connection, output_file):
+    importer_exporter = AnkiImporterExporter(connection)
+    phases = [
+        ("export", lambda: importer_exporter.export_to_txt(DECK_NAME, output_file)),
+        (
+            "index",
+            lambda: importer_exporter._build_deck_index(DECK_NAME, ["front"], 500),
+        ),
+    ]
+    results = []
+    for phase, run in phases:
+        with connection.record() as recording:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        results.append((name, phase, elapsed, recording.http_calls))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    collection = create_collection(args.notes)
+    work_dir = tempfile.mkdtemp()
+    collection_path = os.path.join(work_dir, "collection.anki2")
+    collection.save(collection_path)
+
+    server = FakeAnkiConnectServer(
+        collection, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=0
+    )
+    with server, AnkiConnection(url=server.url) as connection:
+        results = run_phases("http", connection, os.path.join(work_dir, "http.txt"))
+    with AnkiCollectionReader(collection_path) as reader:
+        results += run_phases("sqlite", reader, os.path.join(work_dir, "sqlite.txt"))
+
+    print(f"{'backend':<10}{'phase':<10}{'seconds':>10}{'notes/s':>12}{'calls':>8}")
+    for backend, phase, elapsed, calls in results:
+        print(
+            f"{backend:<10}{phase:<10}{elapsed:>10.2f}{args.notes / elapsed:>12.0f}{calls:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
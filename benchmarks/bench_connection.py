@@ -0,0 +1,91 @@
+"""
+Benchmark the round-trip latency per AnkiConnect action, comparing the old
+per-call `requests.post` transport with the pooled keep-alive session.
+
+Loopback handshakes are nearly free, so `--handshake-ms` adds a delay to every
+newly accepted connection to approximate the cost of crossing the WSL VM
+boundary.
+
+Usage:
+    python benchmarks/bench_connection.py --requests 500 --handshake-ms 2
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import requests
+
+os.environ.setdefault("API_VERSION", "6")
+
+from manki.anki.connection import AnkiConnection  # noqa: E402
+from manki.anki.fake import FakeAnkiConnectServer  # noqa: E402
+
+
+def build_actions(note_id):
+    return {
+        "findNotes": {"query": 'deck:"Vocabulary" front:"chat (noun)"'},
+        "notesInfo": {"notes": [note_id]},
+        "updateNoteFields": {"note": {"id": note_id, "fields": {"back": "cat"}}},
+    }
+
+
+class _UnpooledAnkiConnection(AnkiConnection):
+    """The transport as it was before: a fresh TCP connection per action."""
+
+    def invoke(self, action, **params):
+        request_json = json.dumps(self.request(action, **params)).encode("utf-8")
+        return requests.post(self.url, request_json, timeout=60).json()["result"]
+
+
+def time_actions(connection, actions, n_requests):
+    latencies = {}
+    for action, params in actions.items():
+        samples = []
+        for _ in range(n_requests):
+            start = time.perf_counter()
+            connection(action, **params)
+            samples.append((time.perf_counter() - start) * 1000)
+        latencies[action] = samples
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with FakeAnkiConnectServer(connect_latency=args.handshake_ms / 1000) as server:
+        server.collection.createDeck("Vocabulary")
+        note_id = server.collection.addNote(
+            {
+                "deckName": "Vocabulary",
+                "modelName": "basic",
+                "fields": {"front": "chat (noun)", "back": "cat"},
+            }
+        )
+        actions = build_actions(note_id)
+
+        results = {
+            "requests.post": time_actions(
+                _UnpooledAnkiConnection(url=server.url), actions, args.requests
+            )
+        }
+        with AnkiConnection(url=server.url) as connection:
+            results["pooled session"] = time_actions(connection, actions, args.requests)
+
+    print(f"{'transport':<16}{'action':<20}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for transport, latencies in results.items():
+        for action, samples in latencies.items():
+            p95 = statistics.quantiles(samples, n=20)[-1]
+            print(
+                f"{transport:<16}{action:<20}{statistics.mean(samples):>10.3f}"
+                f"{statistics.median(samples):>10.3f}{p95:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark building and serializing AnkiNotes in bulk, comparing the validated
+pydantic path with the trusted construction and direct JSON encoding paths.
+
+Construction compares `AnkiNote(...)` per note with `AnkiNote.from_trusted`.
+Serialization compares `json.dumps` over `to_anki_dict()` per chunk with
+`manki.anki.encoding`, producing the `addNotes` request bodies the importer
+posts.
+
+Usage:
+    python benchmarks/bench_notes.py --notes 1000000 --chunk-size 250
+"""
+
+import argparse
+import json
+import time
+
+from manki.anki.domain import AnkiNote
+from manki.anki.encoding import encode_array, encode_notes, encode_request
+
+REQUEST = {"action": "addNotes", "params": {}, "version": 6, "key": None}
+
+
+def create_records(n_notes):
+    return [
+        {
+            "deckName": "Vocabulary",
+            "modelName": "basic",
+            "front": f"word{i} (noun)",
+            "back": f"mot{i}",
+            "tags": ["en", "fr"],
+            "key": f"{i:020x}",
+        }
+        for i in range(n_notes)
+    ]
+
+
+def validated(records):
+    return [AnkiNote(**record) for record in records]
+
+
+def trusted(records):
+    return AnkiNote.from_trusted(records)
+
+
+def chunks(anki_notes, chunk_size):
+    return [
+        anki_notes[start : start + chunk_size]
+        for start in range(0, len(anki_notes), chunk_size)
+    ]
+
+
+def dict_serialization(anki_notes, chunk_size):
+    return [
+        json.dumps(
+            {**REQUEST, "params": {"notes": [note.to_anki_dict() for note in chunk]}}
+        ).encode("utf-8")
+        for chunk in chunks(anki_notes, chunk_size)
+    ]
+
+
+def direct_serialization(anki_notes, chunk_size):
+    encoded_notes = encode_notes(anki_notes)
+    return [
+        encode_request(REQUEST, notes=encode_array(chunk))
+        for chunk in chunks(encoded_notes, chunk_size)
+    ]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    args = parser.parse_args()
+
+    records = create_records(args.notes)
+    anki_notes, validated_seconds = timed(validated, records)
+    _, trusted_seconds = timed(trusted, records)
+    dict_bodies, dict_seconds = timed(dict_serialization, anki_notes, args.chunk_size)
+    direct_bodies, direct_seconds = timed(
+        direct_serialization, anki_notes, args.chunk_size
+    )
+    assert json.loads(dict_bodies[0]) == json.loads(direct_bodies[0])
+
+    print(f"{'step':<28}{'seconds':>10}{'notes/s':>14}")
+    for name, elapsed in [
+        ("construct (validated)", validated_seconds),
+        ("construct (trusted)", trusted_seconds),
+        ("serialize (to_anki_dict)", dict_seconds),
+        ("serialize (encoding)", direct_seconds),
+    ]:
+        print(f"{name:<28}{elapsed:>10.2f}{args.notes / elapsed:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
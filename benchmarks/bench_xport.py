@@ -0,0 +1,106 @@
+"""
+Benchmark end-to-end AnkiImporterExporter throughput against the in-process
+fake AnkiConnect server.
+
+Runs three phases on a synthetic vocabulary deck: importing into an empty
+deck, re-syncing with a changed `back` field on every note, and exporting the
+deck to a txt file. `--latency-ms` and `--jitter-ms` delay every request to
+approximate a slow (e.g. WSL) link.
+
+Usage:
+    python benchmarks/bench_xport.py --notes 1000 --latency-ms 1 --match-strategy deck
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("API_VERSION", "6")
+
+from manki.anki.connection import AnkiConnection  # noqa: E402
+from manki.anki.domain import AnkiNote, MatchStrategy  # noqa: E402
+from manki.anki.fake import FakeAnkiConnectServer  # noqa: E402
+from manki.anki.xport import AnkiImporterExporter  # noqa: E402
+
+DECK_NAME = "Vocabulary"
+
+
+def create_anki_notes(n_notes, suffix=""):
+    return [
+        AnkiNote(
+            deckName=DECK_NAME,
+            modelName="basic",
+            front=f"word{i} (noun)",
+            back=f"mot{i}{suffix}",
+            tags=["en", "fr"],
+        )
+        for i in range(n_notes)
+    ]
+
+
+def run_phase(name, connection, phase):
+    with connection.record() as recording:
+        start = time.perf_counter()
+        phase()
+        elapsed = time.perf_counter() - start
+    return name, elapsed, recording.http_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.5)
+    parser.add_argument(
+        "--match-strategy",
+        choices=[strategy.value for strategy in MatchStrategy],
+        default=MatchStrategy.DECK.value,
+    )
+    args = parser.parse_args()
+
+    server = FakeAnkiConnectServer(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=0
+    )
+    with server, AnkiConnection(url=server.url) as connection:
+        importer_exporter = AnkiImporterExporter(connection)
+        output_file = os.path.join(tempfile.mkdtemp(), f"{DECK_NAME}.txt")
+
+        phases = [
+            (
+                "import",
+                lambda: importer_exporter.import_and_update_notes(
+                    input_file="",
+                    anki_notes=create_anki_notes(args.notes),
+                    deck_name=DECK_NAME,
+                    reference_fields=["front"],
+                    match_strategy=args.match_strategy,
+                ),
+            ),
+            (
+                "update",
+                lambda: importer_exporter.import_and_update_notes(
+                    input_file="",
+                    anki_notes=create_anki_notes(args.notes, suffix=" (v2)"),
+                    deck_name=DECK_NAME,
+                    reference_fields=["front"],
+                    changing_fields=["back"],
+                    match_strategy=args.match_strategy,
+                ),
+            ),
+            (
+                "export",
+                lambda: importer_exporter.export_to_txt(DECK_NAME, output_file),
+            ),
+        ]
+        results = [run_phase(name, connection, phase) for name, phase in phases]
+
+    print(f"{'phase':<10}{'seconds':>10}{'notes/s':>12}{'HTTP calls':>12}")
+    for name, elapsed, http_calls in results:
+        print(
+            f"{name:<10}{elapsed:>10.2f}{args.notes / elapsed:>12.0f}{http_calls:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/bin/bash
+
+jobs_file="scripts/anki/jobs.json"
+max_concurrent_decks=2
+
+if [ ! -f "$jobs_file" ]; then
+    echo "Jobs file $jobs_file does not exist."
+    exit 1
+fi
+
+manki anki --jobs "$jobs_file" --max-concurrent-decks "$max_concurrent_decks"
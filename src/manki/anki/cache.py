@@ -0,0 +1,180 @@
+"""
+Read-through cache for read-only AnkiConnect actions.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_SIZE = 10_000
+
+_MISSING = object()
+
+
+class AnkiCache:
+    """
+    A TTL and size-bounded LRU cache for the results of read-only AnkiConnect actions.
+
+    `notesInfo` results are cached per note id, so a request for several notes only fetches the ids that are
+    not cached yet. Write actions invalidate the entries they can affect; actions the cache does not know about
+    clear it entirely. Cached values are shared, not copied, so callers must not mutate them.
+
+    Attributes:
+        ttl (float): Seconds an entry stays valid.
+        max_size (int): Maximum number of entries before the least recently used ones are evicted.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that had to go to AnkiConnect.
+
+    Methods:
+        get(action, params): Returns whether the action result is cached, and the result.
+        put(action, params, result): Stores the result of a read-only action.
+        get_notes(note_ids): Returns the cached `notesInfo` entries and the ids still missing.
+        put_notes(notes): Stores `notesInfo` entries by note id.
+        invalidate(action, params): Drops the entries a write action can affect.
+        clear(): Drops every entry.
+    """
+
+    READ_ACTIONS = {"deckNames", "modelNames", "modelFieldNames", "findNotes"}
+    # Actions that neither read cacheable data nor change notes, decks or models.
+    NEUTRAL_ACTIONS = {
+        "version",
+        "requestPermission",
+        "storeMediaFile",
+        "retrieveMediaFile",
+        "getMediaFilesNames",
+        "notesModTime",
+        "cardsInfo",
+    }
+    # Write action -> (drop every findNotes entry, params key holding the affected note ids, drop deckNames)
+    WRITE_ACTIONS = {
+        "addNotes": (True, None, False),
+        "addNote": (True, None, False),
+        "updateNoteFields": (True, "note", False),
+        "updateNote": (True, "note", False),
+        "deleteNotes": (True, "notes", False),
+        "addTags": (True, "notes", False),
+        "removeTags": (True, "notes", False),
+        "createDeck": (False, None, True),
+    }
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def is_cacheable(cls, action: str, params: Dict) -> bool:
+        if action == "notesInfo":
+            return "notes" in params
+        return action in cls.READ_ACTIONS
+
+    def get(self, action: str, params: Dict) -> Tuple[bool, Any]:
+        with self._lock:
+            value = self._get(self._key(action, params))
+            if value is _MISSING:
+                self.misses += 1
+                return False, None
+
+            self.hits += 1
+            return True, value
+
+    def put(self, action: str, params: Dict, result: Any) -> None:
+        with self._lock:
+            self._put(self._key(action, params), result)
+
+    def get_notes(self, note_ids: Iterable[int]) -> Tuple[Dict[int, Dict], List[int]]:
+        cached, missing = {}, []
+        with self._lock:
+            for note_id in note_ids:
+                note = self._get(("notesInfo", note_id))
+                if note is _MISSING:
+                    missing.append(note_id)
+                    self.misses += 1
+                else:
+                    cached[note_id] = note
+                    self.hits += 1
+        return cached, missing
+
+    def put_notes(self, notes: Iterable[Dict]) -> None:
+        with self._lock:
+            for note in notes:
+                # AnkiConnect returns an empty object for ids that do not exist.
+                if note and "noteId" in note:
+                    self._put(("notesInfo", note["noteId"]), note)
+
+    def invalidate(self, action: str, params: Dict) -> None:
+        if action == "multi":
+            for sub_action in params.get("actions", []):
+                self.invalidate(sub_action["action"], sub_action.get("params", {}))
+            return
+
+        if action == "notesInfo" or action in self.READ_ACTIONS:
+            return
+        if action in self.NEUTRAL_ACTIONS:
+            return
+        if action not in self.WRITE_ACTIONS:
+            self.clear()
+            return
+
+        drop_queries, notes_key, drop_decks = self.WRITE_ACTIONS[action]
+        with self._lock:
+            if drop_queries:
+                self._drop(lambda key: key[0] == "findNotes")
+            if drop_decks:
+                self._drop(lambda key: key[0] == "deckNames")
+            for note_id in self._affected_note_ids(params.get(notes_key)):
+                self._entries.pop(("notesInfo", note_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _key(action: str, params: Dict) -> Tuple:
+        return (action, json.dumps(params, sort_keys=True))
+
+    @staticmethod
+    def _affected_note_ids(value: Any) -> List[int]:
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [value["id"]] if "id" in value else []
+        return list(value)
+
+    def _get(self, key: Tuple) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: Tuple, value: Any) -> None:
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _drop(self, predicate: Callable[[Tuple], bool]) -> None:
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
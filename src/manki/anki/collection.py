@@ -0,0 +1,310 @@
+"""
+Read-only access to an Anki collection file (`collection.anki2`) without going through AnkiConnect.
+
+`AnkiCollectionReader` answers the read actions manki uses (`deckNames`, `modelNames`, `modelFieldNames`,
+`findNotes`, `notesInfo` and `notesModTime`) with plain SQL on the collection, and can stand in for an
+`AnkiConnection` wherever nothing is written, such as exports or diffing a deck against new notes. Open a copy
+of the collection, or the collection itself while Anki is closed.
+
+Both the legacy layout, with note types and decks stored as JSON in the `col` table (schema 11), and the
+newer one, with the `notetypes`, `fields` and `decks` tables, are read.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from manki.utils import setup_logger
+
+from .connection import AnkiBatch
+from .search import parse_query
+from .stats import ConnectionStats
+
+logger = setup_logger(name=__name__)
+
+FIELD_SEPARATOR = "\x1f"
+DECK_SEPARATOR = "::"
+MAX_SQL_VARIABLES = 500
+
+READ_ACTIONS = frozenset(
+    [
+        "version",
+        "deckNames",
+        "modelNames",
+        "modelFieldNames",
+        "findNotes",
+        "notesInfo",
+        "notesModTime",
+        "multi",
+    ]
+)
+
+# A note belongs to the deck of its first card; cards of filtered decks keep their home deck in `odid`.
+_RECORDS_QUERY = """
+    select n.id, n.mid, n.mod, n.tags, n.flds,
+        (select case when c.odid then c.odid else c.did end
+         from cards c where c.nid = n.id order by c.ord limit 1)
+    from notes n
+"""
+
+
+class AnkiCollectionReader:
+    """
+    Read-only stand-in for `AnkiConnection` backed by an Anki collection file.
+
+    Note types and decks are read once, when first needed; notes are streamed from the collection on every
+    action, so the reader sees the file as it is when queried. Write actions raise an exception.
+
+    Attributes:
+        path (Path): The collection file.
+        api_version (int): The AnkiConnect API version the answers follow.
+        stats (ConnectionStats): Per-action call count and latency, as for `AnkiConnection`.
+
+    Methods:
+        __call__(action, **params): Shortcut to invoke an action.
+        invoke(action, **params): Answers a read action from the collection.
+        invoke_encoded(action, body, params): Raises, as only write actions are sent encoded.
+        record(): Context manager yielding stats for the actions answered inside it.
+        batch(size): Returns an AnkiBatch of read actions; queueing a write action raises.
+        close(): Closes the collection.
+    """
+
+    api_version = 6
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise Exception(f"Anki collection not found: {self.path}")
+
+        self.stats = ConnectionStats()
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        # Deck and note type names of the newer schema use Anki's own case-insensitive collation.
+        self._db.create_collation("unicase", _compare_unicase)
+        self._models = None
+        self._decks = None
+
+    def __call__(self, action, **params):
+        return self.invoke(action, **params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def record(self):
+        return self.stats.recording()
+
+    def batch(self, size=None):
+        return _CollectionBatch(self, size=size)
+
+    def request(self, action, **params):
+        return {"action": action, "params": params, "version": self.api_version}
+
+    def invoke(self, action, **params):
+        start = time.perf_counter()
+        error = False
+        try:
+            self._check_read_action(action)
+            with self._lock:
+                return getattr(self, action)(**params)
+        except Exception as e:
+            error = True
+            logger.error(f"Anki collection error: {e}")
+            raise
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.stats.record(action, 0, 0, latency_ms, error)
+
+    def invoke_encoded(self, action, body, params=None):
+        return self.invoke(action, **(params or {}))
+
+    def _check_read_action(self, action):
+        if action not in READ_ACTIONS:
+            raise Exception(
+                f"{action} is not supported by the read-only collection at {self.path}"
+            )
+
+    def multi(self, actions: List[Dict]) -> List[Dict]:
+        responses = []
+        for action in actions:
+            try:
+                self._check_read_action(action["action"])
+                result = getattr(self, action["action"])(**action.get("params", {}))
+                responses.append({"result": result, "error": None})
+            except Exception as e:
+                responses.append({"result": None, "error": str(e)})
+        return responses
+
+    # decks
+    def deckNames(self) -> List[str]:
+        return sorted(self._load_decks().values())
+
+    # models
+    def modelNames(self) -> List[str]:
+        return sorted(name for name, _ in self._load_models().values())
+
+    def modelFieldNames(self, modelName: str) -> List[str]:
+        for name, field_names in self._load_models().values():
+            if name == modelName:
+                return list(field_names)
+        raise Exception(f"model was not found: {modelName}")
+
+    # notes
+    def findNotes(self, query: str) -> List[int]:
+        predicate = parse_query(query)
+        return [note["noteId"] for note in self._iter_records() if predicate(note)]
+
+    def notesInfo(self, notes: List[int]) -> List[Dict]:
+        models = self._load_models()
+        found = {}
+        for note_ids in _chunks(notes):
+            cards = self._cards_by_note(note_ids)
+            for note_id, mid, mod, tags, flds in self._select_notes(note_ids):
+                model_name, field_names = models[mid]
+                found[note_id] = {
+                    "noteId": note_id,
+                    "modelName": model_name,
+                    "tags": tags.split(),
+                    "fields": {
+                        name: {"value": value, "order": order}
+                        for order, (name, value) in enumerate(
+                            zip(field_names, flds.split(FIELD_SEPARATOR))
+                        )
+                    },
+                    "mod": mod,
+                    "cards": cards.get(note_id, []),
+                }
+        # Unknown ids get an empty entry, like AnkiConnect.
+        return [found.get(note_id, {}) for note_id in notes]
+
+    def notesModTime(self, notes: List[int]) -> List[Dict]:
+        mod_times = {}
+        for note_ids in _chunks(notes):
+            placeholders = ",".join("?" * len(note_ids))
+            mod_times.update(
+                self._db.execute(
+                    f"select id, mod from notes where id in ({placeholders})", note_ids
+                )
+            )
+        return [
+            {"noteId": note_id, "mod": mod_times[note_id]}
+            for note_id in notes
+            if note_id in mod_times
+        ]
+
+    # misc
+    def version(self) -> int:
+        return self.api_version
+
+    def _iter_records(self) -> Iterator[Dict]:
+        """Streams every note as a search record (see `manki.anki.search`)."""
+        models = self._load_models()
+        decks = self._load_decks()
+        for note_id, mid, mod, tags, flds, deck_id in self._db.execute(_RECORDS_QUERY):
+            model_name, field_names = models[mid]
+            yield {
+                "noteId": note_id,
+                "deckName": decks.get(deck_id, ""),
+                "modelName": model_name,
+                "fields": dict(zip(field_names, flds.split(FIELD_SEPARATOR))),
+                "tags": tags.split(),
+                "mod": mod,
+            }
+
+    def _select_notes(self, note_ids: List[int]) -> List[Tuple]:
+        placeholders = ",".join("?" * len(note_ids))
+        return self._db.execute(
+            f"select id, mid, mod, tags, flds from notes where id in ({placeholders})",
+            note_ids,
+        ).fetchall()
+
+    def _cards_by_note(self, note_ids: List[int]) -> Dict[int, List[int]]:
+        placeholders = ",".join("?" * len(note_ids))
+        cards: Dict[int, List[int]] = {}
+        for note_id, card_id in self._db.execute(
+            f"select nid, id from cards where nid in ({placeholders}) order by nid, ord",
+            note_ids,
+        ):
+            cards.setdefault(note_id, []).append(card_id)
+        return cards
+
+    def _load_models(self) -> Dict[int, Tuple[str, List[str]]]:
+        if self._models is None:
+            if self._has_table("notetypes"):
+                fields: Dict[int, List[str]] = {}
+                for model_id, name in self._db.execute(
+                    "select ntid, name from fields order by ntid, ord"
+                ):
+                    fields.setdefault(model_id, []).append(name)
+                self._models = {
+                    model_id: (name, fields.get(model_id, []))
+                    for model_id, name in self._db.execute(
+                        "select id, name from notetypes"
+                    )
+                }
+            else:
+                (models,) = self._db.execute("select models from col").fetchone()
+                self._models = {
+                    int(model_id): (
+                        model["name"],
+                        [
+                            field["name"]
+                            for field in sorted(model["flds"], key=lambda f: f["ord"])
+                        ],
+                    )
+                    for model_id, model in json.loads(models).items()
+                }
+        return self._models
+
+    def _load_decks(self) -> Dict[int, str]:
+        if self._decks is None:
+            if self._has_table("decks"):
+                self._decks = {
+                    deck_id: name.replace(FIELD_SEPARATOR, DECK_SEPARATOR)
+                    for deck_id, name in self._db.execute("select id, name from decks")
+                }
+            else:
+                (decks,) = self._db.execute("select decks from col").fetchone()
+                self._decks = {
+                    int(deck_id): deck["name"]
+                    for deck_id, deck in json.loads(decks).items()
+                }
+        return self._decks
+
+    def _has_table(self, name: str) -> bool:
+        return (
+            self._db.execute(
+                "select 1 from sqlite_master where type = 'table' and name = ?", (name,)
+            ).fetchone()
+            is not None
+        )
+
+
+def _chunks(note_ids: List[int]) -> Iterator[List[int]]:
+    for start in range(0, len(note_ids), MAX_SQL_VARIABLES):
+        yield note_ids[start : start + MAX_SQL_VARIABLES]
+
+
+def _compare_unicase(left: str, right: str) -> int:
+    left, right = left.casefold(), right.casefold()
+    return (left > right) - (left < right)
+
+
+class _CollectionBatch(AnkiBatch):
+    """An `AnkiBatch` on a collection reader, which rejects write actions as they are queued."""
+
+    def invoke(self, action, **params):
+        self.connection._check_read_action(action)
+        return super().invoke(action, **params)
@@ -2,13 +2,19 @@
 Script to create the Anki connection.
 """
 
+import asyncio
 import json
 import os
+import time
+from typing import Optional
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 from ..utils import setup_logger
+from .cache import AnkiCache
+from .stats import ConnectionStats
 
 # Configure logging
 logger = setup_logger(name=__name__)
@@ -19,6 +25,12 @@ ANKI_CONNECT_URL = os.getenv("ANKI_CONNECT_URL")
 ANKI_API_VERSION = int(os.getenv("API_VERSION"))
 ANKI_API_KEY = os.getenv("ANKI_API_KEY")
 
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_CONCURRENCY = 8
+
 
 class AnkiConnection:
     """
@@ -27,27 +39,66 @@ class AnkiConnection:
     AnkiConnect is a plugin that allows external applications to communicate with Anki using a JSON-based API.
     This class simplifies the process of sending requests to AnkiConnect and handling responses.
 
+    Requests go through a pooled keep-alive session owned by the connection, so consecutive actions reuse the
+    same TCP connection instead of paying a handshake each time. Call `close()` (or use the connection as a
+    context manager) to release the pooled sockets.
+
     Attributes:
         url (str): The URL where AnkiConnect is hosted, typically 'http://localhost:8765'.
         api_version (int): The version of the AnkiConnect API being used.
+        timeout (tuple): The (connect, read) timeouts in seconds applied to every request.
+        session (requests.Session): The pooled HTTP session used to talk to AnkiConnect.
+        cache (AnkiCache): Optional read-through cache for read-only actions, invalidated by write actions.
+        stats (ConnectionStats): Per-action call count, payload bytes, latency histogram and error count.
 
     Methods:
         __call__(action, **params): Shortcut to invoke an AnkiConnect action.
         list_decks(): Retrieves a list of all deck names in the Anki collection.
         request(action, **params): Constructs a request dictionary for AnkiConnect.
         invoke(action, **params): Sends a request to AnkiConnect and handles the response.
+        invoke_encoded(action, body, params): Sends a request body already encoded as JSON bytes.
+        record(): Context manager yielding stats for the HTTP calls made inside it, e.g. to assert a budget.
+        batch(size): Returns an AnkiBatch that queues actions and sends them as `multi` requests.
+        close(): Closes the pooled HTTP session.
     """
 
     def __init__(
-        self, url=ANKI_CONNECT_URL, api_version=ANKI_API_VERSION, api_key=ANKI_API_KEY
+        self,
+        url=ANKI_CONNECT_URL,
+        api_version=ANKI_API_VERSION,
+        api_key=ANKI_API_KEY,
+        pool_size=DEFAULT_POOL_SIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        cache: Optional[AnkiCache] = None,
     ):
         self.url = url
         self.api_version = api_version
         self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(pool_size)
+        self.cache = cache
+        self.stats = ConnectionStats()
 
     def __call__(self, action, **params):
         return self.invoke(action, **params)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def record(self):
+        return self.stats.recording()
+
+    def batch(self, size=DEFAULT_BATCH_SIZE):
+        return AnkiBatch(self, size=size)
+
     def list_decks(self):
         return self.invoke("deckNames")
 
@@ -60,14 +111,282 @@ class AnkiConnection:
         }
 
     def invoke(self, action, **params):
+        if self.cache is None:
+            return self._send(action, **params)
+
+        if action == "notesInfo" and "notes" in params:
+            return self._invoke_notes_info_cached(params["notes"])
+
+        if self.cache.is_cacheable(action, params):
+            found, result = self.cache.get(action, params)
+            if not found:
+                result = self._send(action, **params)
+                self.cache.put(action, params, result)
+            return result
+
+        try:
+            return self._send(action, **params)
+        finally:
+            # Invalidate even on failure: a rejected batch may still have been partially applied.
+            self.cache.invalidate(action, params)
+
+    def _invoke_notes_info_cached(self, note_ids):
+        cached, missing = self.cache.get_notes(note_ids)
+        if missing:
+            fetched = self._send("notesInfo", notes=missing)
+            self.cache.put_notes(fetched)
+            cached.update(zip(missing, fetched))
+        return [cached[note_id] for note_id in note_ids]
+
+    def invoke_encoded(self, action, body, params=None):
+        """
+        Sends a request already encoded as JSON bytes (see `manki.anki.encoding`), skipping the encoding step.
+        `params` is only used to invalidate the cache and record stats, and may be omitted for actions whose
+        effect on the cache does not depend on them, such as `addNotes`.
+        """
+        params = params or {}
+        try:
+            return self._post(action, params, body)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(action, params)
+
+    def _send(self, action, **params):
         requestJson = json.dumps(self.request(action, **params)).encode("utf-8")
+        return self._post(action, params, requestJson)
+
+    def _post(self, action, params, requestJson):
+        start = time.perf_counter()
         try:
-            response = requests.post(self.url, requestJson, timeout=60).json()
+            http_response = self.session.post(
+                self.url, requestJson, timeout=self.timeout
+            )
+            response = http_response.json()
         except requests.RequestException as e:
+            self._record(action, params, requestJson, 0, start, error=True)
             logger.error(f"Request failed: {e}")
             raise
 
-        if "error" in response and response["error"]:
+        error = "error" in response and response["error"]
+        self._record(
+            action, params, requestJson, len(http_response.content), start, error
+        )
+        if error:
             logger.error(f"Anki connection error: {response['error']}")
             raise Exception(response["error"])
         return response.get("result", {})
+
+    def _record(self, action, params, request_json, response_bytes, start, error):
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.stats.record(
+            action, len(request_json), response_bytes, latency_ms, bool(error)
+        )
+        if action == "multi":
+            self.stats.record_batched([a["action"] for a in params.get("actions", [])])
+
+    @staticmethod
+    def _create_session(pool_size):
+        # A single host is ever contacted, so one pool is enough; block instead of
+        # opening throwaway sockets when every pooled connection is busy.
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+class AsyncAnkiConnection:
+    """
+    Asyncio counterpart of `AnkiConnection`.
+
+    Actions are sent through a pooled `AnkiConnection` on worker threads, with at most `max_concurrency` requests
+    in flight at once, so callers can overlap network waits with other work by gathering many invocations.
+
+    Attributes:
+        connection (AnkiConnection): The synchronous connection used to send the requests.
+        max_concurrency (int): The maximum number of requests in flight at the same time.
+
+    Methods:
+        __call__(action, **params): Shortcut to invoke an AnkiConnect action.
+        list_decks(): Retrieves a list of all deck names in the Anki collection.
+        request(action, **params): Constructs a request dictionary for AnkiConnect.
+        invoke(action, **params): Sends a request to AnkiConnect and handles the response.
+        invoke_encoded(action, body, params): Sends a request body already encoded as JSON bytes.
+        batch(): Creates an `AnkiBatch` to be sent with `flush(batch)`.
+        flush(batch): Sends the queued actions of a batch as one `multi` request.
+        close(): Closes the underlying connection.
+    """
+
+    def __init__(
+        self,
+        url=ANKI_CONNECT_URL,
+        api_version=ANKI_API_VERSION,
+        api_key=ANKI_API_KEY,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        cache: Optional[AnkiCache] = None,
+        connection=None,
+    ):
+        if connection is None:
+            connection = AnkiConnection(
+                url=url,
+                api_version=api_version,
+                api_key=api_key,
+                pool_size=max_concurrency,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                cache=cache,
+            )
+        self.connection = connection
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __call__(self, action, **params):
+        return await self.invoke(action, **params)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        self.connection.close()
+
+    async def list_decks(self):
+        return await self.invoke("deckNames")
+
+    def batch(self):
+        # Queuing is synchronous and never flushes on its own; send the batch with `await flush(batch)`.
+        return AnkiBatch(self.connection, size=None)
+
+    async def flush(self, batch):
+        async with self._semaphore:
+            return await asyncio.to_thread(batch.flush)
+
+    def request(self, action, **params):
+        return self.connection.request(action, **params)
+
+    async def invoke(self, action, **params):
+        async with self._semaphore:
+            return await asyncio.to_thread(self.connection.invoke, action, **params)
+
+    async def invoke_encoded(self, action, body, params=None):
+        async with self._semaphore:
+            return await asyncio.to_thread(
+                self.connection.invoke_encoded, action, body, params
+            )
+
+
+class AnkiActionResult:
+    """
+    Deferred result of an action queued in an `AnkiBatch`.
+
+    The result is only available once the batch holding the action has been flushed. Errors reported by
+    AnkiConnect for this single action are kept in `error` instead of failing the whole batch.
+    """
+
+    def __init__(self, action, params):
+        self.action = action
+        self.params = params
+        self.done = False
+        self.error = None
+        self._result = None
+
+    def set_result(self, result):
+        self._result = result
+        self.done = True
+
+    def set_error(self, error):
+        self.error = error
+        self.done = True
+
+    def result(self):
+        if not self.done:
+            raise RuntimeError(f"Action '{self.action}' has not been flushed yet.")
+        if self.error:
+            raise Exception(self.error)
+        return self._result
+
+
+class AnkiBatch:
+    """
+    Queues AnkiConnect actions and sends them together as a single `multi` request.
+
+    Queued actions are flushed once `size` actions are pending, when `flush()` is called, or when the batch is
+    used as a context manager and the block exits without raising. A `size` of None disables the automatic flush.
+
+    Example:
+        with anki_connection.batch(size=50) as batch:
+            results = [batch("notesInfo", notes=[note_id]) for note_id in note_ids]
+        notes = [result.result()[0] for result in results]
+    """
+
+    def __init__(self, connection, size=DEFAULT_BATCH_SIZE):
+        if size is not None and size < 1:
+            raise ValueError("Batch size must be at least 1.")
+        self.connection = connection
+        self.size = size
+        self._pending = []
+
+    def __call__(self, action, **params):
+        return self.invoke(action, **params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def invoke(self, action, **params):
+        action_result = AnkiActionResult(action, params)
+        self._pending.append(action_result)
+        if self.size is not None and len(self._pending) >= self.size:
+            self.flush()
+        return action_result
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        actions = [
+            {
+                "action": item.action,
+                "params": item.params,
+                "version": self.connection.api_version,
+            }
+            for item in pending
+        ]
+        try:
+            responses = self.connection.invoke("multi", actions=actions)
+        except requests.RequestException:
+            raise
+        except Exception as e:
+            for item in pending:
+                item.set_error(str(e))
+            return pending
+
+        for item, response in zip(pending, responses):
+            # Since API version 6, every action in `multi` is wrapped in its own {result, error} envelope.
+            if self.connection.api_version >= 6 and isinstance(response, dict):
+                if response.get("error"):
+                    item.set_error(response["error"])
+                else:
+                    item.set_result(response.get("result"))
+            else:
+                item.set_result(response)
+        for item in pending[len(responses) :]:
+            item.set_error(
+                f"multi answered {len(responses)} of {len(pending)} actions; "
+                f"'{item.action}' got no response"
+            )
+
+        return pending
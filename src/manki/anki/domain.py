@@ -1,30 +1,132 @@
+import hashlib
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 from pydantic import BaseModel
 
+from manki.utils import paused_gc
+
+if TYPE_CHECKING:
+    from .fields import FieldPlan
+
+IDENTITY_TAG_PREFIX = "manki-id::"
+# The pseudo field naming a note's tags in `changing_fields`.
+TAGS_FIELD = "tags"
+
+
+def identity_key(*parts: str) -> str:
+    digest = hashlib.sha1("\x1f".join(parts).encode("utf-8"))
+    return digest.hexdigest()[:20]
+
+
+def key_from_tags(tags: Optional[List[str]]) -> Optional[str]:
+    for tag in tags or []:
+        if tag.startswith(IDENTITY_TAG_PREFIX):
+            return tag[len(IDENTITY_TAG_PREFIX) :]
+    return None
+
+
+def diff_tags(
+    tags: Iterable[str], current_tags: Iterable[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns the tags to add and to remove to turn `current_tags` into `tags`. Anki compares tags ignoring case,
+    and identity tags are never removed.
+    """
+    wanted = {tag.casefold(): tag for tag in tags}
+    current = {tag.casefold(): tag for tag in current_tags}
+    added = [tag for folded, tag in wanted.items() if folded not in current]
+    removed = [
+        tag
+        for folded, tag in current.items()
+        if folded not in wanted and not tag.startswith(IDENTITY_TAG_PREFIX)
+    ]
+    return added, removed
+
 
 class AnkiNote(BaseModel):
     deckName: str
     modelName: str
     tags: Optional[List[str]] = []
-    front: str
-    back: str
+    # Empty for note types without a front or a back, whose fields all go in `extra_fields`.
+    front: str = ""
+    back: str = ""
+    extra_fields: Dict[str, str] = {}
     audio: Optional[Dict[str, str]] = None
     image: Optional[Dict[str, str]] = None
     video: Optional[Dict[str, str]] = None
     do_write: Optional[bool] = False
     id: Optional[int] = None
+    key: Optional[str] = None
+
+    @property
+    def identity_tag(self) -> Optional[str]:
+        """The tag carrying `key` in Anki, so the note can be found again even after its fields are edited."""
+        if self.key is None:
+            return None
+        return f"{IDENTITY_TAG_PREFIX}{self.key}"
+
+    @property
+    def anki_tags(self) -> List[str]:
+        """The tags the note carries in Anki: its own tags, without repeats, followed by its identity tag."""
+        tags = list(dict.fromkeys(self.tags or []))
+        if self.key is not None and self.identity_tag not in tags:
+            tags.append(self.identity_tag)
+        return tags
+
+    @property
+    def label(self) -> str:
+        """Names the note in logs: its front, or its first field for note types without one."""
+        return self.front or next(iter(self.extra_fields.values()), "")
+
+    @classmethod
+    def from_trusted(cls, records: Iterable[Dict]) -> List["AnkiNote"]:
+        """
+        Builds notes from records produced by manki itself without validating each one.
+
+        Only the first record is validated, to catch a producer that drifted from the schema; input read from
+        user files should go through regular validation instead.
+        """
+        defaults = {name: field.default for name, field in cls.model_fields.items()}
+        notes = []
+        with paused_gc():
+            for record in records:
+                if not notes:
+                    notes.append(cls.model_validate(record))
+                    continue
+
+                # What `model_construct` does, without its per-field bookkeeping.
+                note = object.__new__(cls)
+                values = {**defaults, **record}
+                if "tags" not in record:
+                    values["tags"] = []
+                if "extra_fields" not in record:
+                    values["extra_fields"] = {}
+                object.__setattr__(note, "__dict__", values)
+                object.__setattr__(note, "__pydantic_fields_set__", set(record))
+                object.__setattr__(note, "__pydantic_extra__", None)
+                object.__setattr__(note, "__pydantic_private__", None)
+                notes.append(note)
+        return notes
+
+    def to_anki_dict(
+        self, allow_duplicate: bool = False, plan: Optional["FieldPlan"] = None
+    ) -> Dict:
+        """
+        Builds the note as AnkiConnect expects it. With the `plan` of the note's model, fields are named as in
+        Anki; without it, `front` and `back` are sent alongside `extra_fields` as they are.
+        """
+        if plan is not None:
+            fields = plan.values(self)
+        else:
+            fields = {"front": self.front, "back": self.back, **self.extra_fields}
 
-    def to_anki_dict(self, allow_duplicate: bool = False) -> Dict:
         anki_note_dict = {
             "deckName": self.deckName,
             "modelName": self.modelName,
-            "tags": [],
-            "fields": {
-                "front": self.front,
-                "back": self.back,
-            },
+            "tags": self.anki_tags,
+            "fields": fields,
             "audio": self.audio,
             "image": self.image,
             "video": self.video,
@@ -34,11 +136,71 @@ class AnkiNote(BaseModel):
         return anki_note_dict
 
 
+@dataclass
+class NoteFailure:
+    note: AnkiNote
+    error: str
+
+
+@dataclass
+class TagChanges:
+    """
+    Tag changes to existing notes, grouped per tag so every tag takes a single `addTags` or `removeTags` action
+    whatever the number of notes it applies to.
+
+    Attributes:
+        added (Dict[str, List[AnkiNote]]): The notes to tag, by tag.
+        removed (Dict[str, List[AnkiNote]]): The notes to untag, by tag.
+    """
+
+    added: Dict[str, List[AnkiNote]] = field(default_factory=dict)
+    removed: Dict[str, List[AnkiNote]] = field(default_factory=dict)
+
+    def track(self, new_note: AnkiNote, existing_note: AnkiNote) -> bool:
+        """Records the tag changes from `existing_note` to `new_note` and returns whether there are any."""
+        added, removed = diff_tags(new_note.anki_tags, existing_note.tags or [])
+        for tag in added:
+            self.added.setdefault(tag, []).append(new_note)
+        for tag in removed:
+            self.removed.setdefault(tag, []).append(new_note)
+        if added or removed:
+            removed_tags = set(removed)
+            existing_note.tags = [
+                tag for tag in existing_note.tags or [] if tag not in removed_tags
+            ] + added
+        return bool(added or removed)
+
+
+@dataclass
+class WriteReport:
+    """
+    Outcome of a bulk write to Anki.
+
+    Attributes:
+        succeeded (List[AnkiNote]): Notes that were written.
+        failed (List[NoteFailure]): Notes that were rejected, with the reason AnkiConnect gave.
+    """
+
+    succeeded: List[AnkiNote] = field(default_factory=list)
+    failed: List[NoteFailure] = field(default_factory=list)
+
+    def extend(self, other: "WriteReport") -> None:
+        self.succeeded.extend(other.succeeded)
+        self.failed.extend(other.failed)
+
+
 class NoteType(Enum):
     BASIC = "basic"
     ADVANCED = "advanced"
 
 
+class MatchStrategy(Enum):
+    QUERY = "query"
+    BATCHED_QUERY = "batched-query"
+    DECK = "deck"
+    KEY = "key"
+
+
 class NoteTypeFields:
     _fields = {
         NoteType.BASIC: ["front", "back"],
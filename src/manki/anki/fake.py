@@ -0,0 +1,375 @@
+"""
+In-process stand-in for AnkiConnect, for offline tests and benchmarks.
+"""
+
+import base64
+import itertools
+import json
+import random
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from .package import COLLECTION_SCHEMA, FIELD_SEPARATOR, field_checksum
+from .search import search_notes
+
+DEFAULT_MODELS = {
+    "basic": ["front", "back"],
+    "advanced": ["front", "back", "audio"],
+}
+
+
+class FakeAnkiCollection:
+    """
+    An in-memory Anki collection answering the AnkiConnect actions manki uses.
+
+    Notes are stored as plain records (see `manki.anki.search`), and every action is a method named after it.
+    Errors are raised as exceptions carrying the same messages AnkiConnect returns.
+    """
+
+    def __init__(
+        self,
+        models: Optional[Dict[str, List[str]]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.models = dict(DEFAULT_MODELS if models is None else models)
+        self.decks: Dict[str, int] = {"Default": 1}
+        self.notes: Dict[int, Dict] = {}
+        self.media: Dict[str, bytes] = {}
+        self._clock = clock
+        self._ids = itertools.count(1_500_000_000_000)
+        self._lock = threading.RLock()
+
+    def save(self, path: str) -> None:
+        """Writes the collection to `path` as a schema 11 `collection.anki2` SQLite file, with one card per note."""
+        model_ids = {name: model_id for model_id, name in enumerate(self.models, 1)}
+        models = {
+            str(model_id): {
+                "id": model_id,
+                "name": name,
+                "flds": [
+                    {"name": field, "ord": order}
+                    for order, field in enumerate(self.models[name])
+                ],
+            }
+            for name, model_id in model_ids.items()
+        }
+        decks = {
+            str(deck_id): {"id": deck_id, "name": name}
+            for name, deck_id in self.decks.items()
+        }
+
+        with sqlite3.connect(path) as db:
+            db.executescript(COLLECTION_SCHEMA)
+            db.execute(
+                "insert into col values (1, 0, 0, 0, 11, 0, 0, 0, '{}', ?, ?, '{}', '{}')",
+                (json.dumps(models), json.dumps(decks)),
+            )
+            db.executemany(
+                "insert into notes values (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')",
+                (
+                    (
+                        note_id,
+                        str(note_id),
+                        model_ids[note["modelName"]],
+                        note["mod"],
+                        f" {' '.join(note['tags'])} " if note["tags"] else "",
+                        FIELD_SEPARATOR.join(note["fields"].values()),
+                        next(iter(note["fields"].values()), ""),
+                        field_checksum(next(iter(note["fields"].values()), "")),
+                    )
+                    for note_id, note in self.notes.items()
+                ),
+            )
+            db.executemany(
+                "insert into cards values (?, ?, ?, 0, ?, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                (
+                    (note_id, note_id, self.decks[note["deckName"]], note["mod"])
+                    for note_id, note in self.notes.items()
+                ),
+            )
+        db.close()
+
+    def handle(self, action: str, params: Dict):
+        handler = getattr(self, action, None)
+        if action.startswith("_") or action == "handle" or not callable(handler):
+            raise Exception("unsupported action")
+        with self._lock:
+            return handler(**params)
+
+    # decks
+    def deckNames(self) -> List[str]:
+        return list(self.decks)
+
+    def createDeck(self, deck: str) -> int:
+        if deck not in self.decks:
+            self.decks[deck] = next(self._ids)
+        return self.decks[deck]
+
+    # models
+    def modelNames(self) -> List[str]:
+        return list(self.models)
+
+    def modelFieldNames(self, modelName: str) -> List[str]:
+        if modelName not in self.models:
+            raise Exception(f"model was not found: {modelName}")
+        return list(self.models[modelName])
+
+    # notes
+    def findNotes(self, query: str) -> List[int]:
+        return search_notes(query, list(self.notes.values()), now=self._clock())
+
+    def notesInfo(self, notes: List[int]) -> List[Dict]:
+        return [self._note_info(note_id) for note_id in notes]
+
+    def addNote(self, note: Dict) -> int:
+        fields = self._validate_note(note)
+        note_id = next(self._ids)
+        self.notes[note_id] = {
+            "noteId": note_id,
+            "deckName": note["deckName"],
+            "modelName": note["modelName"],
+            "fields": fields,
+            "tags": list(note.get("tags") or []),
+            "mod": int(self._clock()),
+        }
+        return note_id
+
+    def addNotes(self, notes: List[Dict]) -> List[int]:
+        # Every note is tried so all errors are reported, one per rejected note, but a request with errors
+        # is rolled back as a whole.
+        results, errors = [], []
+        for note in notes:
+            try:
+                results.append(self.addNote(note))
+            except Exception as e:
+                errors.append(str(e))
+        if errors:
+            for note_id in results:
+                del self.notes[note_id]
+            raise Exception(errors)
+        return results
+
+    def updateNoteFields(self, note: Dict) -> None:
+        stored = self._get_note(note["id"])
+        for name, value in note.get("fields", {}).items():
+            if name not in stored["fields"]:
+                raise Exception(f"field was not found: {name}")
+            stored["fields"][name] = value
+        stored["mod"] = int(self._clock())
+
+    def deleteNotes(self, notes: List[int]) -> None:
+        for note_id in notes:
+            self.notes.pop(note_id, None)
+
+    def addTags(self, notes: List[int], tags: str) -> None:
+        for note_id in notes:
+            stored = self._get_note(note_id)
+            for tag in tags.split():
+                if tag not in stored["tags"]:
+                    stored["tags"].append(tag)
+            stored["mod"] = int(self._clock())
+
+    def removeTags(self, notes: List[int], tags: str) -> None:
+        removed = tags.split()
+        for note_id in notes:
+            stored = self._get_note(note_id)
+            stored["tags"] = [tag for tag in stored["tags"] if tag not in removed]
+            stored["mod"] = int(self._clock())
+
+    def notesModTime(self, notes: List[int]) -> List[Dict]:
+        return [
+            {"noteId": note_id, "mod": self._get_note(note_id)["mod"]}
+            for note_id in notes
+        ]
+
+    # media
+    def storeMediaFile(
+        self,
+        filename: str,
+        data: Optional[str] = None,
+        path: Optional[str] = None,
+        deleteExisting: bool = True,
+        **_,
+    ) -> str:
+        if data is not None:
+            content = base64.b64decode(data)
+        elif path is not None:
+            with open(path, "rb") as file:
+                content = file.read()
+        else:
+            raise Exception("You must provide a 'data', 'path', or 'url' field.")
+
+        if filename in self.media and not deleteExisting:
+            return filename
+        self.media[filename] = content
+        return filename
+
+    # misc
+    def version(self) -> int:
+        return 6
+
+    def multi(self, actions: List[Dict]) -> List[Dict]:
+        responses = []
+        for action in actions:
+            try:
+                result = self.handle(action["action"], action.get("params", {}))
+                responses.append({"result": result, "error": None})
+            except Exception as e:
+                responses.append({"result": None, "error": str(e)})
+        return responses
+
+    def _validate_note(self, note: Dict) -> Dict[str, str]:
+        if note["deckName"] not in self.decks:
+            raise Exception(f"deck was not found: {note['deckName']}")
+        if note["modelName"] not in self.models:
+            raise Exception(f"model was not found: {note['modelName']}")
+
+        model_fields = self.models[note["modelName"]]
+        fields = {name: "" for name in model_fields}
+        for name, value in note["fields"].items():
+            if name not in fields:
+                raise Exception(f"field was not found: {name}")
+            fields[name] = value
+
+        first_field = fields[model_fields[0]]
+        if not first_field.strip():
+            raise Exception("cannot create note because it is empty")
+
+        options = note.get("options") or {}
+        if not options.get("allowDuplicate", False) and self._is_duplicate(
+            note, first_field, options.get("duplicateScope")
+        ):
+            raise Exception("cannot create note because it is a duplicate")
+        return fields
+
+    def _is_duplicate(self, note: Dict, first_field: str, scope: Optional[str]) -> bool:
+        first_name = self.models[note["modelName"]][0]
+        return any(
+            stored["modelName"] == note["modelName"]
+            and stored["fields"][first_name] == first_field
+            and (scope != "deck" or stored["deckName"] == note["deckName"])
+            for stored in self.notes.values()
+        )
+
+    def _get_note(self, note_id: int) -> Dict:
+        if note_id not in self.notes:
+            raise Exception(f"note was not found: {note_id}")
+        return self.notes[note_id]
+
+    def _note_info(self, note_id: int) -> Dict:
+        stored = self.notes.get(note_id)
+        if stored is None:
+            return {}
+        return {
+            "noteId": note_id,
+            "modelName": stored["modelName"],
+            "tags": list(stored["tags"]),
+            "fields": {
+                name: {"value": value, "order": order}
+                for order, (name, value) in enumerate(stored["fields"].items())
+            },
+            "mod": stored["mod"],
+            "cards": [note_id],
+        }
+
+
+class FakeAnkiConnectServer:
+    """
+    A local HTTP server speaking the AnkiConnect protocol on top of a `FakeAnkiCollection`.
+
+    `latency` and `jitter` (seconds) delay every response and `connect_latency` delays every new connection,
+    to approximate a slow link such as the one between WSL and Windows.
+
+    Example:
+        with FakeAnkiConnectServer(latency=0.002) as server:
+            connection = AnkiConnection(url=server.url, api_version=6)
+    """
+
+    def __init__(
+        self,
+        collection: Optional[FakeAnkiCollection] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        connect_latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.collection = collection or FakeAnkiCollection()
+        self.latency = latency
+        self.jitter = jitter
+        self.connect_latency = connect_latency
+        self.requests: List[str] = []
+        self._random = random.Random(seed)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeAnkiConnectServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def respond(self, body: bytes) -> bytes:
+        payload = json.loads(body)
+        action = payload.get("action")
+        self.requests.append(action)
+
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        try:
+            result = self.collection.handle(action, payload.get("params") or {})
+            response = {"result": result, "error": None}
+        except Exception as e:
+            response = {"result": None, "error": str(e)}
+        return json.dumps(response).encode("utf-8")
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Buffer the response so headers and body leave in one segment; otherwise
+            # Nagle plus delayed ACKs add ~40 ms to every keep-alive round trip.
+            wbufsize = -1
+
+            def setup(self):
+                if server.connect_latency:
+                    time.sleep(server.connect_latency)
+                super().setup()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                response = server.respond(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,156 @@
+"""
+Field mapping between Anki note types and `AnkiNote`.
+
+A `FieldPlan` is compiled once per note type from its field names (as returned by `modelFieldNames`, or as
+listed by `notesInfo`). It maps every Anki field to a precompiled accessor: `front` and `back` map to the
+attributes of the same name, and every other field to `AnkiNote.extra_fields` under its Anki name; field names
+are matched case-insensitively, as in Anki. Note types without a front or a back keep all their fields in
+`extra_fields`. Building, diffing and reading notes then goes through those accessors instead of
+resolving field names note by note.
+"""
+
+import functools
+import operator
+from json.encoder import encode_basestring_ascii as _encode_string
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from .domain import AnkiNote
+
+CORE_FIELDS = ("front", "back")
+
+FieldGetter = Callable[[AnkiNote], str]
+FieldSetter = Callable[[AnkiNote, str], None]
+
+
+@functools.lru_cache(maxsize=None)
+def field_getter(name: str) -> FieldGetter:
+    lower_name = name.lower()
+    if lower_name in CORE_FIELDS:
+        return operator.attrgetter(lower_name)
+
+    def get(note: AnkiNote) -> str:
+        value = note.extra_fields.get(name)
+        if value is None:
+            # A field named by the user rather than as in Anki.
+            value = next(
+                (
+                    field_value
+                    for field_name, field_value in note.extra_fields.items()
+                    if field_name.lower() == lower_name
+                ),
+                "",
+            )
+        return value
+
+    return get
+
+
+@functools.lru_cache(maxsize=None)
+def field_setter(name: str) -> FieldSetter:
+    if name.lower() in CORE_FIELDS:
+        attribute = name.lower()
+        return lambda note, value: setattr(note, attribute, value)
+    return lambda note, value: note.extra_fields.__setitem__(name, value)
+
+
+class FieldPlan:
+    """
+    How the fields of one Anki note type map to `AnkiNote`.
+
+    Attributes:
+        model_name (str): The Anki note type.
+        field_names (Tuple[str, ...]): The Anki field names, in the note type's order.
+
+    Methods:
+        values(note): The Anki field values of a note.
+        encode_values(note): The same values, encoded as a JSON object.
+        record(values): Keyword arguments building an AnkiNote from Anki field values.
+        resolve(name): The Anki field name matching a field name given by the user.
+        unknown(names): The field names the note type does not have.
+        diff(new_note, existing_note, field_names): Copies changed fields onto the existing note and returns them.
+    """
+
+    def __init__(self, model_name: str, field_names: Sequence[str]) -> None:
+        self.model_name = model_name
+        self.field_names = tuple(field_names)
+        self._getters = tuple(field_getter(name) for name in self.field_names)
+        self._setters = {name: field_setter(name) for name in self.field_names}
+        self._encoded_names = tuple(_encode_string(name) for name in self.field_names)
+        self._by_lower_name = {name.lower(): name for name in self.field_names}
+
+    def values(self, note: AnkiNote) -> Dict[str, str]:
+        return {name: get(note) for name, get in zip(self.field_names, self._getters)}
+
+    def encode_values(self, note: AnkiNote) -> str:
+        encoded = ", ".join(
+            f"{encoded_name}: {_encode_string(get(note))}"
+            for encoded_name, get in zip(self._encoded_names, self._getters)
+        )
+        return f"{{{encoded}}}"
+
+    def record(self, values: Dict[str, str]) -> Dict:
+        record = {"extra_fields": {}}
+        for name in self.field_names:
+            if name not in values:
+                continue
+            if name.lower() in CORE_FIELDS:
+                record[name.lower()] = values[name]
+            else:
+                record["extra_fields"][name] = values[name]
+        return record
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self._by_lower_name.get(name.lower())
+
+    def unknown(self, names: Iterable[str]) -> List[str]:
+        """The field names the note type does not have."""
+        return [name for name in names if self.resolve(name) is None]
+
+    def diff(
+        self, new_note: AnkiNote, existing_note: AnkiNote, field_names: Iterable[str]
+    ) -> Dict[str, str]:
+        changes = {}
+        for field_name in field_names:
+            name = self.resolve(field_name)
+            if name is None:
+                continue
+            new_value = field_getter(name)(new_note)
+            if new_value != field_getter(name)(existing_note):
+                self._setters[name](existing_note, new_value)
+                changes[name] = new_value
+        return changes
+
+
+class FieldPlans:
+    """
+    Compiled field plans by note type.
+
+    Plans are added from `modelFieldNames` results with `add`, or from the notes returned by `notesInfo` with
+    `from_note_info`, so a note type is only ever compiled once.
+    """
+
+    def __init__(self) -> None:
+        self._plans: Dict[str, FieldPlan] = {}
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self._plans
+
+    def get(self, model_name: str) -> Optional[FieldPlan]:
+        return self._plans.get(model_name)
+
+    def add(self, model_name: str, field_names: Sequence[str]) -> FieldPlan:
+        plan = self._plans[model_name] = FieldPlan(model_name, field_names)
+        return plan
+
+    def missing(self, model_names: Iterable[str]) -> List[str]:
+        return sorted(
+            {model_name for model_name in model_names} - set(self._plans.keys())
+        )
+
+    def from_note_info(self, note_info: Dict) -> FieldPlan:
+        plan = self._plans.get(note_info["modelName"])
+        if plan is None:
+            fields = note_info["fields"]
+            field_names = sorted(fields, key=lambda name: fields[name].get("order", 0))
+            plan = self.add(note_info["modelName"], field_names)
+        return plan
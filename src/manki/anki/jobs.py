@@ -0,0 +1,221 @@
+"""
+Several imports in one run. Every job imports one input into one deck, and all jobs share the importer, its
+connection pool and caches. Jobs for different decks run concurrently up to a limit, while jobs for the same
+deck run one after the other in the order they are listed.
+
+Jobs can also be written into a single `.apkg` package, to import in one go or to ship as a deck.
+"""
+
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from manki.utils import setup_logger
+
+from .domain import AnkiNote, MatchStrategy
+from .package import write_package
+from .pipeline import DEFAULT_QUEUE_SIZE, ImportPipeline, StageStats
+from .sources import MarkdownAnkiFileParser, VocabularyAnkiFileParser
+from .xport import AnkiImporterExporter
+
+logger = setup_logger(name=__name__)
+
+DEFAULT_FILES_PER_BATCH = 100
+DEFAULT_NOTES_PER_BATCH = 500
+DEFAULT_MAX_CONCURRENT_DECKS = 2
+
+
+class ImportJob(BaseModel):
+    input_path: str
+    deck_name: str
+    model_name: str = "basic"
+    source_lang: Optional[str] = None
+    target_lang: Optional[str] = None
+    reference_fields: List[str] = ["front", "back"]
+    changing_fields: Optional[List[str]] = None
+    match_strategy: MatchStrategy = MatchStrategy.DECK
+    manifest: Optional[str] = None
+    verify_manifest: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.input_path} -> {self.deck_name}"
+
+
+@dataclass
+class JobResult:
+    """
+    Outcome of an import job.
+
+    Attributes:
+        job (ImportJob): The job.
+        stats (List[StageStats]): The stats of every pipeline stage, when the job completed.
+        error (Optional[str]): Why the job failed, if it did.
+    """
+
+    job: ImportJob
+    stats: List[StageStats] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "input_path": self.job.input_path,
+            "deck_name": self.job.deck_name,
+            "error": self.error,
+            "pipeline": [stage_stats.to_dict() for stage_stats in self.stats],
+        }
+
+
+def load_jobs(path: str, defaults: Optional[Dict] = None) -> List[ImportJob]:
+    """
+    Loads jobs from a JSON file holding a list of objects with the fields of `ImportJob`. Fields missing from
+    a job are taken from `defaults`.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        entries = json.load(file)
+    if not isinstance(entries, list):
+        raise Exception(f"Expected a list of jobs in {path}.")
+
+    defaults = {
+        name: value for name, value in (defaults or {}).items() if value is not None
+    }
+    return [ImportJob(**{**defaults, **entry}) for entry in entries]
+
+
+def run_jobs(
+    importer_exporter: AnkiImporterExporter,
+    jobs: List[ImportJob],
+    max_concurrent_decks: int = DEFAULT_MAX_CONCURRENT_DECKS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> List[JobResult]:
+    """Runs the jobs and returns their results in the order of `jobs`; a failed job does not stop the others."""
+    jobs_by_deck: Dict[str, List[ImportJob]] = {}
+    for job in jobs:
+        jobs_by_deck.setdefault(job.deck_name, []).append(job)
+
+    def run_deck(deck_jobs: List[ImportJob]) -> List[JobResult]:
+        return [run_job(importer_exporter, job, queue_size) for job in deck_jobs]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_decks)) as executor:
+        deck_results = list(executor.map(run_deck, jobs_by_deck.values()))
+
+    results = {
+        id(result.job): result for deck_result in deck_results for result in deck_result
+    }
+    return [results[id(job)] for job in jobs]
+
+
+def package_jobs(
+    jobs: List[ImportJob], output_file: str, media_folder: Optional[str] = None
+) -> int:
+    """
+    Writes the notes of every job into one `.apkg` package instead of importing them through AnkiConnect, and
+    returns how many notes were written. Sound files referenced by the notes are taken from `media_folder`.
+    """
+    batches = (
+        anki_notes
+        for job in jobs
+        for anki_notes in iter_note_batches(
+            Path(job.input_path),
+            job.deck_name,
+            job.model_name,
+            job.source_lang,
+            job.target_lang,
+        )
+    )
+    return write_package(output_file, batches, media_folder=media_folder)
+
+
+def run_job(
+    importer_exporter: AnkiImporterExporter,
+    job: ImportJob,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> JobResult:
+    logger.info(f"Starting job {job.name}")
+    try:
+        batches = iter_note_batches(
+            Path(job.input_path),
+            job.deck_name,
+            job.model_name,
+            job.source_lang,
+            job.target_lang,
+        )
+        pipeline = ImportPipeline(
+            importer_exporter,
+            job.deck_name,
+            reference_fields=job.reference_fields,
+            changing_fields=job.changing_fields,
+            match_strategy=job.match_strategy,
+            allow_duplicates=False,
+            manifest_path=job.manifest,
+            verify_manifest=job.verify_manifest,
+            queue_size=queue_size,
+            shuffle=True,
+        )
+        stats = pipeline.run(batches)
+    except Exception as e:
+        logger.error(f"Job {job.name} failed: {e}")
+        return JobResult(job, error=str(e))
+
+    logger.info(f"Finished job {job.name}")
+    return JobResult(job, stats)
+
+
+def iter_note_batches(
+    input_path: Path,
+    deck_name: str,
+    model_name: str,
+    source_lang: Optional[str] = None,
+    target_lang: Optional[str] = None,
+    files_per_batch: int = DEFAULT_FILES_PER_BATCH,
+    notes_per_batch: int = DEFAULT_NOTES_PER_BATCH,
+) -> Iterator[List[AnkiNote]]:
+    """
+    Returns an iterator parsing the input lazily into batches of notes: markdown files are parsed
+    `files_per_batch` at a time, and the notes of every parse are split into batches of `notes_per_batch`.
+    The input is checked before returning, so invalid paths fail right away.
+    """
+    if input_path.is_dir():
+        print(f"Processing markdown files in directory: {input_path}")
+        parser = MarkdownAnkiFileParser(deck_name=deck_name, model_name=model_name)
+        files = sorted(str(md_file) for md_file in input_path.glob("*.md"))
+        file_groups = [
+            files[start : start + files_per_batch]
+            for start in range(0, len(files), files_per_batch)
+        ]
+        parses = [functools.partial(parser.parse, group) for group in file_groups]
+
+    elif input_path.is_file():
+        if input_path.suffix == ".md":
+            print(f"Parsing markdown file: {input_path}")
+            parser = MarkdownAnkiFileParser(deck_name=deck_name, model_name=model_name)
+            parses = [functools.partial(parser.parse, [str(input_path)])]
+
+        elif input_path.suffix == ".json" and source_lang and target_lang:
+            print(f"Parsing vocabulary file: {input_path}")
+            parser = VocabularyAnkiFileParser(
+                deck_name=deck_name, model_name=model_name
+            )
+            parses = [
+                functools.partial(
+                    parser.parse, [str(input_path)], source_lang, target_lang
+                )
+            ]
+
+        else:
+            raise ValueError(
+                "Invalid file format or missing source/target language for vocabulary files."
+            )
+    else:
+        raise ValueError("The provided path is neither a file nor a directory.")
+
+    return (
+        anki_notes[start : start + notes_per_batch]
+        for anki_notes in (parse() for parse in parses)
+        for start in range(0, len(anki_notes), notes_per_batch)
+    )
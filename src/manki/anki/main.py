@@ -1,10 +1,22 @@
 import argparse
-import random
-from pathlib import Path
+import json
+from typing import Dict
 
+from manki.anki.cache import AnkiCache
 from manki.anki.connection import AnkiConnection
-from manki.anki.sources import MarkdownAnkiFileParser, VocabularyAnkiFileParser
+from manki.anki.domain import MatchStrategy
+from manki.anki.jobs import (
+    DEFAULT_MAX_CONCURRENT_DECKS,
+    ImportJob,
+    load_jobs,
+    package_jobs,
+    run_jobs,
+)
+from manki.anki.pipeline import DEFAULT_QUEUE_SIZE
 from manki.anki.xport import AnkiImporterExporter
+from manki.utils import setup_logger
+
+logger = setup_logger(name=__name__)
 
 
 def parse_args():
@@ -13,10 +25,26 @@ def parse_args():
     )
     parser.add_argument(
         "input_path",
+        nargs="?",
         help="Path to the input file or directory.",
     )
     parser.add_argument(
-        "deck_name", help="Name of the Anki deck to import the cards into."
+        "deck_name",
+        nargs="?",
+        help="Name of the Anki deck to import the cards into.",
+    )
+    parser.add_argument(
+        "--jobs",
+        help="JSON file listing import jobs (input_path, deck_name and optionally model_name, source_lang, "
+        "target_lang, reference_fields, changing_fields, match_strategy, manifest) to run in one process "
+        "instead of a single input; options given here are the defaults of every job.",
+        default=None,
+    )
+    parser.add_argument(
+        "--max-concurrent-decks",
+        type=int,
+        help="How many decks the jobs import into at the same time.",
+        default=DEFAULT_MAX_CONCURRENT_DECKS,
     )
     parser.add_argument(
         "--source-lang",
@@ -33,78 +61,131 @@ def parse_args():
     parser.add_argument(
         "--model-name",
         help="Name of the Anki model.",
-        default="basic",
+        default=None,
     )
     parser.add_argument(
         "--reference-fields",
         nargs="+",
         help="Fields to use as reference.",
-        default=["front", "back"],
+        default=None,
     )
     parser.add_argument(
         "--changing-fields",
         nargs="+",
-        help="Fields to update in existing notes.",
+        help="Fields to update in existing notes; `tags` syncs their tags.",
+        default=None,
+    )
+    parser.add_argument(
+        "--match-strategy",
+        help="How to match incoming notes against the deck: one query per note, queries batching many notes, "
+        "one fetch of the whole deck (the default), or the identity key tag of each note.",
+        choices=[strategy.value for strategy in MatchStrategy],
+        default=None,
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Path of a local sync manifest; notes unchanged since the last sync skip Anki entirely.",
+        default=None,
+    )
+    parser.add_argument(
+        "--verify-manifest",
+        action="store_true",
+        help="Check notes the manifest considers unchanged against Anki and re-sync those that drifted.",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help="Batches each import stage may get ahead of the next one.",
+        default=DEFAULT_QUEUE_SIZE,
+    )
+    parser.add_argument(
+        "--apkg",
+        help="Write the notes to this .apkg package instead of importing them through AnkiConnect.",
+        default=None,
+    )
+    parser.add_argument(
+        "--media-folder",
+        help="With --apkg, folder holding the sound files the notes reference, to include them in the package.",
         default=None,
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--stats-file",
+        help="Write per-action AnkiConnect round-trip stats as JSON to this path.",
+        default=None,
+    )
+    args = parser.parse_args()
+    if not args.jobs and not (args.input_path and args.deck_name):
+        parser.error("input_path and deck_name are required unless --jobs is given")
+    return args
 
 
 def main():
     args = parse_args()
 
-    input_path = Path(args.input_path)
-    deck_name = args.deck_name
-    model_name = args.model_name
-    source_lang = args.source_lang
-    target_lang = args.target_lang
-    reference_fields = args.reference_fields
-    changing_fields = args.changing_fields
-
-    anki_connection = AnkiConnection()
-    importer_exporter = AnkiImporterExporter(anki_connection=anki_connection)
-
-    anki_notes = []
-
-    if input_path.is_dir():
-        print(f"Processing markdown files in directory: {input_path}")
-        parser = MarkdownAnkiFileParser(deck_name=deck_name, model_name=model_name)
-
-        files_to_parse = []
-        for md_file in input_path.glob("*.md"):
-            files_to_parse.append(str(md_file))
-        anki_notes.extend(parser.parse(files_to_parse))
-
-    elif input_path.is_file():
-        if input_path.suffix == ".md":
-            print(f"Parsing markdown file: {input_path}")
-            parser = MarkdownAnkiFileParser(deck_name=deck_name, model_name=model_name)
-            anki_notes = parser.parse([str(input_path)])
-
-        elif input_path.suffix == ".json" and source_lang and target_lang:
-            print(f"Parsing vocabulary file: {input_path}")
-            parser = VocabularyAnkiFileParser(
-                deck_name=deck_name, model_name=model_name
+    job_defaults = job_defaults_from_args(args)
+    if args.jobs:
+        jobs = load_jobs(args.jobs, job_defaults)
+    else:
+        jobs = [
+            ImportJob(
+                input_path=args.input_path,
+                deck_name=args.deck_name,
+                manifest=args.manifest,
+                **job_defaults,
             )
-            anki_notes = parser.parse([str(input_path)], source_lang, target_lang)
-
-        else:
-            raise ValueError(
-                "Invalid file format or missing source/target language for vocabulary files."
+        ]
+
+    if args.apkg:
+        notes_written = package_jobs(jobs, args.apkg, args.media_folder)
+        print(f"Wrote {notes_written} notes to {args.apkg}")
+        return
+
+    print(f"Running {len(jobs)} import jobs...")
+    results = []
+    with AnkiConnection(cache=AnkiCache()) as anki_connection:
+        importer_exporter = AnkiImporterExporter(anki_connection=anki_connection)
+        try:
+            results = run_jobs(
+                importer_exporter, jobs, args.max_concurrent_decks, args.queue_size
             )
-    else:
-        raise ValueError("The provided path is neither a file nor a directory.")
-
-    print(f"Updating and adding notes in deck '{deck_name}'...")
-    random.shuffle(anki_notes)
-    importer_exporter.import_and_update_notes(
-        input_file="",
-        anki_notes=anki_notes,
-        deck_name=deck_name,
-        model_name=model_name,
-        reference_fields=reference_fields,
-        changing_fields=changing_fields,
-        allow_duplicates=False,
+        finally:
+            dump_stats(
+                anki_connection,
+                args.stats_file,
+                {"jobs": [result.to_dict() for result in results]},
+            )
+
+    failed = [result for result in results if result.error]
+    if failed:
+        raise Exception(
+            f"{len(failed)} of {len(jobs)} jobs failed: "
+            + "; ".join(f"{result.job.name}: {result.error}" for result in failed)
+        )
+
+
+def job_defaults_from_args(args) -> Dict:
+    defaults = {
+        "model_name": args.model_name,
+        "source_lang": args.source_lang,
+        "target_lang": args.target_lang,
+        "reference_fields": args.reference_fields,
+        "changing_fields": args.changing_fields,
+        "match_strategy": args.match_strategy,
+        "verify_manifest": args.verify_manifest or None,
+    }
+    return {name: value for name, value in defaults.items() if value is not None}
+
+
+def dump_stats(anki_connection, stats_file=None, extra=None):
+    cache = anki_connection.cache
+    extra = dict(extra or {})
+    if cache is not None:
+        extra["cache"] = {"hits": cache.hits, "misses": cache.misses}
+    if stats_file:
+        anki_connection.stats.dump(stats_file, extra=extra)
+        print(f"AnkiConnect stats written to {stats_file}")
+    logger.info(
+        f"AnkiConnect stats: {json.dumps({**anki_connection.stats.to_dict(), **extra})}"
     )
 
 
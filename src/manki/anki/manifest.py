@@ -0,0 +1,127 @@
+"""
+Local manifest of what was last synced to a deck, so unchanged notes can skip Anki entirely.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from manki.utils import setup_logger
+
+from .domain import AnkiNote
+
+logger = setup_logger(name=__name__)
+
+
+class SyncManifest:
+    """
+    Maps the reference key of every note synced to a deck to its Anki note id and a hash of its content.
+
+    The hash covers the note content and the list of changing fields used for the sync, so running with a
+    different set of changing fields re-syncs every note once. A manifest saved for other reference fields or
+    another deck is ignored.
+
+    Methods:
+        load(path, deck_name, reference_fields, changing_fields): Loads the manifest, or starts an empty one.
+        save(): Writes the manifest back to its path.
+        is_unchanged(key, note): Whether the note was synced with the same content.
+        note_id(key): The Anki note id recorded for a key.
+        record(key, note): Records a synced note; the note must carry its Anki id.
+        discard(key): Forgets a note, e.g. after detecting drift.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        deck_name: str,
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]] = None,
+        entries: Optional[Dict[str, Tuple[int, str]]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.deck_name = deck_name
+        self.reference_fields = list(reference_fields)
+        self.changing_fields = sorted(changing_fields or [])
+        self.entries = entries or {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        deck_name: str,
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]] = None,
+    ) -> "SyncManifest":
+        manifest = cls(Path(path), deck_name, reference_fields, changing_fields)
+        if not manifest.path.exists():
+            return manifest
+
+        with open(manifest.path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+        if (
+            data.get("deck_name") != deck_name
+            or data.get("reference_fields") != manifest.reference_fields
+        ):
+            logger.warning(
+                f"Ignoring manifest {path}: it was built for another deck or reference fields"
+            )
+            return manifest
+
+        manifest.entries = {
+            key: (note_id, content_hash)
+            for key, (note_id, content_hash) in data["entries"].items()
+        }
+        return manifest
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "deck_name": self.deck_name,
+                    "reference_fields": self.reference_fields,
+                    "entries": self.entries,
+                },
+                file,
+                ensure_ascii=False,
+            )
+
+    @staticmethod
+    def key(reference_key: Tuple[str, ...]) -> str:
+        return "\x1f".join(reference_key)
+
+    def content_hash(self, note: AnkiNote) -> str:
+        content = {
+            "modelName": note.modelName,
+            "front": note.front,
+            "back": note.back,
+            "audio": note.audio,
+            "image": note.image,
+            "video": note.video,
+            "tags": note.tags,
+            "changing_fields": self.changing_fields,
+        }
+        if note.extra_fields:
+            # Only when present, so the hashes of front/back notes stay valid.
+            content["extra_fields"] = note.extra_fields
+        encoded = json.dumps(content, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+    def is_unchanged(self, key: str, note: AnkiNote) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry[1] == self.content_hash(note)
+
+    def note_id(self, key: str) -> Optional[int]:
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def record(self, key: str, note: AnkiNote) -> None:
+        self.entries[key] = (note.id, self.content_hash(note))
+
+    def discard(self, key: str) -> None:
+        self.entries.pop(key, None)
@@ -0,0 +1,444 @@
+"""
+Offline deck builds: writes notes and their media into an Anki package (`.apkg`) instead of sending them
+through AnkiConnect.
+
+A package is a zip holding a schema 11 SQLite collection (`collection.anki2`), a `media` JSON index and the
+media files themselves, stored under their position in the index. Importing the package in Anki adds every note
+and media file at once, and notes keep their `guid` across builds (the identity key of the note when it has one),
+so importing a newer build of the same deck updates the notes instead of duplicating them.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from manki.utils import paused_gc, setup_logger
+
+from .domain import AnkiNote, NoteType, NoteTypeFields, identity_key
+from .fields import FieldPlan
+
+logger = setup_logger(name=__name__)
+
+FIELD_SEPARATOR = "\x1f"
+DEFAULT_DECK_ID = 1
+DEFAULT_CONF_ID = 1
+
+COLLECTION_SCHEMA = """
+create table col (
+    id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+    ver integer not null, dty integer not null, usn integer not null, ls integer not null,
+    conf text not null, models text not null, decks text not null, dconf text not null,
+    tags text not null
+);
+create table notes (
+    id integer primary key, guid text not null, mid integer not null, mod integer not null,
+    usn integer not null, tags text not null, flds text not null, sfld integer not null,
+    csum integer not null, flags integer not null, data text not null
+);
+create table cards (
+    id integer primary key, nid integer not null, did integer not null, ord integer not null,
+    mod integer not null, usn integer not null, type integer not null, queue integer not null,
+    due integer not null, ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null, odid integer not null,
+    flags integer not null, data text not null
+);
+create table revlog (
+    id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+    ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null,
+    type integer not null
+);
+create table graves (usn integer not null, oid integer not null, type integer not null);
+create index ix_notes_usn on notes (usn);
+create index ix_cards_usn on cards (usn);
+create index ix_revlog_usn on revlog (usn);
+create index ix_cards_nid on cards (nid);
+create index ix_cards_sched on cards (did, queue, due);
+create index ix_revlog_cid on revlog (cid);
+create index ix_notes_csum on notes (csum);
+"""
+
+_SOUND_PATTERN = re.compile(r"\[sound:([^\]]+)\]")
+_HTML_PATTERN = re.compile(r"<[^>]*>")
+
+_COLLECTION_CONF = {
+    "activeDecks": [DEFAULT_DECK_ID],
+    "curDeck": DEFAULT_DECK_ID,
+    "newSpread": 0,
+    "collapseTime": 1200,
+    "timeLim": 0,
+    "estTimes": True,
+    "dueCounts": True,
+    "curModel": None,
+    "nextPos": 1,
+    "sortType": "noteFld",
+    "sortBackwards": False,
+    "addToCur": True,
+}
+
+_DECK_CONF = {
+    "id": DEFAULT_CONF_ID,
+    "name": "Default",
+    "mod": 0,
+    "usn": 0,
+    "maxTaken": 60,
+    "autoplay": True,
+    "timer": 0,
+    "replayq": True,
+    "dyn": False,
+    "new": {
+        "delays": [1, 10],
+        "ints": [1, 4, 0],
+        "initialFactor": 2500,
+        "order": 1,
+        "perDay": 20,
+        "bury": False,
+    },
+    "rev": {
+        "perDay": 200,
+        "ease4": 1.3,
+        "ivlFct": 1,
+        "maxIvl": 36500,
+        "bury": False,
+        "hardFactor": 1.2,
+    },
+    "lapse": {
+        "delays": [10],
+        "mult": 0,
+        "minInt": 1,
+        "leechFails": 8,
+        "leechAction": 1,
+    },
+}
+
+_CARD_CSS = """.card {
+    font-family: arial;
+    font-size: 20px;
+    text-align: center;
+    color: black;
+    background-color: white;
+}"""
+
+
+class AnkiPackageWriter:
+    """
+    Writes `AnkiNote`s and media files into an `.apkg` package.
+
+    Notes are written to the collection in one transaction per `add_notes` call and media files are streamed into
+    the zip as they are added, so the package is built batch by batch without holding every note in memory. The
+    package only appears at `output_file` once `close()` completes.
+
+    Every note type gets one card template showing its first field on the front and the other fields on the back.
+    Note types are described by `models` (name -> field names), falling back to the fields of the known note types.
+    With a `media_folder`, the files referenced by `[sound:...]` tags in the fields are packaged from that folder.
+
+    Attributes:
+        output_file (Path): The package to write.
+        media_folder (Optional[Path]): Folder holding the media files referenced by the notes.
+        notes_written (int): Notes written so far.
+
+    Methods:
+        add_notes(anki_notes): Writes a batch of notes and their media.
+        add_media(path, filename): Adds a media file under `filename` (by default its own name).
+        close(): Finishes the collection and the package.
+
+    Example:
+        with AnkiPackageWriter("vocabulary.apkg", media_folder="media") as package:
+            for anki_notes in batches:
+                package.add_notes(anki_notes)
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        models: Optional[Dict[str, Sequence[str]]] = None,
+        media_folder: Optional[str] = None,
+    ) -> None:
+        self.output_file = Path(output_file)
+        if self.output_file.suffix != ".apkg":
+            raise Exception("Can only write packages to .apkg")
+        self.media_folder = Path(media_folder) if media_folder else None
+        self.notes_written = 0
+
+        self._models = dict(models or {})
+        self._plans: Dict[str, FieldPlan] = {}
+        self._model_ids: Dict[str, int] = {}
+        self._deck_ids: Dict[str, int] = {"Default": DEFAULT_DECK_ID}
+        self._guids: Set[str] = set()
+        self._media: Dict[str, str] = {}
+        self._media_names: Set[str] = set()
+        self._created_at = int(time.time())
+        # Note and card ids are creation times in milliseconds in Anki.
+        self._ids = itertools.count(self._created_at * 1000)
+
+        self._work_dir = Path(tempfile.mkdtemp(prefix="manki-apkg-"))
+        self._collection_path = self._work_dir / "collection.anki2"
+        self._db = sqlite3.connect(str(self._collection_path))
+        # A scratch file until it is zipped: no journal or syncs needed.
+        self._db.execute("pragma journal_mode = off")
+        self._db.execute("pragma synchronous = off")
+        self._db.executescript(COLLECTION_SCHEMA)
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._partial_file = self.output_file.with_name(f".{self.output_file.name}.tmp")
+        self._zip = zipfile.ZipFile(self._partial_file, "w", zipfile.ZIP_STORED)
+
+    def __enter__(self) -> "AnkiPackageWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def add_notes(self, anki_notes: Iterable[AnkiNote]) -> int:
+        """Writes the notes in one transaction and returns how many were written; repeated notes are skipped."""
+        notes, cards = [], []
+        modified_at = int(time.time())
+        with paused_gc():
+            for anki_note in anki_notes:
+                guid = self._guid(anki_note)
+                if guid in self._guids:
+                    logger.warning(f"Skipping repeated note '{anki_note.label}'")
+                    continue
+                self._guids.add(guid)
+
+                values = self._field_values(anki_note)
+                tags = anki_note.anki_tags
+                note_id, card_id = next(self._ids), next(self._ids)
+                notes.append(
+                    (
+                        note_id,
+                        guid,
+                        self._model_id(anki_note.modelName),
+                        modified_at,
+                        f" {' '.join(tags)} " if tags else "",
+                        FIELD_SEPARATOR.join(values),
+                        _HTML_PATTERN.sub("", values[0]),
+                        field_checksum(values[0]),
+                    )
+                )
+                position = self.notes_written + len(notes)
+                cards.append(
+                    (
+                        card_id,
+                        note_id,
+                        self._deck_id(anki_note.deckName),
+                        modified_at,
+                        position,
+                    )
+                )
+
+        with self._db:
+            self._db.executemany(
+                "insert into notes values (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')", notes
+            )
+            # New cards, due in the order they were added.
+            self._db.executemany(
+                "insert into cards values (?, ?, ?, 0, ?, -1, 0, 0, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                cards,
+            )
+        self.notes_written += len(notes)
+        return len(notes)
+
+    def add_media(self, path: str, filename: Optional[str] = None) -> str:
+        filename = filename or os.path.basename(path)
+        if filename not in self._media_names:
+            entry = str(len(self._media))
+            self._zip.write(path, entry)
+            self._media[entry] = filename
+            self._media_names.add(filename)
+        return filename
+
+    def close(self) -> None:
+        now_ms = int(time.time() * 1000)
+        with self._db:
+            self._db.execute(
+                "insert into col values (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, '{}')",
+                (
+                    self._created_at - self._created_at % 86400,
+                    now_ms,
+                    now_ms,
+                    json.dumps(_COLLECTION_CONF),
+                    json.dumps(self._model_dicts()),
+                    json.dumps(self._deck_dicts()),
+                    json.dumps({str(DEFAULT_CONF_ID): _DECK_CONF}),
+                ),
+            )
+        self._db.close()
+
+        # Media files are compressed already, the collection is not.
+        self._zip.write(
+            self._collection_path,
+            "collection.anki2",
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+        self._zip.writestr("media", json.dumps(self._media))
+        self._zip.close()
+        os.replace(self._partial_file, self.output_file)
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+        logger.info(
+            f"Wrote {self.notes_written} notes and {len(self._media)} media files to {self.output_file}"
+        )
+
+    def _discard(self) -> None:
+        self._db.close()
+        self._zip.close()
+        self._partial_file.unlink(missing_ok=True)
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+    def _field_values(self, anki_note: AnkiNote) -> List[str]:
+        plan = self._plan(anki_note.modelName)
+        values = plan.values(anki_note)
+        audio = anki_note.audio or {}
+        if audio.get("path"):
+            # AnkiConnect's `audio` attachment: store the file and add its sound tag to the listed fields.
+            filename = self.add_media(audio["path"], audio.get("filename"))
+            for field_name in audio.get("fields") or []:
+                name = plan.resolve(field_name)
+                if name is not None:
+                    values[name] += f"[sound:{filename}]"
+
+        if self.media_folder is not None:
+            for value in values.values():
+                for filename in _SOUND_PATTERN.findall(value):
+                    self._add_referenced_media(filename)
+        return list(values.values())
+
+    def _add_referenced_media(self, filename: str) -> None:
+        if filename in self._media_names:
+            return
+        path = self.media_folder / filename
+        if path.is_file():
+            self.add_media(str(path), filename)
+        else:
+            logger.warning(f"Media file not found: {path}")
+
+    def _plan(self, model_name: str) -> FieldPlan:
+        plan = self._plans.get(model_name)
+        if plan is None:
+            field_names = self._models.get(model_name)
+            if field_names is None:
+                field_names = NoteTypeFields.get_fields(NoteType(model_name))
+            plan = self._plans[model_name] = FieldPlan(model_name, field_names)
+        return plan
+
+    def _model_id(self, model_name: str) -> int:
+        # Stable across builds, so Anki recognises the note type when a newer package is imported.
+        if model_name not in self._model_ids:
+            self._model_ids[model_name] = _stable_id(model_name)
+        return self._model_ids[model_name]
+
+    def _deck_id(self, deck_name: str) -> int:
+        if deck_name not in self._deck_ids:
+            self._deck_ids[deck_name] = _stable_id(deck_name)
+        return self._deck_ids[deck_name]
+
+    @staticmethod
+    def _guid(anki_note: AnkiNote) -> str:
+        return anki_note.key or identity_key(
+            anki_note.deckName, anki_note.modelName, anki_note.label
+        )
+
+    def _model_dicts(self) -> Dict[str, Dict]:
+        models = {}
+        for model_name, model_id in self._model_ids.items():
+            field_names = self._plans[model_name].field_names
+            answer = "\n".join(f"{{{{{name}}}}}" for name in field_names[1:])
+            models[str(model_id)] = {
+                "id": model_id,
+                "name": model_name,
+                "type": 0,
+                "mod": self._created_at,
+                "usn": -1,
+                "sortf": 0,
+                "did": DEFAULT_DECK_ID,
+                "tmpls": [
+                    {
+                        "name": "Card 1",
+                        "ord": 0,
+                        "qfmt": f"{{{{{field_names[0]}}}}}",
+                        "afmt": f"{{{{FrontSide}}}}\n\n<hr id=answer>\n\n{answer}",
+                        "bqfmt": "",
+                        "bafmt": "",
+                        "did": None,
+                        "bfont": "",
+                        "bsize": 0,
+                    }
+                ],
+                "flds": [
+                    {
+                        "name": name,
+                        "ord": order,
+                        "sticky": False,
+                        "rtl": False,
+                        "font": "Arial",
+                        "size": 20,
+                        "media": [],
+                    }
+                    for order, name in enumerate(field_names)
+                ],
+                "css": _CARD_CSS,
+                "latexPre": "\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n"
+                "\\usepackage[utf8]{inputenc}\n\\usepackage{amssymb,amsmath}\n\\pagestyle{empty}\n"
+                "\\setlength{\\parindent}{0in}\n\\begin{document}\n",
+                "latexPost": "\\end{document}",
+                "latexsvg": False,
+                "req": [[0, "any", [0]]],
+                "tags": [],
+                "vers": [],
+            }
+        return models
+
+    def _deck_dicts(self) -> Dict[str, Dict]:
+        return {
+            str(deck_id): {
+                "id": deck_id,
+                "name": deck_name,
+                "desc": "",
+                "mod": self._created_at,
+                "usn": -1,
+                "collapsed": False,
+                "browserCollapsed": False,
+                "newToday": [0, 0],
+                "revToday": [0, 0],
+                "lrnToday": [0, 0],
+                "timeToday": [0, 0],
+                "dyn": 0,
+                "conf": DEFAULT_CONF_ID,
+                "extendNew": 0,
+                "extendRev": 0,
+            }
+            for deck_name, deck_id in self._deck_ids.items()
+        }
+
+
+def write_package(
+    output_file: str,
+    batches: Iterable[List[AnkiNote]],
+    models: Optional[Dict[str, Sequence[str]]] = None,
+    media_folder: Optional[str] = None,
+) -> int:
+    """Writes every batch of notes into a package at `output_file` and returns how many notes were written."""
+    with AnkiPackageWriter(output_file, models, media_folder) as package:
+        for anki_notes in batches:
+            package.add_notes(anki_notes)
+    return package.notes_written
+
+
+def _stable_id(name: str) -> int:
+    return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:10], 16)
+
+
+def field_checksum(first_field: str) -> int:
+    """The `csum` of a note: the first 8 hex digits of the SHA-1 of its first field, with HTML stripped."""
+    stripped = _HTML_PATTERN.sub("", first_field)
+    return int(hashlib.sha1(stripped.encode("utf-8")).hexdigest()[:8], 16)
@@ -0,0 +1,310 @@
+"""
+Staged import of notes into a deck: parse, normalize, match and write, each stage on its own thread.
+
+Stages are connected by bounded queues, so a stage that gets ahead blocks until the next one catches up, and
+parsing later inputs overlaps with the AnkiConnect round trips of earlier batches. Every stage counts the
+batches and notes it handled and the time it spent on them.
+"""
+
+import queue
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from manki.utils import setup_logger
+
+from .domain import AnkiNote, MatchStrategy, WriteReport
+from .manifest import SyncManifest
+from .xport import DEFAULT_CHUNK_SIZE, AnkiImporterExporter
+
+logger = setup_logger(name=__name__)
+
+DEFAULT_QUEUE_SIZE = 2
+
+Stage = Callable[[List[AnkiNote]], List[AnkiNote]]
+
+
+@dataclass
+class StageStats:
+    """
+    Throughput counters of one pipeline stage.
+
+    Attributes:
+        name (str): The stage name.
+        batches (int): Batches handled.
+        notes_in (int): Notes received.
+        notes_out (int): Notes passed on (for the last stage, notes written).
+        busy_seconds (float): Time spent handling batches, excluding the time spent waiting on the queues.
+    """
+
+    name: str
+    batches: int = 0
+    notes_in: int = 0
+    notes_out: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def notes_per_second(self) -> float:
+        return self.notes_in / self.busy_seconds if self.busy_seconds else 0.0
+
+    def observe(self, notes_in: int, notes_out: int, seconds: float) -> None:
+        self.batches += 1
+        self.notes_in += notes_in
+        self.notes_out += notes_out
+        self.busy_seconds += seconds
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "notes_per_second": self.notes_per_second}
+
+
+def run_pipeline(
+    source: Iterable[List[AnkiNote]],
+    stages: List[Tuple[str, Stage]],
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> List[StageStats]:
+    """
+    Runs `stages` over the batches of `source`, each on its own thread, and returns their stats, starting with
+    the `parse` stage iterating `source`. Batches keep their order; empty batches are not passed on.
+
+    The first exception raised by any stage stops the pipeline and is re-raised here.
+    """
+    stats = [StageStats("parse")] + [StageStats(name) for name, _ in stages]
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    done = object()
+
+    def fail(error: BaseException) -> None:
+        errors.append(error)
+        stop.set()
+
+    def put(items: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(items: queue.Queue):
+        while not stop.is_set():
+            try:
+                return items.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return done
+
+    def produce() -> None:
+        iterator = iter(source)
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = next(iterator, done)
+                if batch is done:
+                    break
+                stats[0].observe(len(batch), len(batch), time.perf_counter() - start)
+                if batch and not put(queues[0], batch):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            put(queues[0], done)
+
+    def consume(position: int, stage: Stage) -> None:
+        inputs = queues[position]
+        outputs = queues[position + 1] if position + 1 < len(queues) else None
+        try:
+            while True:
+                batch = get(inputs)
+                if batch is done:
+                    break
+                start = time.perf_counter()
+                result = stage(batch)
+                stats[position + 1].observe(
+                    len(batch), len(result or []), time.perf_counter() - start
+                )
+                if outputs is not None and result and not put(outputs, result):
+                    return
+        except BaseException as e:
+            fail(e)
+        finally:
+            if outputs is not None:
+                put(outputs, done)
+
+    threads = [threading.Thread(target=produce, name="parse", daemon=True)]
+    threads.extend(
+        threading.Thread(target=consume, args=(position, stage), name=name, daemon=True)
+        for position, (name, stage) in enumerate(stages)
+    )
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    finally:
+        stop.set()
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+def log_stage_stats(stats: List[StageStats]) -> None:
+    for stage_stats in stats:
+        logger.info(
+            f"Stage '{stage_stats.name}': {stage_stats.batches} batches, "
+            f"{stage_stats.notes_in} notes in, {stage_stats.notes_out} out, "
+            f"{stage_stats.busy_seconds:.2f}s busy ({stage_stats.notes_per_second:.0f} notes/s)"
+        )
+
+
+class ImportPipeline:
+    """
+    Imports batches of notes into a deck through the normalize, match and write stages.
+
+    `normalize` drops notes already seen earlier in the run (by their match key) and, with a manifest, the notes
+    unchanged since the last sync. `match` updates the notes that already exist in the deck, and `write` adds
+    the others. The deck index of the `deck` and `key` strategies is built once and shared by all batches.
+
+    Attributes:
+        importer_exporter (AnkiImporterExporter): The importer used to talk to Anki.
+        deck_name (str): The deck notes are imported into.
+
+    Methods:
+        run(batches): Runs the pipeline over the batches and returns the stats of every stage.
+        normalize(batch): The normalize stage.
+        match(batch): The match stage.
+        write(batch): The write stage.
+    """
+
+    def __init__(
+        self,
+        importer_exporter: AnkiImporterExporter,
+        deck_name: str,
+        reference_fields: List[str] = ["front", "back"],
+        changing_fields: Optional[List[str]] = None,
+        match_strategy: MatchStrategy = MatchStrategy.DECK,
+        allow_duplicates: bool = False,
+        manifest_path: Optional[str] = None,
+        verify_manifest: bool = False,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        shuffle: bool = False,
+    ) -> None:
+        self.importer_exporter = importer_exporter
+        self.deck_name = deck_name
+        self.reference_fields = reference_fields
+        self.changing_fields = changing_fields
+        self.match_strategy = MatchStrategy(match_strategy)
+        self.allow_duplicates = allow_duplicates
+        self.manifest_path = manifest_path
+        self.verify_manifest = verify_manifest
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.shuffle = shuffle
+
+        self._manifest: Optional[SyncManifest] = None
+        self._deck_ready = False
+        self._deck_index: Optional[Dict[Hashable, AnkiNote]] = None
+        self._seen: Set[Hashable] = set()
+        # Manifest keys of the notes whose update failed.
+        self._failed_updates: Set[str] = set()
+
+    def run(self, batches: Iterable[List[AnkiNote]]) -> List[StageStats]:
+        if self.manifest_path:
+            self._manifest = SyncManifest.load(
+                self.manifest_path,
+                self.deck_name,
+                self.reference_fields,
+                self.changing_fields,
+            )
+
+        stats = run_pipeline(
+            batches,
+            [
+                ("normalize", self.normalize),
+                ("match", self.match),
+                ("write", self.write),
+            ],
+            self.queue_size,
+        )
+
+        if not self._deck_ready:
+            logger.info("All notes are unchanged since the last sync")
+        if self._manifest is not None:
+            self._manifest.save()
+        log_stage_stats(stats)
+        return stats
+
+    def normalize(self, batch: List[AnkiNote]) -> List[AnkiNote]:
+        by_key = self.match_strategy == MatchStrategy.KEY
+        unique = []
+        for anki_note in batch:
+            match_key = self.importer_exporter._match_key(
+                anki_note, self.reference_fields, by_key
+            )
+            if match_key not in self._seen:
+                self._seen.add(match_key)
+                unique.append(anki_note)
+        if len(unique) < len(batch):
+            logger.info(f"Dropped {len(batch) - len(unique)} repeated notes")
+
+        if self.shuffle:
+            random.shuffle(unique)
+        if self._manifest is None or not unique:
+            return unique
+        return self.importer_exporter._skip_unchanged_notes(
+            unique,
+            self._manifest,
+            self.reference_fields,
+            self.changing_fields,
+            self.verify_manifest,
+            self.chunk_size,
+        )
+
+    def match(self, batch: List[AnkiNote]) -> List[AnkiNote]:
+        if not self._deck_ready:
+            self._deck_index = self.importer_exporter._prepare_deck(
+                self.deck_name,
+                self.reference_fields,
+                self.match_strategy,
+                self.chunk_size,
+            )
+            self._deck_ready = True
+
+        update_report = WriteReport()
+        self.importer_exporter.update_anki_notes(
+            batch,
+            self.reference_fields,
+            self.changing_fields,
+            self.match_strategy,
+            self.chunk_size,
+            deck_index=self._deck_index,
+            report=update_report,
+        )
+        if self._manifest is not None:
+            self._failed_updates.update(
+                self.importer_exporter._failed_manifest_keys(
+                    self._manifest, update_report, self.reference_fields
+                )
+            )
+        # Matched notes carry their Anki id from here on; the write stage adds the others.
+        return batch
+
+    def write(self, batch: List[AnkiNote]) -> List[AnkiNote]:
+        new_notes = [anki_note for anki_note in batch if anki_note.id is None]
+        report = self.importer_exporter.add_anki_notes(new_notes, self.allow_duplicates)
+
+        if self._deck_index is not None:
+            self.importer_exporter._index_added_notes(
+                self._deck_index, new_notes, self.reference_fields, self.match_strategy
+            )
+        if self._manifest is not None:
+            # Failed updates are left out so the next sync retries them.
+            self.importer_exporter._record_synced_notes(
+                self._manifest, batch, self.reference_fields, self._failed_updates
+            )
+        return report.succeeded
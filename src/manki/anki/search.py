@@ -0,0 +1,227 @@
+"""
+Parser and matcher for the subset of the Anki search syntax manki relies on.
+
+Supported terms: `deck:`, `tag:`, `nid:`, `note:`, `edited:N`, `field:value` for any field name and bare text,
+combined with implicit AND, `OR`, parentheses and `-` negation. Values may be quoted, use the `*` and `_`
+wildcards, and escape special characters with a backslash.
+
+Queries are compiled into predicates over plain note records with the keys `noteId`, `deckName`, `modelName`,
+`fields` (field name -> value), `tags` and `mod` (modification time in epoch seconds).
+"""
+
+import functools
+import re
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+NotePredicate = Callable[[Dict], bool]
+
+
+class _Token(NamedTuple):
+    kind: str  # "(", ")", "-", "OR" or "TERM"
+    text: str = ""
+
+
+def parse_query(query: str, now: Optional[float] = None) -> NotePredicate:
+    tokens = _tokenize(query)
+    if not tokens:
+        return lambda note: True
+
+    parser = _QueryParser(tokens, time.time() if now is None else now)
+    predicate = parser.parse_or()
+    if parser.position != len(tokens):
+        raise ValueError(f"Unexpected ')' in query: {query}")
+    return predicate
+
+
+def search_notes(
+    query: str, notes: List[Dict], now: Optional[float] = None
+) -> List[int]:
+    predicate = parse_query(query, now)
+    return [note["noteId"] for note in notes if predicate(note)]
+
+
+def escape_value(value: str) -> str:
+    """Escapes `value` so it matches literally inside a double-quoted search term."""
+    return re.sub(r'([\\"*_])', r"\\\1", value)
+
+
+def _tokenize(query: str) -> List[_Token]:
+    tokens = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char.isspace():
+            i += 1
+        elif char in "()":
+            tokens.append(_Token(char))
+            i += 1
+        elif char == "-" and i + 1 < len(query) and not query[i + 1].isspace():
+            tokens.append(_Token("-"))
+            i += 1
+        else:
+            term, quoted, i = _read_term(query, i)
+            if not quoted and term.upper() == "OR":
+                tokens.append(_Token("OR"))
+            elif quoted or term.upper() != "AND":
+                tokens.append(_Token("TERM", term))
+    return tokens
+
+
+def _read_term(query: str, i: int):
+    # Quotes are dropped while backslash escapes are kept for `_compile_value`.
+    term = []
+    in_quotes = quoted = False
+    while i < len(query):
+        char = query[i]
+        if char == "\\" and i + 1 < len(query):
+            term.append(query[i : i + 2])
+            i += 2
+            continue
+        if char == '"':
+            in_quotes = not in_quotes
+            quoted = True
+        elif not in_quotes and (char.isspace() or char in "()"):
+            break
+        else:
+            term.append(char)
+        i += 1
+
+    if in_quotes:
+        raise ValueError(f"Unterminated quote in query: {query}")
+    return "".join(term), quoted, i
+
+
+class _QueryParser:
+    def __init__(self, tokens: List[_Token], now: float) -> None:
+        self.tokens = tokens
+        self.position = 0
+        self.now = now
+
+    def peek(self) -> Optional[str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position].kind
+        return None
+
+    def parse_or(self) -> NotePredicate:
+        alternatives = [self.parse_and()]
+        while self.peek() == "OR":
+            self.position += 1
+            alternatives.append(self.parse_and())
+
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return lambda note: any(predicate(note) for predicate in alternatives)
+
+    def parse_and(self) -> NotePredicate:
+        terms = []
+        while self.peek() not in (None, ")", "OR"):
+            terms.append(self.parse_unary())
+
+        if not terms:
+            raise ValueError("Empty search expression.")
+        if len(terms) == 1:
+            return terms[0]
+        return lambda note: all(predicate(note) for predicate in terms)
+
+    def parse_unary(self) -> NotePredicate:
+        if self.peek() == "-":
+            self.position += 1
+            predicate = self.parse_atom()
+            return lambda note: not predicate(note)
+        return self.parse_atom()
+
+    def parse_atom(self) -> NotePredicate:
+        token = self.tokens[self.position]
+        self.position += 1
+        if token.kind == "(":
+            predicate = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("Unbalanced parentheses in query.")
+            self.position += 1
+            return predicate
+        if token.kind != "TERM":
+            raise ValueError(f"Unexpected '{token.kind}' in query.")
+        return self._compile_term(token.text)
+
+    def _compile_term(self, term: str) -> NotePredicate:
+        key, value = _split_term(term)
+        if key is None:
+            pattern = _compile_value(value)
+            return lambda note: any(
+                pattern.search(field) for field in note["fields"].values()
+            )
+
+        key = key.lower()
+        if key == "deck":
+            pattern = _compile_value(value)
+            # Collections have few decks, so every deck name is only matched once per query.
+            matches_deck = functools.lru_cache(maxsize=None)(
+                functools.partial(_matches_hierarchy, pattern)
+            )
+            return lambda note: matches_deck(note["deckName"])
+        if key == "tag":
+            pattern = _compile_value(value)
+            return lambda note: any(
+                _matches_hierarchy(pattern, tag) for tag in note["tags"]
+            )
+        if key == "nid":
+            note_ids = {int(note_id) for note_id in value.split(",")}
+            return lambda note: note["noteId"] in note_ids
+        if key == "note":
+            pattern = _compile_value(value)
+            return lambda note: bool(pattern.fullmatch(note["modelName"]))
+        if key == "edited":
+            since = self.now - int(value) * 86400
+            return lambda note: note["mod"] > since
+
+        pattern = _compile_value(value)
+
+        def match_field(note: Dict) -> bool:
+            for name, field_value in note["fields"].items():
+                if name.lower() == key:
+                    return bool(pattern.fullmatch(field_value))
+            return False
+
+        return match_field
+
+
+def _matches_hierarchy(pattern: "re.Pattern", name: str) -> bool:
+    # `deck:X` and `tag:X` also match the children `X::Y`.
+    parts = name.split("::")
+    return any(
+        pattern.fullmatch("::".join(parts[:depth]))
+        for depth in range(1, len(parts) + 1)
+    )
+
+
+def _split_term(term: str):
+    i = 0
+    while i < len(term):
+        if term[i] == "\\":
+            i += 2
+            continue
+        if term[i] == ":":
+            return re.sub(r"\\(.)", r"\1", term[:i]), term[i + 1 :]
+        i += 1
+    return None, term
+
+
+def _compile_value(value: str) -> "re.Pattern":
+    parts = []
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == "\\" and i + 1 < len(value):
+            parts.append(re.escape(value[i + 1]))
+            i += 2
+            continue
+        if char == "*":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+        i += 1
+
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
@@ -1,7 +1,8 @@
 import re
+from pathlib import Path
 from typing import List
 
-from manki.anki.domain import AnkiNote
+from manki.anki.domain import AnkiNote, identity_key
 from manki.anki.sources.domain import AnkiFileParser
 
 
@@ -18,7 +19,9 @@ class MarkdownAnkiFileParser(AnkiFileParser):
                 labels = self._extract_labels(content)
                 front = self._extract_content(content, "front")
                 back = self._extract_content(content, "back")
-                anki_notes.append(self._create_anki_note(front, back, labels))
+                # The file name identifies the note, so edits to its content update the same card.
+                key = identity_key("md", Path(file_path).stem)
+                anki_notes.append(self._create_anki_note(front, back, labels, key))
             except ValueError as e:
                 print(f"Error parsing '{file_path}': {e}")
         return anki_notes
@@ -41,11 +44,15 @@ class MarkdownAnkiFileParser(AnkiFileParser):
             raise ValueError(f"'{label}' content not found.")
         return match.group(1).strip()
 
-    def _create_anki_note(self, front: str, back: str, tags: List[str]) -> AnkiNote:
+    def _create_anki_note(
+        self, front: str, back: str, tags: List[str], key: str
+    ) -> AnkiNote:
+        # Content read from user files is validated note by note, so a bad file is reported like a parse error.
         return AnkiNote(
             deckName=self.deck_name,
             modelName=self.model_name,
             front=front,
             back=back,
             tags=tags,
+            key=key,
         )
@@ -2,7 +2,7 @@ import json
 from collections import defaultdict
 from typing import Dict, List
 
-from manki.anki.domain import AnkiNote
+from manki.anki.domain import AnkiNote, identity_key
 from manki.anki.sources.domain import AnkiFileParser
 
 
@@ -32,8 +32,9 @@ class VocabularyAnkiFileParser(AnkiFileParser):
     def _create_anki_notes(
         self, data: Dict[str, List[Dict]], source_lang: str, target_lang: str
     ) -> List[AnkiNote]:
-        notes = []
+        records = []
         source_word_occurrences = self._track_source_word_occurrences(data, source_lang)
+        entry_occurrences = defaultdict(int)
 
         for word, definitions in data.items():
             for definition in definitions:
@@ -53,19 +54,27 @@ class VocabularyAnkiFileParser(AnkiFileParser):
                 front = f"{source_word} ({part_of_speech})"
                 back = f"{target_word}"
 
-                note = self._create_anki_note(front, back, [source_lang, target_lang])
-                notes.append(note)
+                # Senses sharing a word and part of speech are told apart by their position.
+                entry = (word, part_of_speech, source_lang, target_lang)
+                key = identity_key(*entry, str(entry_occurrences[entry]))
+                entry_occurrences[entry] += 1
 
-        return notes
+                records.append(
+                    self._note_record(front, back, [source_lang, target_lang], key)
+                )
 
-    def _create_anki_note(self, front: str, back: str, tags: List[str]) -> AnkiNote:
-        return AnkiNote(
-            deckName=self.deck_name,
-            modelName=self.model_name,
-            front=front,
-            back=back,
-            tags=tags,
-        )
+        # Every record is built here from strings, so validating the first one is enough.
+        return AnkiNote.from_trusted(records)
+
+    def _note_record(self, front: str, back: str, tags: List[str], key: str) -> Dict:
+        return {
+            "deckName": self.deck_name,
+            "modelName": self.model_name,
+            "front": front,
+            "back": back,
+            "tags": tags,
+            "key": key,
+        }
 
     def _track_source_word_occurrences(
         self, data: Dict[str, List[Dict]], source_lang: str
@@ -0,0 +1,69 @@
+"""
+Local state kept between incremental deck exports.
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from manki.utils import setup_logger
+
+logger = setup_logger(name=__name__)
+
+
+@dataclass
+class ExportState:
+    """
+    What the last export of a deck wrote: when it ran, and for every note (in file order) its id, its modification
+    time and how many lines it took in the export file.
+    """
+
+    deck_name: str
+    exported_at: int = 0
+    notes: List[List[int]] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path, deck_name: str) -> Optional["ExportState"]:
+        if not path.exists():
+            return None
+
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+        if data.get("deck_name") != deck_name:
+            logger.warning(f"Ignoring export state {path}: it belongs to another deck")
+            return None
+        return cls(**data)
+
+    def save(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "deck_name": self.deck_name,
+                    "exported_at": self.exported_at,
+                    "notes": self.notes,
+                },
+                file,
+            )
+
+    def mod_times(self) -> Dict[int, int]:
+        return {note_id: mod for note_id, mod, _ in self.notes}
+
+    def split_lines(self, text: str) -> Optional[Dict[int, List[str]]]:
+        """
+        Maps each note id to its lines of the export file, or None if the file no longer matches. Lines are only
+        split on line feeds, as fields may hold carriage returns.
+        """
+        lines = text.split("\n")
+        # Every line ends with "\n", so the text after the last one is empty.
+        if lines.pop() or len(lines) != sum(n_lines for _, _, n_lines in self.notes):
+            return None
+
+        lines_by_id, start = {}, 0
+        for note_id, _, n_lines in self.notes:
+            lines_by_id[note_id] = [
+                f"{line}\n" for line in lines[start : start + n_lines]
+            ]
+            start += n_lines
+        return lines_by_id
@@ -0,0 +1,169 @@
+"""
+Per-action round-trip instrumentation for AnkiConnect calls.
+"""
+
+import bisect
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional
+
+# Upper bounds (in milliseconds) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Actions kept in the call history of a connection; recordings keep every call made while they are active.
+HISTORY_SIZE = 1000
+
+
+@dataclass
+class ActionStats:
+    calls: int = 0
+    errors: int = 0
+    batched: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    total_latency_ms: float = 0.0
+    latency_histogram: List[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    )
+
+    def observe(
+        self, request_bytes: int, response_bytes: int, latency_ms: float, error: bool
+    ) -> None:
+        self.calls += 1
+        self.errors += int(error)
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.total_latency_ms += latency_ms
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def to_dict(self) -> Dict:
+        stats = asdict(self)
+        stats["mean_latency_ms"] = (
+            self.total_latency_ms / self.calls if self.calls else 0.0
+        )
+        stats["latency_histogram"] = {
+            label: count
+            for label, count in zip(_bucket_labels(), self.latency_histogram)
+            if count
+        }
+        return stats
+
+
+class ConnectionStats:
+    """
+    Collects call count, payload sizes, latency histogram and error count per AnkiConnect action.
+
+    Every HTTP request counts as one call of the action that was posted, so actions sent through `multi` are
+    counted once under `multi` and tallied in the `batched` counter of their own action name.
+
+    Attributes:
+        actions (Dict[str, ActionStats]): The stats of every action called.
+        history (Deque[str]): The last `history_size` actions called, oldest first (all of them when None).
+
+    Methods:
+        record(action, request_bytes, response_bytes, latency_ms, error): Records one HTTP round trip.
+        record_batched(actions): Counts the actions carried by a `multi` request.
+        recording(): Context manager yielding a fresh ConnectionStats that sees only the calls made inside it.
+        assert_round_trips(max_calls, action): Fails if more HTTP calls than allowed were made.
+        to_dict(): Returns the stats as a JSON-serializable dictionary.
+        dump(path): Writes the stats to a JSON file.
+    """
+
+    def __init__(self, history_size: Optional[int] = HISTORY_SIZE) -> None:
+        self.actions: Dict[str, ActionStats] = {}
+        self.history: Deque[str] = deque(maxlen=history_size)
+        self._recordings: List["ConnectionStats"] = []
+        self._lock = threading.Lock()
+
+    @property
+    def http_calls(self) -> int:
+        return sum(stats.calls for stats in self.actions.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(stats.errors for stats in self.actions.values())
+
+    def calls(self, action: str) -> int:
+        stats = self.actions.get(action)
+        return stats.calls if stats else 0
+
+    def batched(self, action: str) -> int:
+        stats = self.actions.get(action)
+        return stats.batched if stats else 0
+
+    def record(
+        self,
+        action: str,
+        request_bytes: int,
+        response_bytes: int,
+        latency_ms: float,
+        error: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self.actions.setdefault(action, ActionStats())
+            stats.observe(request_bytes, response_bytes, latency_ms, error)
+            self.history.append(action)
+            recordings = list(self._recordings)
+
+        for recording in recordings:
+            recording.record(action, request_bytes, response_bytes, latency_ms, error)
+
+    def record_batched(self, actions: List[str]) -> None:
+        with self._lock:
+            for action in actions:
+                self.actions.setdefault(action, ActionStats()).batched += 1
+            recordings = list(self._recordings)
+
+        for recording in recordings:
+            recording.record_batched(actions)
+
+    @contextmanager
+    def recording(self):
+        recording = ConnectionStats(history_size=None)
+        with self._lock:
+            self._recordings.append(recording)
+        try:
+            yield recording
+        finally:
+            with self._lock:
+                self._recordings.remove(recording)
+
+    def assert_round_trips(self, max_calls: int, action: Optional[str] = None) -> None:
+        calls = self.http_calls if action is None else self.calls(action)
+        if calls > max_calls:
+            breakdown = ", ".join(
+                f"{name}={stats.calls}" for name, stats in sorted(self.actions.items())
+            )
+            target = "HTTP calls" if action is None else f"'{action}' calls"
+            raise AssertionError(
+                f"Round-trip budget exceeded: {calls} {target} > {max_calls} ({breakdown})"
+            )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.actions.clear()
+            self.history.clear()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "http_calls": self.http_calls,
+                "errors": self.errors,
+                "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+                "actions": {
+                    action: stats.to_dict()
+                    for action, stats in sorted(self.actions.items())
+                },
+            }
+
+    def dump(self, path: str, extra: Optional[Dict] = None) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({**self.to_dict(), **(extra or {})}, file, indent=4)
+
+
+def _bucket_labels() -> List[str]:
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS]
+    labels.append(f">{LATENCY_BUCKETS_MS[-1]}ms")
+    return labels
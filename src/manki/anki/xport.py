@@ -1,19 +1,556 @@
+import ast
+import asyncio
 import csv
+import itertools
+import math
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
 
+import requests
+from pydantic import TypeAdapter
 from tqdm import tqdm
+from tqdm.asyncio import tqdm as async_tqdm
 
-from manki.utils import normalize_text, setup_logger
+from manki.utils import normalize_text, paused_gc, prefetch, setup_logger
 
-from .connection import AnkiConnection
-from .domain import AnkiNote, NoteType, NoteTypeFields
+from .connection import (
+    AnkiActionResult,
+    AnkiBatch,
+    AnkiConnection,
+    AsyncAnkiConnection,
+)
+from .domain import (
+    IDENTITY_TAG_PREFIX,
+    TAGS_FIELD,
+    AnkiNote,
+    MatchStrategy,
+    NoteFailure,
+    NoteType,
+    NoteTypeFields,
+    TagChanges,
+    WriteReport,
+    diff_tags,
+    key_from_tags,
+)
+from .encoding import encode_array, encode_notes, encode_request
+from .fields import CORE_FIELDS, FieldPlan, FieldPlans, field_getter
+from .manifest import SyncManifest
+from .search import escape_value
+from .state import ExportState
 
 logger = setup_logger(name=__name__)
 
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_CSV_BATCH_SIZE = 1000
+DEFAULT_ADD_CHUNK_NOTES = 250
+DEFAULT_ADD_CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_ADD_IN_FLIGHT = 1
+DEFAULT_UPDATE_BATCH_SIZE = 100
+DEFAULT_MAX_QUERY_LENGTH = 8000
+DEFAULT_MAX_QUERY_TERMS = 250
 
-class AnkiImporterExporter:
+_ANKI_NOTES_ADAPTER = TypeAdapter(List[AnkiNote])
+
+
+def _error_reason(error: Exception) -> str:
+    # AnkiConnect reports failed `addNotes` calls as a stringified list with one error per rejected note.
+    reason = str(error)
+    try:
+        errors = ast.literal_eval(reason)
+    except (ValueError, SyntaxError):
+        return reason
+    if isinstance(errors, list) and len(errors) == 1:
+        return str(errors[0])
+    return reason
+
+
+class _ImporterExporterBase:
+    """
+    What `AnkiImporterExporter` and `AsyncAnkiImporterExporter` share: reading, matching, encoding and reporting
+    notes. None of it calls AnkiConnect, so each class only ever runs its own (blocking or asynchronous) calls.
+
+    Attributes:
+        anki_connection: The connection used to interact with AnkiConnect.
+        field_plans (FieldPlans): The compiled field plans of the note types seen so far.
+    """
+
+    def __init__(self, anki_connection) -> None:
+        self.anki_connection = anki_connection
+        self.field_plans = FieldPlans()
+
+    # export
+    @staticmethod
+    def _prepare_output_file(output_file: str) -> Path:
+        output_file = Path(output_file)
+
+        if not str(output_file).endswith(".txt"):
+            raise Exception("Can only export to .txt")
+
+        output_folder = output_file.parent
+        if not output_folder.exists():
+            output_folder.mkdir(parents=True)
+
+        return output_file
+
+    @classmethod
+    def _write_note_lines(cls, file: TextIO, notes: List[Dict]) -> None:
+        for note in notes:
+            # Notes deleted since they were found come back empty.
+            if note:
+                file.write(cls._note_line(note))
+
+    @staticmethod
+    def _note_line(note: Dict) -> str:
+        fields = note["fields"]
+        line_elements = [fields[field]["value"] for field in fields]
+        return "\t".join(line_elements) + "\n"
+
+    # import
+    @classmethod
+    def _index_added_notes(
+        cls,
+        deck_index: Dict[Hashable, AnkiNote],
+        new_notes: List[AnkiNote],
+        reference_fields: List[str],
+        match_strategy: MatchStrategy,
+    ) -> None:
+        # Later batches must see the notes added by earlier ones.
+        by_key = MatchStrategy(match_strategy) == MatchStrategy.KEY
+        for anki_note in new_notes:
+            if anki_note.id is not None:
+                deck_index.setdefault(
+                    cls._match_key(anki_note, reference_fields, by_key), anki_note
+                )
+
+    @classmethod
+    def _record_synced_notes(
+        cls,
+        manifest: SyncManifest,
+        anki_notes: List[AnkiNote],
+        reference_fields: List[str],
+        failed_keys: Set[str] = frozenset(),
+    ) -> None:
+        """Records the notes written to Anki, except the ones whose manifest key is in `failed_keys`."""
+        for anki_note in anki_notes:
+            key = manifest.key(cls._reference_key(anki_note, reference_fields))
+            if anki_note.id is not None and key not in failed_keys:
+                manifest.record(key, anki_note)
+
+    @classmethod
+    def _failed_manifest_keys(
+        cls, manifest: SyncManifest, report: WriteReport, reference_fields: List[str]
+    ) -> Set[str]:
+        return {
+            manifest.key(cls._reference_key(failure.note, reference_fields))
+            for failure in report.failed
+        }
+
+    ## add
+    @staticmethod
+    def _chunk_new_notes(
+        anki_notes: List[AnkiNote],
+        allow_duplicates: bool,
+        max_notes: int,
+        max_bytes: int,
+        field_plans: Optional[FieldPlans] = None,
+    ) -> List[List[Tuple[AnkiNote, bytes]]]:
+        # Notes are encoded once here; their encoded size drives the chunking, and the bytes are reused as is
+        # for every request, including the ones made while bisecting a rejected chunk.
+        chunks, chunk, chunk_bytes = [], [], 0
+        encoded_notes = encode_notes(anki_notes, allow_duplicates, field_plans)
+        for anki_note, encoded_note in zip(anki_notes, encoded_notes):
+            if chunk and (
+                len(chunk) >= max_notes or chunk_bytes + len(encoded_note) > max_bytes
+            ):
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+            chunk.append((anki_note, encoded_note))
+            chunk_bytes += len(encoded_note)
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _encode_add_notes(self, chunk: List[Tuple[AnkiNote, bytes]]) -> bytes:
+        return encode_request(
+            self.anki_connection.request("addNotes"),
+            notes=encode_array([encoded_note for _, encoded_note in chunk]),
+        )
+
+    @staticmethod
+    def _added_notes_report(
+        chunk: List[Tuple[AnkiNote, bytes]], note_ids: Optional[List[Optional[int]]]
+    ) -> WriteReport:
+        # Older AnkiConnect versions return null for the notes they could not add instead of failing.
+        report = WriteReport()
+        for (anki_note, _), note_id in itertools.zip_longest(chunk, note_ids or []):
+            if note_id is None:
+                report.failed.append(NoteFailure(anki_note, "note could not be added"))
+            else:
+                anki_note.id = note_id
+                report.succeeded.append(anki_note)
+        return report
+
+    @staticmethod
+    def _log_add_report(report: WriteReport) -> None:
+        logger.info(f"{len(report.succeeded)} new notes added")
+        for failure in report.failed:
+            logger.error(f"Could not add '{failure.note.label}': {failure.error}")
+
+    def _check_reference_fields(
+        self, anki_notes: List[AnkiNote], reference_fields: List[str]
+    ) -> None:
+        # A missing field reads as empty on every note, so all the notes would match each other.
+        for model_name in sorted({anki_note.modelName for anki_note in anki_notes}):
+            plan = self.field_plans.get(model_name)
+            unknown = plan.unknown(reference_fields) if plan is not None else []
+            if unknown:
+                raise Exception(
+                    f"Note type '{model_name}' has no field {', '.join(unknown)} to match notes on; "
+                    f"choose the reference fields among {', '.join(plan.field_names)}"
+                )
+
+    def _plan_fields(self, model_name: str) -> List[str]:
+        plan = self.field_plans.get(model_name)
+        if plan is not None:
+            return list(plan.field_names)
+        return NoteTypeFields.get_fields(NoteType(model_name))
+
+    def _get_anki_notes_from_csv(
+        self, input_file: str, deck_name: str, model_name: str, fields: List[str]
+    ) -> List[AnkiNote]:
+        return [
+            anki_note
+            for batch in self._iter_anki_notes_from_csv(
+                input_file, deck_name, model_name, fields
+            )
+            for anki_note in batch
+        ]
+
+    def _iter_anki_notes_from_csv(
+        self,
+        input_file: str,
+        deck_name: str,
+        model_name: str,
+        fields: List[str],
+        batch_size: int = DEFAULT_CSV_BATCH_SIZE,
+    ) -> Iterator[List[AnkiNote]]:
+        logger.info(f"Fetching notes from {input_file}")
+
+        plan = FieldPlan(model_name, fields)
+
+        with open(input_file, "r", encoding="utf-8") as file:
+            reader = csv.DictReader(file, fieldnames=fields)
+            rows = (
+                {
+                    "deckName": deck_name,
+                    "modelName": model_name,
+                    **plan.record(row),
+                }
+                for row in tqdm(reader, desc="Reading notes")
+            )
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                with paused_gc():
+                    anki_notes = _ANKI_NOTES_ADAPTER.validate_python(batch)
+                yield anki_notes
+
+    ## update
+    @classmethod
+    def _unmatched_by_key(
+        cls,
+        anki_notes: List[AnkiNote],
+        key_index: Dict[Hashable, AnkiNote],
+        reference_fields: List[str],
+    ) -> List[AnkiNote]:
+        return [
+            anki_note
+            for anki_note in anki_notes
+            if cls._match_key(anki_note, reference_fields, by_key=True) not in key_index
+        ]
+
+    @classmethod
+    def _queue_adoptions(
+        cls,
+        batch: AnkiBatch,
+        anki_notes: List[AnkiNote],
+        fallback_index: Dict[Tuple[str, ...], AnkiNote],
+        key_index: Dict[Hashable, AnkiNote],
+        reference_fields: List[str],
+    ) -> List[AnkiActionResult]:
+        """
+        Match notes missing from `key_index` on their reference fields instead, e.g. notes synced before they
+        had an identity key, and queue the tagging of the matched notes with their key.
+        """
+        adoptions = []
+        for anki_note in anki_notes:
+            existing_note = fallback_index.get(
+                cls._reference_key(anki_note, reference_fields)
+            )
+            if existing_note is None or existing_note.key is not None:
+                # A note with another key is a different entry that merely looks the same.
+                continue
+
+            key_index[cls._match_key(anki_note, reference_fields, by_key=True)] = (
+                existing_note
+            )
+            if anki_note.key is not None:
+                existing_note.key = anki_note.key
+                adoptions.append(
+                    batch(
+                        "addTags",
+                        notes=[existing_note.id],
+                        tags=anki_note.identity_tag,
+                    )
+                )
+        return adoptions
+
+    @staticmethod
+    def _log_adoptions(adoptions: List[AnkiActionResult]) -> None:
+        failed = [adoption for adoption in adoptions if adoption.error]
+        for adoption in failed:
+            note_id = adoption.params["notes"][0]
+            logger.error(f"Could not tag note {note_id}: {adoption.error}")
+        if adoptions:
+            logger.info(
+                f"{len(adoptions) - len(failed)} existing notes tagged with their identity key"
+            )
+
+    @staticmethod
+    def _log_reconcile_counts(
+        anki_notes: List[AnkiNote], new_notes: List[AnkiNote], report: WriteReport
+    ) -> None:
+        updated_count = len(report.succeeded)
+        unchanged_count = (
+            len(anki_notes) - len(new_notes) - updated_count - len(report.failed)
+        )
+        logger.info(
+            f"{updated_count} notes updated, {unchanged_count} unchanged, "
+            f"{len(report.failed)} failed, {len(new_notes)} new"
+        )
+
+    def _index_notes_info(
+        self,
+        deck_index: Dict[Hashable, AnkiNote],
+        notes_info: List[Dict],
+        deck_name: str,
+        reference_fields: List[str],
+        by_key: bool = False,
+    ) -> None:
+        for note_info in notes_info:
+            # Notes deleted since they were found come back empty.
+            if not note_info:
+                continue
+            note = self._note_from_info(note_info, note_info["noteId"], deck_name)
+            # Keep the first match, like the per-note query does.
+            deck_index.setdefault(self._match_key(note, reference_fields, by_key), note)
+
+    @staticmethod
+    def _reference_key(note: AnkiNote, reference_fields: List[str]) -> Tuple[str, ...]:
+        return tuple(
+            normalize_text(field_getter(field)(note)) for field in reference_fields
+        )
+
+    @classmethod
+    def _match_key(
+        cls, note: AnkiNote, reference_fields: List[str], by_key: bool = False
+    ) -> Hashable:
+        # Notes without an identity key fall back to their reference fields.
+        if by_key and note.key is not None:
+            return note.key
+        return cls._reference_key(note, reference_fields)
+
+    def _queue_update(
+        self,
+        batch: Callable[..., AnkiActionResult],
+        updates: List[Tuple[AnkiNote, AnkiActionResult]],
+        new_note: AnkiNote,
+        existing_note: AnkiNote,
+        changing_fields: Optional[List[str]] = None,
+        tag_changes: Optional[TagChanges] = None,
+    ) -> None:
+        """
+        Queues the field changes of a note, and records its tag changes in `tag_changes` when `tags` is one of the
+        changing fields; those are queued for all notes at once by `_queue_tag_changes`.
+        """
+        if changing_fields is None:
+            return
+
+        if TAGS_FIELD in changing_fields and tag_changes is not None:
+            tag_changes.track(new_note, existing_note)
+
+        plan = self.field_plans.get(existing_note.modelName)
+        updated_note = self._merge_changes(
+            new_note,
+            existing_note,
+            [field for field in changing_fields if field != TAGS_FIELD],
+            plan,
+        )
+        if updated_note:
+            updates.append((new_note, batch("updateNoteFields", note=updated_note)))
+
+    @staticmethod
+    def _queue_tag_changes(
+        batch: Callable[..., AnkiActionResult],
+        updates: List[Tuple[AnkiNote, AnkiActionResult]],
+        tag_changes: TagChanges,
+    ) -> None:
+        for action, notes_by_tag in [
+            ("addTags", tag_changes.added),
+            ("removeTags", tag_changes.removed),
+        ]:
+            for tag, anki_notes in notes_by_tag.items():
+                result = batch(
+                    action, notes=[anki_note.id for anki_note in anki_notes], tags=tag
+                )
+                updates.extend((anki_note, result) for anki_note in anki_notes)
+
+    @staticmethod
+    def _update_report(
+        updates: List[Tuple[AnkiNote, AnkiActionResult]],
+        report: Optional[WriteReport] = None,
+    ) -> WriteReport:
+        # A note can take part in several actions (its fields and each of its tags); any error fails it.
+        errors: Dict[int, Optional[str]] = {}
+        notes: Dict[int, AnkiNote] = {}
+        for anki_note, result in updates:
+            notes[id(anki_note)] = anki_note
+            errors[id(anki_note)] = errors.get(id(anki_note)) or result.error
+
+        update_report = WriteReport()
+        for note_id, anki_note in notes.items():
+            error = errors[note_id]
+            if error:
+                update_report.failed.append(NoteFailure(anki_note, error))
+                logger.error(f"Could not update '{anki_note.label}': {error}")
+            else:
+                update_report.succeeded.append(anki_note)
+
+        if report is not None:
+            report.extend(update_report)
+        return update_report
+
+    @staticmethod
+    def _has_changes(
+        new_note: AnkiNote, existing_note: AnkiNote, changing_fields: List[str]
+    ) -> bool:
+        for field in changing_fields:
+            if field == TAGS_FIELD:
+                added, removed = diff_tags(new_note.anki_tags, existing_note.tags or [])
+                if added or removed:
+                    return True
+            elif field_getter(field)(existing_note) != field_getter(field)(new_note):
+                return True
+        return False
+
+    @staticmethod
+    def _merge_changes(
+        new_note: AnkiNote,
+        existing_note: AnkiNote,
+        changing_fields: List[str],
+        plan: Optional[FieldPlan] = None,
+    ) -> Optional[Dict]:
+        """Applies the changed fields to `existing_note` and returns the `updateNoteFields` note sending only them."""
+        if plan is None:
+            plan = FieldPlan(
+                existing_note.modelName, CORE_FIELDS + tuple(existing_note.extra_fields)
+            )
+
+        changes = plan.diff(new_note, existing_note, changing_fields)
+        if not changes:
+            return None
+
+        return {"id": existing_note.id, "fields": changes}
+
+    # utils
+    @classmethod
+    def _build_find_query(cls, note: AnkiNote, reference_fields: List[str]) -> str:
+        field_filter = cls._reference_filter(note, reference_fields)
+        return f"{cls._deck_filter(note.deckName)} {field_filter}"
+
+    @classmethod
+    def _build_batched_find_queries(
+        cls,
+        anki_notes: List[AnkiNote],
+        reference_fields: List[str],
+        max_query_length: int = DEFAULT_MAX_QUERY_LENGTH,
+        max_query_terms: int = DEFAULT_MAX_QUERY_TERMS,
+    ) -> List[str]:
+        # Anki turns every OR into a nested SQL expression and SQLite caps their depth at 1000,
+        # so queries are bounded by term count as well as by length.
+        prefix = f"{cls._deck_filter(anki_notes[0].deckName)} ("
+        queries, terms, length, seen = [], [], len(prefix) + 1, set()
+        for anki_note in anki_notes:
+            term = cls._reference_filter(anki_note, reference_fields)
+            if term in seen:
+                continue
+            seen.add(term)
+            if len(reference_fields) > 1:
+                term = f"({term})"
+
+            separator = len(" OR ") if terms else 0
+            if terms and (
+                len(terms) >= max_query_terms
+                or length + separator + len(term) > max_query_length
+            ):
+                queries.append(prefix + " OR ".join(terms) + ")")
+                terms, length, separator = [], len(prefix) + 1, 0
+            terms.append(term)
+            length += separator + len(term)
+
+        if terms:
+            queries.append(prefix + " OR ".join(terms) + ")")
+        return queries
+
+    @staticmethod
+    def _reference_filter(note: AnkiNote, reference_fields: List[str]) -> str:
+        return " ".join(
+            f'{field}:"{escape_value(normalize_text(field_getter(field)(note)))}"'
+            for field in reference_fields
+        )
+
+    @staticmethod
+    def _deck_filter(deck_name: str) -> str:
+        return f'deck:"{escape_value(deck_name)}"'
+
+    @classmethod
+    def _key_filter(cls, deck_name: str) -> str:
+        return (
+            f'{cls._deck_filter(deck_name)} "tag:{escape_value(IDENTITY_TAG_PREFIX)}*"'
+        )
+
+    def _note_from_info(
+        self, note_info: Dict, note_id: int, deck_name: str
+    ) -> AnkiNote:
+        plan = self.field_plans.from_note_info(note_info)
+        values = {name: field["value"] for name, field in note_info["fields"].items()}
+        return AnkiNote(
+            deckName=deck_name,
+            modelName=note_info["modelName"],
+            tags=note_info.get("tags", []),
+            id=note_id,
+            key=key_from_tags(note_info.get("tags")),
+            **plan.record(values),
+        )
+
+
+class AnkiImporterExporter(_ImporterExporterBase):
     """
     A class to facilitate the import and export of Anki flashcards using the AnkiConnect API.
 
@@ -25,44 +562,152 @@ class AnkiImporterExporter:
         anki_connection (AnkiConnection): An instance of the AnkiConnection class to interact with AnkiConnect.
 
     Methods:
-        export_to_txt(deck_name, output_file): Export flashcards from a specified Anki deck to a text file.
+        export_to_txt(deck_name, output_file, incremental): Export flashcards from a specified Anki deck to a text file.
         import_and_update_notes(input_file, deck_name, model_name): Import flashcards from a file into Anki and update existing notes.
         add_anki_notes(anki_notes): Add new flashcards to Anki.
-        update_anki_notes(anki_notes, reference_fields, changing_fields): Update existing flashcards in Anki.
+        update_anki_notes(anki_notes, reference_fields, changing_fields, match_strategy): Update existing flashcards in Anki.
+
+    Incremental exports keep a small state file next to the export (`<output_file>.state.json`) with the
+    modification time of every exported note, and only re-fetch the notes that changed since the last run.
+
+    Existing notes are matched on their reference fields either with one `findNotes` query per incoming note
+    (`MatchStrategy.QUERY`), with queries OR-ing the reference fields of many notes at once
+    (`MatchStrategy.BATCHED_QUERY`), or by fetching the whole target deck once in chunks and matching in memory
+    (`MatchStrategy.DECK`). Notes with an identity key can instead be matched on the `manki-id::<key>` tag
+    stored with them (`MatchStrategy.KEY`), which survives edits to their fields.
+
+    Fields are mapped through a `FieldPlan` per note type, compiled once from `modelFieldNames` (or from the
+    fields listed by `notesInfo`), so note types with fields beyond `front` and `back` need no code changes.
     """
 
     def __init__(self, anki_connection: Optional[AnkiConnection] = None) -> None:
-        if anki_connection is None:
-            self.anki_connection = AnkiConnection()
-        else:
-            self.anki_connection = anki_connection
+        super().__init__(
+            AnkiConnection() if anki_connection is None else anki_connection
+        )
 
     # export
-    def export_to_txt(self, deck_name: str, output_file: str) -> None:
-        notes = self._fetch_all_notes(deck_name)
-        output_file = Path(output_file)
+    def export_to_txt(
+        self,
+        deck_name: str,
+        output_file: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        prefetch: bool = True,
+        incremental: bool = False,
+        state_file: Optional[str] = None,
+    ) -> None:
+        if incremental:
+            return self._export_incremental(
+                deck_name, output_file, chunk_size, state_file
+            )
 
-        logger.info(f"Exporting {len(notes)} notes to {output_file}")
+        output_file = self._prepare_output_file(output_file)
+        note_ids = self._fetch_deck_note_ids(deck_name)
 
-        output_folder = output_file.parent
-        if not output_folder.exists():
-            output_folder.mkdir(parents=True)
+        logger.info(f"Exporting {len(note_ids)} notes to {output_file}")
 
-        if not str(output_file).endswith(".txt"):
-            raise Exception("Can only export to .txt")
+        with open(output_file, "w", encoding="utf-8") as file, tqdm(
+            total=len(note_ids), desc="Exporting notes"
+        ) as progress_bar:
+            for notes in self._iter_notes_info(note_ids, chunk_size, prefetch):
+                self._write_note_lines(file, notes)
+                progress_bar.update(len(notes))
 
-        with open(output_file, "w", encoding="utf-8") as file:
-            for note in tqdm(notes, total=len(notes), desc="Exporting notes"):
-                fields = note["fields"]
-                line_elements = [fields[field]["value"] for field in fields]
-                line = "\t".join(line_elements) + "\n"
-                file.write(line)
+    def _export_incremental(
+        self,
+        deck_name: str,
+        output_file: str,
+        chunk_size: int,
+        state_file: Optional[str] = None,
+    ) -> None:
+        output_file = self._prepare_output_file(output_file)
+        state_path = Path(state_file or f"{output_file}.state.json")
+        started_at = int(time.time())
+
+        state = ExportState.load(state_path, deck_name)
+        lines_by_id = {}
+        if state is not None and output_file.exists():
+            # newline="" keeps the line breaks inside fields as they are.
+            with open(output_file, "r", encoding="utf-8", newline="") as file:
+                lines_by_id = state.split_lines(file.read())
+            if lines_by_id is None:
+                logger.warning(f"{output_file} changed since the last export")
+                state, lines_by_id = None, {}
+
+        note_ids = self._fetch_deck_note_ids(deck_name)
+        mod_times = self._fetch_mod_times(deck_name, note_ids, state)
+        previous_mod_times = state.mod_times() if state else {}
+        changed_ids = [
+            note_id
+            for note_id in note_ids
+            if note_id not in lines_by_id
+            or mod_times.get(note_id) != previous_mod_times.get(note_id)
+        ]
+
+        fetched_ids = set()
+        for notes in self._iter_notes_info(changed_ids, chunk_size, prefetch=True):
+            for note in notes:
+                # Notes deleted since they were found come back empty.
+                if not note:
+                    continue
+                fetched_ids.add(note["noteId"])
+                lines_by_id[note["noteId"]] = [self._note_line(note)]
+                mod_times[note["noteId"]] = note.get(
+                    "mod", mod_times.get(note["noteId"])
+                )
+
+        deleted_ids = set(changed_ids) - fetched_ids
+        note_ids = [note_id for note_id in note_ids if note_id not in deleted_ids]
 
-    def _fetch_all_notes(self, deck_name: str):
-        note_ids = self.anki_connection("findNotes", query=f"deck:{deck_name}")
-        notes = self.anki_connection("notesInfo", notes=note_ids)
+        new_state = ExportState(deck_name=deck_name, exported_at=started_at)
+        temporary_file = output_file.with_name(f".{output_file.name}.tmp")
+        with open(temporary_file, "w", encoding="utf-8", newline="") as file:
+            for note_id in note_ids:
+                lines = lines_by_id[note_id]
+                file.writelines(lines)
+                new_state.notes.append(
+                    [
+                        note_id,
+                        mod_times.get(note_id),
+                        sum(line.count("\n") for line in lines),
+                    ]
+                )
+        os.replace(temporary_file, output_file)
+        new_state.save(state_path)
+
+        removed_count = len(set(previous_mod_times) - set(note_ids))
+        logger.info(
+            f"Exported {len(changed_ids)} changed notes to {output_file}, "
+            f"{len(note_ids) - len(changed_ids)} unchanged, {removed_count} removed"
+        )
+
+    def _fetch_mod_times(
+        self, deck_name: str, note_ids: List[int], state: Optional[ExportState]
+    ) -> Dict[int, int]:
+        try:
+            mod_times = self.anki_connection("notesModTime", notes=note_ids)
+            return {note["noteId"]: note["mod"] for note in mod_times}
+        except requests.RequestException:
+            raise
+        except Exception as e:
+            if state is None:
+                return {}
+            logger.info(f"notesModTime unavailable ({e}), falling back to edited:N")
+
+        # Older AnkiConnect versions: re-fetch every note edited since the last export (day granularity).
+        days = max(1, math.ceil((time.time() - state.exported_at) / 86400))
+        edited_ids = set(
+            self.anki_connection(
+                "findNotes", query=f"{self._deck_filter(deck_name)} edited:{days}"
+            )
+        )
+        return {
+            note_id: mod
+            for note_id, mod in state.mod_times().items()
+            if note_id not in edited_ids
+        }
 
-        return notes
+    def _fetch_deck_note_ids(self, deck_name: str) -> List[int]:
+        return self.anki_connection("findNotes", query=self._deck_filter(deck_name))
 
     # import
     def import_and_update_notes(
@@ -74,49 +719,239 @@ class AnkiImporterExporter:
         reference_fields: Optional[List[str]] = ["front", "back"],
         changing_fields: Optional[List[str]] = None,
         allow_duplicates: bool = False,
+        match_strategy: MatchStrategy = MatchStrategy.QUERY,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        manifest_path: Optional[str] = None,
+        verify_manifest: bool = False,
+        csv_batch_size: int = DEFAULT_CSV_BATCH_SIZE,
     ) -> None:
+        if input_file.endswith(".csv"):
+            fields = self._csv_fields(model_name)
+            # Read and validate the next batches on a worker thread while the current one is synced.
+            batches = prefetch(
+                self._iter_anki_notes_from_csv(
+                    input_file, deck_name, model_name, fields, csv_batch_size
+                )
+            )
+        elif anki_notes:
+            batches = [anki_notes]
+        else:
+            raise Exception("Only .csv files or AnkiNotes objects are supported.")
+
+        manifest = None
+        if manifest_path:
+            manifest = SyncManifest.load(
+                manifest_path, deck_name, reference_fields, changing_fields
+            )
+
+        deck_ready = False
+        deck_index = None
+        for batch in batches:
+            if manifest is not None:
+                batch = self._skip_unchanged_notes(
+                    batch,
+                    manifest,
+                    reference_fields,
+                    changing_fields,
+                    verify_manifest,
+                    chunk_size,
+                )
+                if not batch:
+                    continue
+
+            if not deck_ready:
+                deck_index = self._prepare_deck(
+                    deck_name, reference_fields, match_strategy, chunk_size
+                )
+                deck_ready = True
+
+            update_report = WriteReport()
+            new_notes = self.update_anki_notes(
+                batch,
+                reference_fields,
+                changing_fields,
+                match_strategy,
+                chunk_size,
+                deck_index=deck_index,
+                report=update_report,
+            )
+            self.add_anki_notes(new_notes, allow_duplicates)
+
+            if deck_index is not None:
+                self._index_added_notes(
+                    deck_index, new_notes, reference_fields, match_strategy
+                )
+            if manifest is not None:
+                # Failed updates are left out so the next sync retries them.
+                self._record_synced_notes(
+                    manifest,
+                    batch,
+                    reference_fields,
+                    self._failed_manifest_keys(
+                        manifest, update_report, reference_fields
+                    ),
+                )
+
+        if not deck_ready:
+            logger.info("All notes are unchanged since the last sync")
+        if manifest is not None:
+            manifest.save()
+
+    def _prepare_deck(
+        self,
+        deck_name: str,
+        reference_fields: List[str],
+        match_strategy: MatchStrategy,
+        chunk_size: int,
+    ) -> Optional[Dict[Hashable, AnkiNote]]:
+        """Creates the deck if needed and returns the index the match strategy reuses across batches, if any."""
         self._if_not_exists_create_deck(deck_name)
+        if MatchStrategy(match_strategy) == MatchStrategy.DECK:
+            return self._build_deck_index(deck_name, reference_fields, chunk_size)
+        if MatchStrategy(match_strategy) == MatchStrategy.KEY:
+            return self._build_key_index(deck_name, reference_fields, chunk_size)
+        return None
 
-        note_type = NoteType(model_name)
-        note_fields = NoteTypeFields.get_fields(note_type)
+    def _skip_unchanged_notes(
+        self,
+        anki_notes: List[AnkiNote],
+        manifest: SyncManifest,
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]],
+        verify: bool,
+        chunk_size: int,
+    ) -> List[AnkiNote]:
+        pending, unchanged = [], {}
+        for anki_note in anki_notes:
+            key = manifest.key(self._reference_key(anki_note, reference_fields))
+            if manifest.is_unchanged(key, anki_note):
+                unchanged[key] = anki_note
+            else:
+                pending.append(anki_note)
 
-        if input_file.endswith(".csv"):
-            anki_notes = self._get_anki_notes_from_csv(input_file, deck_name, note_type)
-        elif not anki_notes:
-            raise Exception("Only .csv files or AnkiNotes objects are supported.")
+        if verify and unchanged:
+            drifted = self._find_drifted_notes(
+                unchanged, manifest, reference_fields, changing_fields, chunk_size
+            )
+            logger.info(f"{len(drifted)} notes drifted from the manifest")
+            pending.extend(drifted)
 
-        new_notes = self.update_anki_notes(
-            anki_notes, reference_fields, changing_fields
+        logger.info(
+            f"{len(anki_notes) - len(pending)} notes unchanged since the last sync, "
+            f"{len(pending)} to sync"
         )
-        self.add_anki_notes(new_notes, allow_duplicates)
+        return pending
+
+    def _find_drifted_notes(
+        self,
+        unchanged: Dict[str, AnkiNote],
+        manifest: SyncManifest,
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]],
+        chunk_size: int,
+    ) -> List[AnkiNote]:
+        keys = list(unchanged)
+        note_ids = [manifest.note_id(key) for key in keys]
+        notes_info = itertools.chain.from_iterable(
+            self._iter_notes_info(note_ids, chunk_size, prefetch=True)
+        )
+
+        drifted = []
+        for key, note_id, note_info in zip(keys, note_ids, notes_info):
+            anki_note = unchanged[key]
+            if not note_info:
+                is_drifted = True
+            else:
+                existing_note = self._note_from_info(
+                    note_info, note_id, anki_note.deckName
+                )
+                is_drifted = self._reference_key(
+                    existing_note, reference_fields
+                ) != self._reference_key(
+                    anki_note, reference_fields
+                ) or self._has_changes(
+                    anki_note, existing_note, changing_fields or []
+                )
+
+            if is_drifted:
+                manifest.discard(key)
+                drifted.append(anki_note)
+        return drifted
 
     ## add
     def add_anki_notes(
-        self, anki_notes: List[AnkiNote], allow_duplicates: bool = False
-    ) -> None:
-        anki_notes_dict = [note.to_anki_dict(allow_duplicates) for note in anki_notes]
-        self.anki_connection("addNotes", notes=anki_notes_dict)
-        logger.info(f"{len(anki_notes_dict)} new notes added")
+        self,
+        anki_notes: List[AnkiNote],
+        allow_duplicates: bool = False,
+        max_notes: int = DEFAULT_ADD_CHUNK_NOTES,
+        max_bytes: int = DEFAULT_ADD_CHUNK_BYTES,
+        max_in_flight: int = DEFAULT_ADD_IN_FLIGHT,
+    ) -> WriteReport:
+        """
+        Add notes with `addNotes` requests of at most `max_notes` notes and `max_bytes` of JSON, keeping up to
+        `max_in_flight` requests in flight. A rejected chunk is split in halves and retried until the offending
+        notes are isolated, so the rest still go in. The returned report lists the notes that were added (with
+        their `id` set) and the ones that failed with their reason.
 
-    def _get_anki_notes_from_csv(
-        self, input_file: str, deck_name: str, note_type: NoteType
-    ) -> List[AnkiNote]:
-        logger.info(f"Fetching notes from {input_file}")
+        Anki numbers new notes, and so orders new cards, by creation time. Chunks are sent one after another by
+        default so that order follows the input; with more than one request in flight it depends on which
+        request Anki handles first.
+
+        Bisection assumes that a rejected request added nothing. Notes that AnkiConnect added before rejecting
+        a request are reported as duplicates when they are retried.
+        """
+        self._load_field_plans(anki_note.modelName for anki_note in anki_notes)
+        chunks = self._chunk_new_notes(
+            anki_notes, allow_duplicates, max_notes, max_bytes, self.field_plans
+        )
+        report = WriteReport()
+        if max_in_flight <= 1:
+            for chunk in chunks:
+                report.extend(self._add_chunk(chunk))
+        else:
+            with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+                for chunk_report in executor.map(self._add_chunk, chunks):
+                    report.extend(chunk_report)
 
-        fields = NoteTypeFields.get_fields(note_type)
+        self._log_add_report(report)
+        return report
 
-        anki_notes = []
-        with open(input_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file, fieldnames=fields)
-            for row in tqdm(reader, desc="Adding new notes"):
-                note_data = {field: row[field] for field in fields if field in row}
-                anki_note = AnkiNote(
-                    deckName=deck_name, modelName=note_type.value, **note_data
-                )
+    def _add_chunk(self, chunk: List[Tuple[AnkiNote, bytes]]) -> WriteReport:
+        try:
+            note_ids = self.anki_connection.invoke_encoded(
+                "addNotes", self._encode_add_notes(chunk)
+            )
+        except requests.RequestException:
+            # The request may have been applied; retrying could add the notes twice.
+            raise
+        except Exception as e:
+            if len(chunk) == 1:
+                return WriteReport(failed=[NoteFailure(chunk[0][0], _error_reason(e))])
+            middle = len(chunk) // 2
+            report = self._add_chunk(chunk[:middle])
+            report.extend(self._add_chunk(chunk[middle:]))
+            return report
+
+        return self._added_notes_report(chunk, note_ids)
 
-                anki_notes.append(anki_note)
+    def _load_field_plans(self, model_names: Iterable[str]) -> None:
+        for model_name in self.field_plans.missing(model_names):
+            try:
+                field_names = self.anki_connection(
+                    "modelFieldNames", modelName=model_name
+                )
+            except requests.RequestException:
+                raise
+            except Exception as e:
+                # Notes of an unknown note type are still sent, and rejected one by one by Anki.
+                logger.warning(f"Could not fetch the fields of '{model_name}': {e}")
+                continue
+            self.field_plans.add(model_name, field_names)
 
-        return anki_notes
+    def _csv_fields(self, model_name: str) -> List[str]:
+        """The CSV columns of a note type: its fields in Anki, or the built-in ones when Anki does not know it."""
+        self._load_field_plans([model_name])
+        return self._plan_fields(model_name)
 
     ## update
     def update_anki_notes(
@@ -124,67 +959,225 @@ class AnkiImporterExporter:
         anki_notes: List[AnkiNote],
         reference_fields: Optional[List[str]] = ["front", "back"],
         changing_fields: Optional[List[str]] = None,
+        match_strategy: MatchStrategy = MatchStrategy.QUERY,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        deck_index: Optional[Dict[Tuple[str, ...], AnkiNote]] = None,
+        update_batch_size: int = DEFAULT_UPDATE_BATCH_SIZE,
+        report: Optional[WriteReport] = None,
     ) -> List[AnkiNote]:
-        updated_count = 0
+        """
+        Update the notes that already exist in Anki and return the ones that do not.
+
+        Changed notes are sent as `updateNoteFields` actions grouped in `multi` requests of `update_batch_size`.
+        The outcome of every update is added to `report` when one is given.
+        """
+        match_strategy = MatchStrategy(match_strategy)
+        self._load_field_plans(anki_note.modelName for anki_note in anki_notes)
+        self._check_reference_fields(anki_notes, reference_fields)
+        if match_strategy == MatchStrategy.KEY:
+            return self._reconcile_by_key(
+                anki_notes,
+                reference_fields,
+                changing_fields,
+                chunk_size,
+                deck_index,
+                update_batch_size,
+                report,
+            )
+        if match_strategy == MatchStrategy.BATCHED_QUERY:
+            deck_index = self._find_notes_batched(
+                anki_notes, reference_fields, chunk_size
+            )
+        if match_strategy in (MatchStrategy.DECK, MatchStrategy.BATCHED_QUERY):
+            return self._reconcile_with_deck(
+                anki_notes,
+                reference_fields,
+                changing_fields,
+                chunk_size,
+                deck_index,
+                update_batch_size,
+                report,
+            )
+
         deck_name = anki_notes[0].deckName
 
-        new_notes = []
-        for anki_note in tqdm(anki_notes, desc="Updating notes"):
-            matching_notes = self._find_notes_like(anki_note, reference_fields)
-            if matching_notes:
-                note_id = matching_notes[0]
-                existing_note = self._get_note(note_id, deck_name)
+        new_notes, updates, tag_changes = [], [], TagChanges()
+        with self.anki_connection.batch(size=update_batch_size) as batch:
+            for anki_note in tqdm(anki_notes, desc="Updating notes"):
+                matching_notes = self._find_notes_like(anki_note, reference_fields)
+                if matching_notes:
+                    note_id = matching_notes[0]
+                    existing_note = self._get_note(note_id, deck_name)
+                    anki_note.id = note_id
+                    self._queue_update(
+                        batch,
+                        updates,
+                        anki_note,
+                        existing_note,
+                        changing_fields,
+                        tag_changes,
+                    )
+                else:
+                    new_notes.append(anki_note)
+            self._queue_tag_changes(batch, updates, tag_changes)
 
-                if self._update_note(
-                    new_note=anki_note,
-                    existing_note=existing_note,
-                    changing_fields=changing_fields,
-                ):
-                    updated_count += 1
+        update_report = self._update_report(updates, report)
+        logger.info(f"{len(update_report.succeeded)} notes updated")
+        return new_notes
 
-            else:
-                new_notes.append(anki_note)
+    def _reconcile_with_deck(
+        self,
+        anki_notes: List[AnkiNote],
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]],
+        chunk_size: int,
+        deck_index: Optional[Dict[Hashable, AnkiNote]] = None,
+        update_batch_size: int = DEFAULT_UPDATE_BATCH_SIZE,
+        report: Optional[WriteReport] = None,
+        by_key: bool = False,
+    ) -> List[AnkiNote]:
+        if deck_index is None:
+            deck_name = anki_notes[0].deckName
+            deck_index = self._build_deck_index(deck_name, reference_fields, chunk_size)
 
-        logger.info(f"{updated_count} notes updated")
+        new_notes, updates, tag_changes = [], [], TagChanges()
+        with self.anki_connection.batch(size=update_batch_size) as batch:
+            for anki_note in tqdm(anki_notes, desc="Reconciling notes"):
+                existing_note = deck_index.get(
+                    self._match_key(anki_note, reference_fields, by_key)
+                )
+                if existing_note is None:
+                    new_notes.append(anki_note)
+                    continue
+
+                anki_note.id = existing_note.id
+                self._queue_update(
+                    batch,
+                    updates,
+                    anki_note,
+                    existing_note,
+                    changing_fields,
+                    tag_changes,
+                )
+            self._queue_tag_changes(batch, updates, tag_changes)
+
+        update_report = self._update_report(updates, report)
+        self._log_reconcile_counts(anki_notes, new_notes, update_report)
         return new_notes
 
-    def _update_note(
+    def _reconcile_by_key(
         self,
-        new_note: AnkiNote,
-        existing_note: AnkiNote,
-        changing_fields: Optional[List[str]] = None,
-    ) -> bool:
-        if changing_fields is None:
+        anki_notes: List[AnkiNote],
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]],
+        chunk_size: int,
+        key_index: Optional[Dict[Hashable, AnkiNote]] = None,
+        update_batch_size: int = DEFAULT_UPDATE_BATCH_SIZE,
+        report: Optional[WriteReport] = None,
+    ) -> List[AnkiNote]:
+        if key_index is None:
+            deck_name = anki_notes[0].deckName
+            key_index = self._build_key_index(deck_name, reference_fields, chunk_size)
+
+        self._adopt_existing_notes(anki_notes, key_index, reference_fields, chunk_size)
+        return self._reconcile_with_deck(
+            anki_notes,
+            reference_fields,
+            changing_fields,
+            chunk_size,
+            key_index,
+            update_batch_size,
+            report,
+            by_key=True,
+        )
+
+    def _adopt_existing_notes(
+        self,
+        anki_notes: List[AnkiNote],
+        key_index: Dict[Hashable, AnkiNote],
+        reference_fields: List[str],
+        chunk_size: int,
+    ) -> None:
+        unmatched = self._unmatched_by_key(anki_notes, key_index, reference_fields)
+        if not unmatched:
             return
 
-        changes_detected = False
-        for field in changing_fields:
-            new_value = getattr(new_note, field)
-            existing_value = getattr(existing_note, field)
+        fallback_index = self._find_notes_batched(
+            unmatched, reference_fields, chunk_size
+        )
+        with self.anki_connection.batch() as batch:
+            adoptions = self._queue_adoptions(
+                batch, unmatched, fallback_index, key_index, reference_fields
+            )
+        self._log_adoptions(adoptions)
 
-            if new_value != existing_value:
-                setattr(existing_note, field, new_value)
-                changes_detected = True
+    def _build_deck_index(
+        self, deck_name: str, reference_fields: List[str], chunk_size: int
+    ) -> Dict[Tuple[str, ...], AnkiNote]:
+        note_ids = self.anki_connection("findNotes", query=self._deck_filter(deck_name))
+        deck_index = {}
+        for notes_info in self._iter_notes_info(note_ids, chunk_size):
+            self._index_notes_info(deck_index, notes_info, deck_name, reference_fields)
 
-        updated_fields = existing_note.to_anki_dict()
-        if changes_detected:
-            updated_note = {"id": existing_note.id, **updated_fields}
-            self.anki_connection("updateNoteFields", note=updated_note)
-            return True
+        logger.info(f"Indexed {len(deck_index)} notes of deck '{deck_name}'")
+        return deck_index
 
-        return False
+    def _build_key_index(
+        self, deck_name: str, reference_fields: List[str], chunk_size: int
+    ) -> Dict[Hashable, AnkiNote]:
+        note_ids = self.anki_connection("findNotes", query=self._key_filter(deck_name))
+        key_index = {}
+        for notes_info in self._iter_notes_info(note_ids, chunk_size):
+            self._index_notes_info(
+                key_index, notes_info, deck_name, reference_fields, by_key=True
+            )
+
+        logger.info(f"Indexed {len(key_index)} keyed notes of deck '{deck_name}'")
+        return key_index
+
+    def _find_notes_batched(
+        self, anki_notes: List[AnkiNote], reference_fields: List[str], chunk_size: int
+    ) -> Dict[Tuple[str, ...], AnkiNote]:
+        deck_name = anki_notes[0].deckName
+        note_ids = {}
+        for query in self._build_batched_find_queries(anki_notes, reference_fields):
+            note_ids.update(
+                dict.fromkeys(self.anki_connection("findNotes", query=query))
+            )
+
+        deck_index = {}
+        for notes_info in self._iter_notes_info(list(note_ids), chunk_size):
+            self._index_notes_info(deck_index, notes_info, deck_name, reference_fields)
+        return deck_index
+
+    def _iter_notes_info(
+        self, note_ids: List[int], chunk_size: int, prefetch: bool = False
+    ) -> Iterator[List[Dict]]:
+        chunks = [
+            note_ids[start : start + chunk_size]
+            for start in range(0, len(note_ids), chunk_size)
+        ]
+        if not prefetch:
+            for chunk in chunks:
+                yield self.anki_connection("notesInfo", notes=chunk)
+            return
+
+        # Request the next chunk while the caller consumes the current one.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_notes = None
+            for chunk in chunks:
+                future = executor.submit(self.anki_connection, "notesInfo", notes=chunk)
+                if next_notes is not None:
+                    yield next_notes.result()
+                next_notes = future
+            if next_notes is not None:
+                yield next_notes.result()
 
     # utils
     def _find_notes_like(
         self, note: AnkiNote, reference_fields: List[str] = ["front", "back"]
     ) -> List[int]:
-        filters = []
-        for field in reference_fields:
-            field_value = normalize_text(getattr(note, field)).replace("\\", "\\\\")
-            filters.append(f'{field}:"{field_value}"')
-
-        field_filter = " ".join(filters)
-        query = f'deck:"{note.deckName}" {field_filter}'
+        query = self._build_find_query(note, reference_fields)
         return self.anki_connection("findNotes", query=query)
 
     def _get_note(self, note_id: int, deck_name: str) -> AnkiNote:
@@ -192,18 +1185,7 @@ class AnkiImporterExporter:
         if not notes:
             return None
 
-        note_info = notes[0]
-        fields = note_info["fields"]
-        return AnkiNote(
-            deckName=deck_name,
-            modelName=note_info["modelName"],
-            front=fields["front"]["value"],
-            back=fields["back"]["value"],
-            audio=fields.get("audio", {}).get("value", None),
-            image=fields.get("image", {}).get("value", None),
-            tags=note_info.get("tags", []),
-            id=note_id,
-        )
+        return self._note_from_info(notes[0], note_id, deck_name)
 
     def _if_not_exists_create_deck(self, deck_name: str) -> None:
         existing_decks = self.anki_connection("deckNames")
@@ -219,3 +1201,401 @@ class AnkiImporterExporter:
                 raise Exception(f"Failed to create deck '{deck_name}'.")
         else:
             logger.info(f"Deck '{deck_name}' already exists.")
+
+
+class AsyncAnkiImporterExporter(_ImporterExporterBase):
+    """
+    Asyncio counterpart of `AnkiImporterExporter`.
+
+    The import, update and export paths issue their AnkiConnect calls concurrently through an
+    `AsyncAnkiConnection`, which bounds how many requests are in flight. Results keep the order of the input notes.
+
+    Attributes:
+        anki_connection (AsyncAnkiConnection): The asynchronous connection used to interact with AnkiConnect.
+
+    Methods:
+        export_to_txt(deck_name, output_file): Export flashcards from a specified Anki deck to a text file.
+        import_and_update_notes(input_file, deck_name, model_name): Import flashcards from a file into Anki and update existing notes.
+        add_anki_notes(anki_notes): Add new flashcards to Anki.
+        update_anki_notes(anki_notes, reference_fields, changing_fields): Update existing flashcards in Anki.
+    """
+
+    def __init__(self, anki_connection: Optional[AsyncAnkiConnection] = None) -> None:
+        super().__init__(
+            AsyncAnkiConnection() if anki_connection is None else anki_connection
+        )
+
+    # export
+    async def export_to_txt(
+        self,
+        deck_name: str,
+        output_file: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        prefetch: bool = True,
+    ) -> None:
+        output_file = self._prepare_output_file(output_file)
+        note_ids = await self._fetch_deck_note_ids(deck_name)
+        chunks = [
+            note_ids[start : start + chunk_size]
+            for start in range(0, len(note_ids), chunk_size)
+        ]
+
+        logger.info(f"Exporting {len(note_ids)} notes to {output_file}")
+
+        with open(output_file, "w", encoding="utf-8") as file:
+            next_notes = None
+            for i in tqdm(range(len(chunks)), desc="Exporting notes"):
+                if next_notes is None:
+                    next_notes = asyncio.create_task(
+                        self.anki_connection("notesInfo", notes=chunks[i])
+                    )
+                notes = await next_notes
+                next_notes = None
+                if prefetch and i + 1 < len(chunks):
+                    next_notes = asyncio.create_task(
+                        self.anki_connection("notesInfo", notes=chunks[i + 1])
+                    )
+                await asyncio.to_thread(self._write_note_lines, file, notes)
+
+    async def _fetch_deck_note_ids(self, deck_name: str) -> List[int]:
+        return await self.anki_connection(
+            "findNotes", query=self._deck_filter(deck_name)
+        )
+
+    # import
+    async def import_and_update_notes(
+        self,
+        input_file: str,
+        anki_notes: Optional[List[AnkiNote]],
+        deck_name: str,
+        model_name: str = "basic",
+        reference_fields: Optional[List[str]] = ["front", "back"],
+        changing_fields: Optional[List[str]] = None,
+        allow_duplicates: bool = False,
+        match_strategy: MatchStrategy = MatchStrategy.QUERY,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        await self._if_not_exists_create_deck(deck_name)
+
+        if input_file.endswith(".csv"):
+            await self._load_field_plans([model_name])
+            anki_notes = await asyncio.to_thread(
+                self._get_anki_notes_from_csv,
+                input_file,
+                deck_name,
+                model_name,
+                self._plan_fields(model_name),
+            )
+        elif not anki_notes:
+            raise Exception("Only .csv files or AnkiNotes objects are supported.")
+
+        new_notes = await self.update_anki_notes(
+            anki_notes, reference_fields, changing_fields, match_strategy, chunk_size
+        )
+        await self.add_anki_notes(new_notes, allow_duplicates)
+
+    ## add
+    async def add_anki_notes(
+        self,
+        anki_notes: List[AnkiNote],
+        allow_duplicates: bool = False,
+        max_notes: int = DEFAULT_ADD_CHUNK_NOTES,
+        max_bytes: int = DEFAULT_ADD_CHUNK_BYTES,
+        max_in_flight: int = DEFAULT_ADD_IN_FLIGHT,
+    ) -> WriteReport:
+        await self._load_field_plans(anki_note.modelName for anki_note in anki_notes)
+        chunks = self._chunk_new_notes(
+            anki_notes, allow_duplicates, max_notes, max_bytes, self.field_plans
+        )
+        # As in the sync version, chunks go one after another by default so note ids follow the input order.
+        semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+        async def add_chunk(chunk):
+            async with semaphore:
+                return await self._add_chunk(chunk)
+
+        chunk_reports = await asyncio.gather(*(add_chunk(chunk) for chunk in chunks))
+
+        report = WriteReport()
+        for chunk_report in chunk_reports:
+            report.extend(chunk_report)
+        self._log_add_report(report)
+        return report
+
+    async def _load_field_plans(self, model_names: Iterable[str]) -> None:
+        missing = self.field_plans.missing(model_names)
+        results = await asyncio.gather(
+            *[
+                self.anki_connection("modelFieldNames", modelName=model_name)
+                for model_name in missing
+            ],
+            return_exceptions=True,
+        )
+        for model_name, field_names in zip(missing, results):
+            if isinstance(field_names, requests.RequestException):
+                raise field_names
+            if isinstance(field_names, Exception):
+                logger.warning(
+                    f"Could not fetch the fields of '{model_name}': {field_names}"
+                )
+                continue
+            self.field_plans.add(model_name, field_names)
+
+    async def _add_chunk(self, chunk: List[Tuple[AnkiNote, bytes]]) -> WriteReport:
+        try:
+            note_ids = await self.anki_connection.invoke_encoded(
+                "addNotes", self._encode_add_notes(chunk)
+            )
+        except requests.RequestException:
+            raise
+        except Exception as e:
+            if len(chunk) == 1:
+                return WriteReport(failed=[NoteFailure(chunk[0][0], _error_reason(e))])
+            middle = len(chunk) // 2
+            report = await self._add_chunk(chunk[:middle])
+            report.extend(await self._add_chunk(chunk[middle:]))
+            return report
+
+        return self._added_notes_report(chunk, note_ids)
+
+    ## update
+    async def update_anki_notes(
+        self,
+        anki_notes: List[AnkiNote],
+        reference_fields: Optional[List[str]] = ["front", "back"],
+        changing_fields: Optional[List[str]] = None,
+        match_strategy: MatchStrategy = MatchStrategy.QUERY,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        update_batch_size: int = DEFAULT_UPDATE_BATCH_SIZE,
+        report: Optional[WriteReport] = None,
+    ) -> List[AnkiNote]:
+        match_strategy = MatchStrategy(match_strategy)
+        await self._load_field_plans(anki_note.modelName for anki_note in anki_notes)
+        self._check_reference_fields(anki_notes, reference_fields)
+        deck_name = anki_notes[0].deckName
+        deck_index = None
+        if match_strategy == MatchStrategy.DECK:
+            deck_index = await self._build_deck_index(
+                deck_name, reference_fields, chunk_size
+            )
+        elif match_strategy == MatchStrategy.BATCHED_QUERY:
+            deck_index = await self._find_notes_batched(
+                anki_notes, reference_fields, chunk_size
+            )
+        elif match_strategy == MatchStrategy.KEY:
+            deck_index = await self._build_key_index(
+                deck_name, reference_fields, chunk_size
+            )
+            await self._adopt_existing_notes(
+                anki_notes, deck_index, reference_fields, chunk_size
+            )
+
+        if deck_index is not None:
+            return await self._reconcile_with_deck(
+                anki_notes,
+                reference_fields,
+                changing_fields,
+                deck_index,
+                update_batch_size,
+                report,
+                by_key=match_strategy == MatchStrategy.KEY,
+            )
+
+        existing_notes = await async_tqdm.gather(
+            *[
+                self._find_existing_note(anki_note, reference_fields)
+                for anki_note in anki_notes
+            ],
+            desc="Updating notes",
+        )
+
+        new_notes, matches = [], []
+        for anki_note, existing_note in zip(anki_notes, existing_notes):
+            if existing_note is None:
+                new_notes.append(anki_note)
+            else:
+                matches.append((anki_note, existing_note))
+
+        update_report = await self._update_notes(
+            matches, changing_fields, update_batch_size, report
+        )
+        logger.info(f"{len(update_report.succeeded)} notes updated")
+        return new_notes
+
+    async def _reconcile_with_deck(
+        self,
+        anki_notes: List[AnkiNote],
+        reference_fields: List[str],
+        changing_fields: Optional[List[str]],
+        deck_index: Dict[Hashable, AnkiNote],
+        update_batch_size: int = DEFAULT_UPDATE_BATCH_SIZE,
+        report: Optional[WriteReport] = None,
+        by_key: bool = False,
+    ) -> List[AnkiNote]:
+        new_notes, matches = [], []
+        for anki_note in anki_notes:
+            existing_note = deck_index.get(
+                self._match_key(anki_note, reference_fields, by_key)
+            )
+            if existing_note is None:
+                new_notes.append(anki_note)
+            else:
+                anki_note.id = existing_note.id
+                matches.append((anki_note, existing_note))
+
+        update_report = await self._update_notes(
+            matches, changing_fields, update_batch_size, report
+        )
+        self._log_reconcile_counts(anki_notes, new_notes, update_report)
+        return new_notes
+
+    async def _build_deck_index(
+        self, deck_name: str, reference_fields: List[str], chunk_size: int
+    ) -> Dict[Tuple[str, ...], AnkiNote]:
+        note_ids = await self.anki_connection(
+            "findNotes", query=self._deck_filter(deck_name)
+        )
+        deck_index = await self._index_note_ids(
+            note_ids, deck_name, reference_fields, chunk_size
+        )
+        logger.info(f"Indexed {len(deck_index)} notes of deck '{deck_name}'")
+        return deck_index
+
+    async def _build_key_index(
+        self, deck_name: str, reference_fields: List[str], chunk_size: int
+    ) -> Dict[Hashable, AnkiNote]:
+        note_ids = await self.anki_connection(
+            "findNotes", query=self._key_filter(deck_name)
+        )
+        key_index = await self._index_note_ids(
+            note_ids, deck_name, reference_fields, chunk_size, by_key=True
+        )
+        logger.info(f"Indexed {len(key_index)} keyed notes of deck '{deck_name}'")
+        return key_index
+
+    async def _adopt_existing_notes(
+        self,
+        anki_notes: List[AnkiNote],
+        key_index: Dict[Hashable, AnkiNote],
+        reference_fields: List[str],
+        chunk_size: int,
+    ) -> None:
+        unmatched = self._unmatched_by_key(anki_notes, key_index, reference_fields)
+        if not unmatched:
+            return
+
+        fallback_index = await self._find_notes_batched(
+            unmatched, reference_fields, chunk_size
+        )
+        batch = self.anki_connection.batch()
+        adoptions = self._queue_adoptions(
+            batch, unmatched, fallback_index, key_index, reference_fields
+        )
+        await self.anki_connection.flush(batch)
+        self._log_adoptions(adoptions)
+
+    async def _find_notes_batched(
+        self, anki_notes: List[AnkiNote], reference_fields: List[str], chunk_size: int
+    ) -> Dict[Tuple[str, ...], AnkiNote]:
+        queries = self._build_batched_find_queries(anki_notes, reference_fields)
+        results = await asyncio.gather(
+            *[self.anki_connection("findNotes", query=query) for query in queries]
+        )
+        note_ids = list(dict.fromkeys(itertools.chain.from_iterable(results)))
+        return await self._index_note_ids(
+            note_ids, anki_notes[0].deckName, reference_fields, chunk_size
+        )
+
+    async def _index_note_ids(
+        self,
+        note_ids: List[int],
+        deck_name: str,
+        reference_fields: List[str],
+        chunk_size: int,
+        by_key: bool = False,
+    ) -> Dict[Hashable, AnkiNote]:
+        chunks = await asyncio.gather(
+            *[
+                self.anki_connection(
+                    "notesInfo", notes=note_ids[start : start + chunk_size]
+                )
+                for start in range(0, len(note_ids), chunk_size)
+            ]
+        )
+
+        deck_index = {}
+        for notes_info in chunks:
+            self._index_notes_info(
+                deck_index, notes_info, deck_name, reference_fields, by_key
+            )
+        return deck_index
+
+    async def _find_existing_note(
+        self, anki_note: AnkiNote, reference_fields: List[str]
+    ) -> Optional[AnkiNote]:
+        """Returns None when the note does not exist yet."""
+        matching_notes = await self._find_notes_like(anki_note, reference_fields)
+        if not matching_notes:
+            return None
+
+        existing_note = await self._get_note(matching_notes[0], anki_note.deckName)
+        anki_note.id = matching_notes[0]
+        return existing_note
+
+    async def _update_notes(
+        self,
+        matches: List[Tuple[AnkiNote, AnkiNote]],
+        changing_fields: Optional[List[str]],
+        update_batch_size: int,
+        report: Optional[WriteReport] = None,
+    ) -> WriteReport:
+        batches, updates, tag_changes = [], [], TagChanges()
+
+        def queue(action, **params):
+            # Actions go in batches of `update_batch_size`, sent concurrently below.
+            if not batches or len(batches[-1]) >= update_batch_size:
+                batches.append(self.anki_connection.batch())
+            return batches[-1](action, **params)
+
+        for anki_note, existing_note in matches:
+            self._queue_update(
+                queue,
+                updates,
+                anki_note,
+                existing_note,
+                changing_fields,
+                tag_changes,
+            )
+        self._queue_tag_changes(queue, updates, tag_changes)
+
+        await asyncio.gather(*(self.anki_connection.flush(batch) for batch in batches))
+        return self._update_report(updates, report)
+
+    # utils
+    async def _find_notes_like(
+        self, note: AnkiNote, reference_fields: List[str] = ["front", "back"]
+    ) -> List[int]:
+        query = self._build_find_query(note, reference_fields)
+        return await self.anki_connection("findNotes", query=query)
+
+    async def _get_note(self, note_id: int, deck_name: str) -> AnkiNote:
+        notes = await self.anki_connection("notesInfo", notes=[note_id])
+        if not notes:
+            return None
+
+        return self._note_from_info(notes[0], note_id, deck_name)
+
+    async def _if_not_exists_create_deck(self, deck_name: str) -> None:
+        existing_decks = await self.anki_connection("deckNames")
+
+        if deck_name not in existing_decks:
+            logger.info(f"Deck '{deck_name}' does not exist. Creating it...")
+            deck_id = await self.anki_connection("createDeck", deck=deck_name)
+            if deck_id:
+                logger.info(
+                    f"Deck '{deck_name}' created successfully with ID {deck_id}."
+                )
+            else:
+                raise Exception(f"Failed to create deck '{deck_name}'.")
+        else:
+            logger.info(f"Deck '{deck_name}' already exists.")
@@ -1,13 +1,18 @@
 """
-Script for generating audio files from text using Google Text-to-Speech (gTTS).
+Script for generating audio files from text with a TTS backend, Google Text-to-Speech (gTTS) by default.
 """
+
 import os
 import re
-from gtts import gTTS
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from dotenv import load_dotenv
 from pathlib import Path
 from ..utils import setup_logger
+from .backends import GTTSBackend
+from .cache import audio_key
 
 # Configure logging
 logger = setup_logger(name=__name__)
@@ -16,11 +21,35 @@ logger = setup_logger(name=__name__)
 load_dotenv()
 DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE")
 ANKI_MEDIA_FOLDER = os.getenv("ANKI_MEDIA_FOLDER")
+DEFAULT_MAX_WORKERS = 1
+
+
+class RateLimiter:
+    """
+    Spaces calls at least `1 / requests_per_second` seconds apart, across all the threads sharing the limiter.
+    Without a rate, calls are never delayed.
+    """
+
+    def __init__(self, requests_per_second=None):
+        self.interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
 
 
 class AudioGenerator:
     """
-    A class that generates audio files from given text using Google's Text-to-Speech (gTTS) service.
+    A class that generates audio files from given text using a TTS backend, Google's Text-to-Speech (gTTS) service
+    by default (see `manki.tts.backends` for the offline ones).
 
     This class is particularly useful for creating language learning materials, such as generating pronunciations
     for words or phrases in a foreign language. It can also automatically generate an import file for Anki, a popular
@@ -30,10 +59,18 @@ class AudioGenerator:
         lang (str): The language in which the text is to be spoken, e.g., 'en' for English, 'fr' for French.
         anki_media_folder (str): Path to the Anki media folder where audio files will be stored.
         replace_duplicates (bool): If True, existing audio files with the same name will be replaced.
+        max_workers (int): How many audio files are generated at the same time.
+        backend (TTSBackend): The engine turning text into audio files.
+        rate_limiter (RateLimiter): Caps the requests per second sent to the backend by all workers together.
+        cache (AudioCache): Optional content-addressed cache; cached clips are linked into the media folder
+            instead of being synthesized again, and file names get a short hash of the clip so the same text
+            in another language no longer collides.
 
     Methods:
         sanitize_filename(filename): Sanitizes the filename to remove any invalid characters.
+        audio_filename(text): The media file name of the audio of a text.
         text_to_audio(text, filename): Converts the given text to audio and saves it as a file.
+        generate_audio_files(texts): Generates the audio files of many texts concurrently.
         generate_audio_files_from_text(input_file, output_file): Generates audio files from the text in the input file
             and creates an Anki import file with links to these audio files.
         generate_from_dataframe(df, text_column, output_file): Same as above but takes a Pandas DataFrame as input.
@@ -44,77 +81,139 @@ class AudioGenerator:
         lang=DEFAULT_LANGUAGE,
         anki_media_folder=ANKI_MEDIA_FOLDER,
         replace_duplicates=True,
+        max_workers=DEFAULT_MAX_WORKERS,
+        requests_per_second=None,
+        cache=None,
+        backend=None,
     ):
         self.lang = lang
         self.anki_media_folder = anki_media_folder
         self.replace_duplicates = replace_duplicates
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.cache = cache
+        self.backend = backend if backend is not None else GTTSBackend()
 
     @staticmethod
     def sanitize_filename(filename):
         return re.sub(r'[\\/*?:"<>|]', "_", filename)
 
+    def audio_filename(self, text):
+        extension = self.backend.extension
+        if self.cache is None:
+            return f"{self.sanitize_filename(text)}.{extension}"
+        return f"{self.sanitize_filename(text)}-{self._audio_key(text)[:8]}.{extension}"
+
+    def _audio_key(self, text):
+        # Local engines write wav or mp3 depending on whether ffmpeg is installed.
+        return audio_key(
+            text, self.lang, False, self.backend.name, self.backend.extension
+        )
+
     def text_to_audio(self, text, filename):
+        self.rate_limiter.wait()
         try:
-            tts = gTTS(text=text, lang=self.lang, slow=False)
-            tts.save(filename)
+            self.backend.synthesize(text, self.lang, False, filename)
         except Exception as e:
             logger.error(f"Audio generation failed for text: {text}, error: {e}")
             raise
 
+    def generate_audio_files(self, texts):
+        """
+        Generates the audio file of every text, `max_workers` at a time, and returns the audio file name of each
+        text in the order given, or None where generation failed. Failures are logged and do not stop the others.
+        """
+        filenames = [self.audio_filename(text) for text in texts]
+
+        # Texts sharing a file name are generated once.
+        pending = {}
+        for text, filename in zip(texts, filenames):
+            path = os.path.join(self.anki_media_folder, filename)
+            if filename not in pending and (
+                not os.path.exists(path) or self.replace_duplicates
+            ):
+                pending[filename] = (text, path)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, tqdm(
+            desc="Generating audio files", total=len(pending)
+        ) as progress_bar:
+
+            def generate(item):
+                text, path = item
+                try:
+                    if self.cache is None:
+                        self.text_to_audio(text, path)
+                    else:
+                        self._cached_text_to_audio(text, path)
+                    return True
+                except Exception:
+                    return False
+                finally:
+                    progress_bar.update(1)
+
+            generated = list(executor.map(generate, pending.values()))
+
+        failed = {filename for filename, ok in zip(pending, generated) if not ok}
+        logger.info(
+            f"{len(pending) - len(failed)} audio files generated, {len(failed)} failed"
+        )
+        if self.cache is not None:
+            self.cache.save()
+            logger.info(
+                f"Audio cache: {self.cache.hits} hits, {self.cache.misses} misses"
+            )
+        return [None if filename in failed else filename for filename in filenames]
+
+    def _cached_text_to_audio(self, text, filename):
+        key = self._audio_key(text)
+        if self.cache.get(key) is not None and self.cache.link(key, filename):
+            return
+        # Not cached, or evicted by another thread between the lookup and the link.
+        staging_path = self.cache.staging_path(key)
+        try:
+            self.text_to_audio(text, str(staging_path))
+            self.cache.put(key, staging_path)
+        finally:
+            staging_path.unlink(missing_ok=True)
+        if not self.cache.link(key, filename):
+            # Evicted again before it could be linked: write this one outside the cache.
+            self.text_to_audio(text, filename)
+
     def generate_audio_files_from_text(self, input_file, output_file):
         with open(input_file, "r", encoding="utf-8") as file:
             lines = [line for line in file if not line.startswith("#") and "\t" in line]
 
-        anki_lines = []  # Collect lines for Anki import file
-        c = 0
-
-        for line in tqdm(lines, desc="Generating audio files", total=len(lines)):
-            text = line.split("\t")[1].strip()
-            sanitized_text = self.sanitize_filename(text)
-            filename = os.path.join(self.anki_media_folder, f"{sanitized_text}.mp3")
-            if not os.path.exists(filename) or self.replace_duplicates:
-                self.text_to_audio(text, filename)
-                c += 1
-
-            # Prepare line for Anki import file
-            audio_filename = f"{sanitized_text}.mp3"
-            anki_line = self._prepare_anki_line(line, audio_filename)
-            anki_lines.append(anki_line)
+        texts = [line.split("\t")[1].strip() for line in lines]
+        audio_filenames = self.generate_audio_files(texts)
 
-        logger.info(f"{c} audio files generated")
+        # Prepare lines for Anki import file
+        anki_lines = [
+            self._prepare_anki_line(line, audio_filename)
+            for line, audio_filename in zip(lines, audio_filenames)
+        ]
 
         # Generate Anki import file
         self._generate_anki_import_file(anki_lines, output_file)
 
     def generate_from_dataframe(self, df, text_column, output_file):
-        anki_lines = []
-        c = 0
-
-        for index, row in tqdm(
-            df.iterrows(), desc="Generating audio files", total=len(df)
-        ):
-            text = row[text_column]
-            sanitized_text = self.sanitize_filename(text)
-            filename = os.path.join(self.anki_media_folder, f"{sanitized_text}.mp3")
-            if not os.path.exists(filename) or self.replace_duplicates:
-                self.text_to_audio(text, filename)
-                c += 1
+        audio_filenames = self.generate_audio_files(df[text_column].tolist())
 
-            audio_filename = f"{sanitized_text}.mp3"
-            audio_tag = f"[sound:{audio_filename}]"
+        anki_lines = []
+        for (index, row), audio_filename in zip(df.iterrows(), audio_filenames):
+            audio_tag = f"[sound:{audio_filename}]" if audio_filename else ""
 
             # Assuming the DataFrame has 'french' and 'spanish' columns
             anki_line = f"{row['spanish']}\t{row['french']}\t{audio_tag}"
             anki_lines.append(anki_line)
 
-        logger.info(f"{c} audio files generated")
-
         # Generate Anki import file
         self._generate_anki_import_file(anki_lines, output_file)
 
     @staticmethod
     def _prepare_anki_line(line, audio_filename):
         fields = line.strip().split("\t")
+        if audio_filename is None:
+            return "\t".join(fields)  # No audio was generated for this line
         audio_tag = f"[sound:{audio_filename}]"
         if len(fields) < 3 or not fields[2].startswith("[sound:"):
             fields.append(
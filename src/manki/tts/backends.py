@@ -0,0 +1,182 @@
+"""
+Text-to-speech backends used by `AudioGenerator`.
+
+Every backend writes the audio of one text to a file and has a `name`, which is part of the audio cache key, and
+the `extension` of the files it writes. `GTTSBackend` calls Google's TTS service, `EspeakBackend` and
+`PiperBackend` run a locally installed engine (their wav output is converted to mp3 when ffmpeg is installed),
+and `StubBackend` writes deterministic silent clips, for tests and benchmarks without network.
+"""
+
+import os
+import shutil
+import subprocess
+import time
+import wave
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional
+
+from gtts import gTTS
+
+STUB_SAMPLE_RATE = 8000
+STUB_SECONDS_PER_CHARACTER = 0.01
+
+
+class TTSBackend(ABC):
+    """
+    Base class of the TTS backends.
+
+    Attributes:
+        name (str): Identifies the backend and its voice in audio cache keys.
+        extension (str): Extension of the audio files the backend writes.
+
+    Methods:
+        synthesize(text, lang, slow, filename): Writes the audio of `text` to `filename`.
+    """
+
+    name = "base"
+    extension = "mp3"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str, slow: bool, filename: str) -> None:
+        pass
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    extension = "mp3"
+
+    def synthesize(self, text: str, lang: str, slow: bool, filename: str) -> None:
+        gTTS(text=text, lang=lang, slow=slow).save(filename)
+
+
+class CommandBackend(TTSBackend):
+    """
+    A local TTS engine run as a subprocess writing a wav file, converted to mp3 with ffmpeg when it is installed.
+    """
+
+    executable = ""
+
+    def __init__(self) -> None:
+        path = shutil.which(self.executable)
+        if path is None:
+            raise Exception(f"{self.executable} is not installed")
+        self.path = path
+        self.ffmpeg = shutil.which("ffmpeg")
+        self.extension = "mp3" if self.ffmpeg else "wav"
+
+    def synthesize(self, text: str, lang: str, slow: bool, filename: str) -> None:
+        if self.ffmpeg is None:
+            self._run(self.command(lang, slow, filename), text)
+            return
+
+        wav_filename = f"{filename}.wav"
+        try:
+            self._run(self.command(lang, slow, wav_filename), text)
+            # The format is given explicitly as callers may write to temporary file names.
+            self._run(
+                [
+                    self.ffmpeg,
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-i",
+                    wav_filename,
+                    "-f",
+                    "mp3",
+                    filename,
+                ]
+            )
+        finally:
+            if os.path.exists(wav_filename):
+                os.remove(wav_filename)
+
+    @abstractmethod
+    def command(self, lang: str, slow: bool, wav_filename: str) -> List[str]:
+        """The command writing the audio of the text read from stdin to `wav_filename`."""
+
+    @staticmethod
+    def _run(command: List[str], text: Optional[str] = None) -> None:
+        result = subprocess.run(
+            command, input=text, capture_output=True, encoding="utf-8"
+        )
+        if result.returncode != 0:
+            raise Exception(
+                f"{Path(command[0]).name} failed with exit code {result.returncode}: {result.stderr.strip()}"
+            )
+
+
+class EspeakBackend(CommandBackend):
+    name = "espeak-ng"
+    executable = "espeak-ng"
+
+    def command(self, lang: str, slow: bool, wav_filename: str) -> List[str]:
+        speed = ["-s", "120"] if slow else []
+        return [self.path, "-v", lang, *speed, "-w", wav_filename, "--stdin"]
+
+
+class PiperBackend(CommandBackend):
+    """Piper voices are models of a single language, so `lang` is ignored in favour of the model."""
+
+    executable = "piper"
+
+    def __init__(self, model: str) -> None:
+        super().__init__()
+        self.model = model
+        self.name = f"piper:{Path(model).stem}"
+
+    def command(self, lang: str, slow: bool, wav_filename: str) -> List[str]:
+        speed = ["--length_scale", "1.5"] if slow else []
+        return [self.path, "--model", self.model, *speed, "--output_file", wav_filename]
+
+
+class StubBackend(TTSBackend):
+    """
+    Writes a silent wav clip whose length only depends on the text, after waiting `latency` seconds to stand in
+    for a real engine.
+    """
+
+    name = "stub"
+    extension = "wav"
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+
+    def synthesize(self, text: str, lang: str, slow: bool, filename: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        n_frames = int(
+            len(text)
+            * STUB_SECONDS_PER_CHARACTER
+            * STUB_SAMPLE_RATE
+            * (2 if slow else 1)
+        )
+        with wave.open(filename, "wb") as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(STUB_SAMPLE_RATE)
+            clip.writeframes(b"\x00\x00" * n_frames)
+
+
+def create_backend(name: str = "gtts", piper_model: Optional[str] = None) -> TTSBackend:
+    """
+    Creates a backend by name: `gtts`, `espeak-ng`, `piper` (which needs `piper_model`), `stub`, or `local` for
+    the first local engine installed, piper when a model is given and espeak-ng otherwise.
+    """
+    if name == "gtts":
+        return GTTSBackend()
+    if name == "stub":
+        return StubBackend()
+    if name == "espeak-ng":
+        return EspeakBackend()
+    if name == "piper":
+        if not piper_model:
+            raise Exception("The piper backend needs a voice model")
+        return PiperBackend(piper_model)
+    if name == "local":
+        if piper_model and shutil.which(PiperBackend.executable):
+            return PiperBackend(piper_model)
+        if shutil.which(EspeakBackend.executable):
+            return EspeakBackend()
+        raise Exception("No local TTS engine found: install espeak-ng or piper")
+    raise Exception(f"Unknown TTS backend: {name}")
@@ -0,0 +1,190 @@
+"""
+Content-addressed cache of synthesized audio.
+
+Clips are keyed by a hash of everything that changes the audio (text, language, speed, TTS backend and the
+format it writes) and stored as `<root>/<k[:2]>/<k[2:4]>/<k>`, so the same text is only ever synthesized once,
+whatever deck or media file name it is used for. An index (`<root>/index.json`) keeps the size and last use of every clip, and
+the least recently used clips are evicted once the cache grows past its size or entry limit. Media folders get
+hard links to the cached clips, or copies where linking is not possible.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from manki.utils import setup_logger
+
+logger = setup_logger(name=__name__)
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+
+def audio_key(text: str, lang: str, slow: bool, backend: str, extension: str) -> str:
+    parts = [text, lang or "", "slow" if slow else "normal", backend, extension]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    A size-bounded, content-addressed store of audio clips.
+
+    The index is read when the cache is opened and written by `save()` (or when leaving the cache as a context
+    manager). Clips missing from disk are dropped from the index when looked up. The cache is safe to share
+    between threads.
+
+    Attributes:
+        root (Path): The cache folder.
+        max_bytes (int): Total size of the clips above which the least recently used ones are evicted.
+        max_entries (Optional[int]): Number of clips above which the least recently used ones are evicted.
+        hits (int): Lookups answered by the cache.
+        misses (int): Lookups that were not.
+
+    Methods:
+        get(key): The path of a cached clip, or None.
+        put(key, source): Moves a freshly synthesized clip into the cache and returns its path.
+        staging_path(key): A path to synthesize a clip into before `put`.
+        link(key, destination): Links or copies a cached clip to `destination`, returning False if it is gone.
+        save(): Writes the index.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Least recently used first, with the total size kept alongside.
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict(
+            sorted(self._load_index().items(), key=lambda item: item[1][1])
+        )
+        self._total_bytes = sum(size for size, _ in self._entries.values())
+
+    def __enter__(self) -> "AudioCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.save()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return int(self._total_bytes)
+
+    def path(self, key: str) -> Path:
+        # No extension: the format is part of the key.
+        return self.root / key[:2] / key[2:4] / key
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.path(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not path.exists():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry[1] = self._clock()
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return path
+
+    def staging_path(self, key: str) -> Path:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f"{key}.{threading.get_ident()}.tmp")
+
+    def put(self, key: str, source: Path) -> Path:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, path)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = [path.stat().st_size, self._clock()]
+            self._total_bytes += self._entries[key][0]
+            self._evict(keep=key)
+        return path
+
+    def link(self, key: str, destination: str) -> bool:
+        # The clip may have been evicted by another thread since it was looked up.
+        source = self.path(key)
+        if not source.exists():
+            return False
+        destination = Path(destination)
+        try:
+            if destination.exists() or destination.is_symlink():
+                if destination.exists() and os.path.samefile(source, destination):
+                    return True
+                destination.unlink()
+            try:
+                os.link(source, destination)
+            except FileNotFoundError:
+                return False
+            except OSError:
+                # Another filesystem, or one without hard links.
+                shutil.copyfile(source, destination)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        index_path = self.root / INDEX_FILE
+        temporary_path = index_path.with_name(f".{INDEX_FILE}.tmp")
+        with self._lock:
+            data = {"version": INDEX_VERSION, "entries": dict(self._entries)}
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary_path, index_path)
+
+    def _over_limits(self) -> bool:
+        return self._total_bytes > self.max_bytes or (
+            self.max_entries is not None and len(self._entries) > self.max_entries
+        )
+
+    def _remove(self, key: str) -> None:
+        size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._over_limits():
+            key = next(iter(self._entries))
+            if key == keep:
+                # The clip just added is all that is left.
+                break
+            self._remove(key)
+            self.path(key).unlink(missing_ok=True)
+            logger.info(f"Evicted cached audio {key}")
+
+    def _load_index(self) -> Dict[str, List[float]]:
+        index_path = self.root / INDEX_FILE
+        if not index_path.exists():
+            return {}
+        with open(index_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != INDEX_VERSION:
+            logger.warning(f"Ignoring audio cache index {index_path}: unknown version")
+            return {}
+        return data["entries"]
@@ -2,9 +2,13 @@
 Script containing the logger setup.
 """
 
+import contextlib
+import gc
 import logging
 import os
+import queue
 import re
+import threading
 import unicodedata
 from logging.handlers import RotatingFileHandler
 
@@ -50,3 +54,75 @@ def normalize_text(text):
     text = text.strip()
     text = text.lower()
     return text
+
+
+def prefetch(iterable, depth=2):
+    """
+    Iterate over `iterable` on a background thread, keeping up to `depth` items ready ahead of the consumer.
+
+    Exceptions raised while producing items are re-raised in the consumer. If the consumer stops early, the
+    producer stops after the item it is working on.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:
+            put((done, e))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Pause the cyclic garbage collector while building many objects at once, so collections do not keep walking
+    the objects built so far; they are collected once the block exits.
+
+    The collector is process-wide, so blocks running on several threads at once share one pause: the first block
+    to enter disables it and the last one to exit restores the state it found.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
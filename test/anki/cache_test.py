@@ -0,0 +1,156 @@
+import json
+
+import pytest
+import requests_mock
+
+from manki.anki.cache import AnkiCache
+from manki.anki.connection import AnkiConnection
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return AnkiCache(ttl=10, max_size=3, clock=clock)
+
+
+@pytest.fixture
+def requests_mocker():
+    with requests_mock.Mocker() as m:
+        yield m
+
+
+@pytest.fixture
+def cached_connection(cache):
+    return AnkiConnection(
+        url="http://localhost:8765", api_version=6, api_key="apikey", cache=cache
+    )
+
+
+def _notes_info(request, context):
+    note_ids = json.loads(request.text)["params"]["notes"]
+    return {"result": [{"noteId": i, "fields": {}} for i in note_ids], "error": None}
+
+
+class TestAnkiCache:
+    def test_entries_expire_after_ttl(self, cache, clock):
+        # arrange
+        cache.put("deckNames", {}, ["Default"])
+
+        # act
+        fresh = cache.get("deckNames", {})
+        clock.now = 11
+        expired = cache.get("deckNames", {})
+
+        # assert
+        assert fresh == (True, ["Default"])
+        assert expired == (False, None)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_least_recently_used_entry_is_evicted(self, cache):
+        # arrange
+        cache.put("findNotes", {"query": "a"}, [1])
+        cache.put("findNotes", {"query": "b"}, [2])
+        cache.put("findNotes", {"query": "c"}, [3])
+        cache.get("findNotes", {"query": "a"})
+
+        # act
+        cache.put("findNotes", {"query": "d"}, [4])
+
+        # assert
+        assert len(cache) == 3
+        assert cache.get("findNotes", {"query": "b"}) == (False, None)
+        assert cache.get("findNotes", {"query": "a"}) == (True, [1])
+
+    def test_update_invalidates_note_and_queries(self, cache):
+        # arrange
+        cache.put_notes([{"noteId": 1}, {"noteId": 2}])
+        cache.put("findNotes", {"query": "deck:current"}, [1, 2])
+        cache.put("deckNames", {}, ["current"])
+
+        # act
+        cache.invalidate("updateNoteFields", {"note": {"id": 1, "fields": {}}})
+
+        # assert
+        cached, missing = cache.get_notes([1, 2])
+        assert missing == [1]
+        assert list(cached) == [2]
+        assert cache.get("findNotes", {"query": "deck:current"}) == (False, None)
+        assert cache.get("deckNames", {}) == (True, ["current"])
+
+    def test_unknown_write_action_clears_cache(self, cache):
+        # arrange
+        cache.put("deckNames", {}, ["current"])
+
+        # act
+        cache.invalidate("deleteDecks", {"decks": ["current"]})
+
+        # assert
+        assert len(cache) == 0
+
+
+class TestCachedAnkiConnection:
+    def test_deck_names_are_fetched_once_until_create_deck(
+        self, cached_connection, requests_mocker
+    ):
+        # arrange
+        requests_mocker.post(
+            "http://localhost:8765", json={"result": ["Default"], "error": None}
+        )
+
+        # act
+        cached_connection("deckNames")
+        cached_connection("deckNames")
+        cached_connection("createDeck", deck="current")
+        cached_connection("deckNames")
+
+        # assert
+        actions = [
+            json.loads(r.text)["action"] for r in requests_mocker.request_history
+        ]
+        assert actions == ["deckNames", "createDeck", "deckNames"]
+
+    def test_notes_info_only_fetches_missing_ids(
+        self, cached_connection, requests_mocker
+    ):
+        # arrange
+        requests_mocker.post("http://localhost:8765", json=_notes_info)
+
+        # act
+        cached_connection("notesInfo", notes=[1, 2])
+        result = cached_connection("notesInfo", notes=[2, 3, 1])
+
+        # assert
+        requested = [
+            json.loads(r.text)["params"]["notes"]
+            for r in requests_mocker.request_history
+        ]
+        assert requested == [[1, 2], [3]]
+        assert [note["noteId"] for note in result] == [2, 3, 1]
+
+    def test_batched_writes_invalidate_cache(self, cached_connection, requests_mocker):
+        # arrange
+        requests_mocker.post("http://localhost:8765", json=_notes_info)
+        cached_connection("notesInfo", notes=[1])
+        requests_mocker.post(
+            "http://localhost:8765",
+            json={"result": [{"result": None, "error": None}], "error": None},
+        )
+
+        # act
+        with cached_connection.batch() as batch:
+            batch("updateNoteFields", note={"id": 1, "fields": {"back": "new"}})
+
+        # assert
+        assert cached_connection.cache.get_notes([1]) == ({}, [1])
@@ -0,0 +1,180 @@
+import sqlite3
+
+import pytest
+
+from manki.anki.collection import AnkiCollectionReader
+from manki.anki.domain import AnkiNote, MatchStrategy
+from manki.anki.fake import FakeAnkiCollection
+from manki.anki.xport import AnkiImporterExporter
+
+
+def _create_vocabulary_notes(start, stop):
+    return [
+        AnkiNote(
+            deckName="vocabulary",
+            modelName="basic",
+            front=f"word{i} (noun)",
+            back=f"mot{i}",
+            tags=["en", "fr"],
+        )
+        for i in range(start, stop)
+    ]
+
+
+@pytest.fixture
+def collection_path(fake_anki, fake_anki_connection, tmp_path):
+    AnkiImporterExporter(fake_anki_connection).import_and_update_notes(
+        input_file="",
+        anki_notes=_create_vocabulary_notes(0, 20),
+        deck_name="vocabulary",
+    )
+    path = tmp_path / "collection.anki2"
+    fake_anki.collection.save(str(path))
+    return path
+
+
+class TestAnkiCollectionReader:
+    def test_export_matches_anki_connect(
+        self, fake_anki_connection, collection_path, tmp_path
+    ):
+        # arrange
+        expected_file = tmp_path / "expected.txt"
+        output_file = tmp_path / "output.txt"
+        AnkiImporterExporter(fake_anki_connection).export_to_txt(
+            "vocabulary", str(expected_file)
+        )
+
+        # act
+        with AnkiCollectionReader(str(collection_path)) as reader:
+            AnkiImporterExporter(reader).export_to_txt(
+                "vocabulary", str(output_file), chunk_size=7
+            )
+
+        # assert
+        assert output_file.read_text(encoding="utf-8") == expected_file.read_text(
+            encoding="utf-8"
+        )
+
+    def test_answers_read_actions_like_anki_connect(
+        self, fake_anki_connection, collection_path
+    ):
+        # arrange
+        query = 'deck:vocabulary "front:word1*" tag:fr'
+        expected_ids = fake_anki_connection("findNotes", query=query)
+
+        # act
+        with AnkiCollectionReader(str(collection_path)) as reader:
+            note_ids = reader("findNotes", query=query)
+            notes_info = reader("notesInfo", notes=note_ids + [1])
+            mod_times = reader("notesModTime", notes=note_ids)
+            field_names = reader("modelFieldNames", modelName="advanced")
+
+        # assert
+        assert note_ids == expected_ids
+        assert notes_info[:-1] == fake_anki_connection("notesInfo", notes=note_ids)
+        assert notes_info[-1] == {}
+        assert mod_times == fake_anki_connection("notesModTime", notes=note_ids)
+        assert field_names == ["front", "back", "audio"]
+
+    def test_diffs_deck_without_writing(self, collection_path):
+        # arrange
+        anki_notes = _create_vocabulary_notes(10, 30)
+
+        # act
+        with AnkiCollectionReader(str(collection_path)) as reader:
+            importer_exporter = AnkiImporterExporter(reader)
+            with reader.record() as recording:
+                new_notes = importer_exporter.update_anki_notes(
+                    anki_notes,
+                    reference_fields=["front"],
+                    match_strategy=MatchStrategy.DECK,
+                )
+            report = importer_exporter.add_anki_notes(new_notes)
+
+        # assert
+        assert [note.front for note in new_notes] == [
+            f"word{i} (noun)" for i in range(20, 30)
+        ]
+        assert all(note.id is not None for note in anki_notes[:10])
+        assert recording.calls("findNotes") == 1
+        assert recording.errors == 0
+        assert len(report.failed) == 10
+        assert "not supported" in report.failed[0].error
+
+    def test_batches_answer_reads_and_reject_writes(self, collection_path):
+        # arrange
+        with AnkiCollectionReader(str(collection_path)) as reader:
+            note_ids = reader("findNotes", query="deck:vocabulary")
+            batch = reader.batch()
+
+            # act
+            results = [batch("notesInfo", notes=[note_id]) for note_id in note_ids[:3]]
+            with pytest.raises(Exception, match="not supported by the read-only"):
+                batch("deleteNotes", notes=note_ids[:1])
+            batch.flush()
+
+            # assert
+            assert [result.result()[0]["noteId"] for result in results] == note_ids[:3]
+            assert len(reader("findNotes", query="deck:vocabulary")) == 20
+
+    def test_reads_newer_schema(self, tmp_path):
+        # arrange
+        path = tmp_path / "collection.anki2"
+        with sqlite3.connect(str(path)) as db:
+            db.executescript(
+                """
+                create table notetypes (id integer primary key, name text not null);
+                create table fields (ntid integer not null, ord integer not null, name text not null);
+                create table decks (id integer primary key, name text not null);
+                create table notes (id integer primary key, mid integer, mod integer, tags text, flds text);
+                create table cards (id integer primary key, nid integer, did integer, ord integer,
+                    odid integer);
+                insert into notetypes values (7, 'Basic');
+                insert into fields values (7, 1, 'Back'), (7, 0, 'Front');
+                insert into decks values (3, 'Languages' || char(31) || 'French');
+                insert into notes values (11, 7, 1700000000, ' fr ', 'chat' || char(31) || 'cat');
+                insert into cards values (21, 11, 99, 0, 3);
+                """
+            )
+        db.close()
+
+        # act
+        with AnkiCollectionReader(str(path)) as reader:
+            deck_names = reader("deckNames")
+            note_ids = reader("findNotes", query='deck:"Languages" front:chat')
+            notes_info = reader("notesInfo", notes=note_ids)
+
+        # assert
+        assert deck_names == ["Languages::French"]
+        assert note_ids == [11]
+        assert notes_info[0]["fields"] == {
+            "Front": {"value": "chat", "order": 0},
+            "Back": {"value": "cat", "order": 1},
+        }
+        assert notes_info[0]["cards"] == [21]
+
+    def test_reads_saved_fake_collection(self, tmp_path):
+        # arrange
+        collection = FakeAnkiCollection()
+        collection.createDeck("vocabulary")
+        collection.addNote(
+            {
+                "deckName": "vocabulary",
+                "modelName": "advanced",
+                "fields": {
+                    "front": "été",
+                    "back": "summer",
+                    "audio": "[sound:ete.mp3]",
+                },
+                "tags": [],
+            }
+        )
+        path = tmp_path / "collection.anki2"
+
+        # act
+        collection.save(str(path))
+        with AnkiCollectionReader(str(path)) as reader:
+            notes_info = reader("notesInfo", notes=list(collection.notes))
+
+        # assert
+        assert notes_info == collection.notesInfo(list(collection.notes))
@@ -1,27 +1,37 @@
+import asyncio
 import json
+import threading
+import time
 from unittest.mock import Mock, patch
 
 import pytest
 
+from manki.anki.connection import AsyncAnkiConnection
 from manki.anki.xport import AnkiConnection
 
 
+def _mock_response(payload):
+    mock_response = Mock()
+    mock_response.json.return_value = payload
+    mock_response.content = json.dumps(payload).encode("utf-8")
+    return mock_response
+
+
 @pytest.fixture(scope="session")
 def anki_connection():
     return AnkiConnection(url="http://localhost:8765", api_version=6, api_key="apikey")
 
 
 class TestAnkiConnection:
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_invoke_success(self, mock_post, anki_connection):
         # arrange
-        mock_response = Mock()
-        mock_response.json.return_value = {"result": ["Default"], "error": None}
+        mock_response = _mock_response({"result": ["Default"], "error": None})
         mock_post.return_value = mock_response
 
         # act
         result = anki_connection.invoke("deckNames")
-        call_args, _ = mock_post.call_args
+        call_args, call_kwargs = mock_post.call_args
         request_url, request_data = call_args
         request_json = json.loads(request_data)
 
@@ -33,3 +43,194 @@ class TestAnkiConnection:
         assert request_json["params"] == {}
         assert request_json["version"] == 6
         assert request_json["key"] == "apikey"
+        assert call_kwargs["timeout"] == anki_connection.timeout
+
+    @patch("requests.Session.post")
+    def test_invoke_reuses_pooled_session(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response({"result": [], "error": None})
+        mock_post.return_value = mock_response
+        session = anki_connection.session
+
+        # act
+        anki_connection.invoke("findNotes", query="deck:current")
+        anki_connection.invoke("notesInfo", notes=[1])
+
+        # assert
+        assert mock_post.call_count == 2
+        assert anki_connection.session is session
+
+    def test_pool_size_and_timeouts_are_configurable(self):
+        # act
+        connection = AnkiConnection(
+            url="http://localhost:8765",
+            pool_size=3,
+            connect_timeout=1.5,
+            read_timeout=10,
+        )
+
+        # assert
+        adapter = connection.session.get_adapter("http://localhost:8765")
+        assert adapter._pool_maxsize == 3
+        assert connection.timeout == (1.5, 10)
+
+    def test_context_manager_closes_session(self):
+        # arrange
+        connection = AnkiConnection(url="http://localhost:8765")
+
+        # act
+        with patch.object(connection.session, "close") as mock_close:
+            with connection as entered:
+                assert entered is connection
+
+        # assert
+        mock_close.assert_called_once()
+
+
+class TestAnkiBatch:
+    @patch("requests.Session.post")
+    def test_batch_flushes_as_single_multi_request(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response(
+            {
+                "result": [
+                    {"result": ["Default"], "error": None},
+                    {"result": [1, 2], "error": None},
+                ],
+                "error": None,
+            }
+        )
+        mock_post.return_value = mock_response
+
+        # act
+        with anki_connection.batch() as batch:
+            decks = batch("deckNames")
+            note_ids = batch("findNotes", query="deck:current")
+        request_json = json.loads(mock_post.call_args[0][1])
+
+        # assert
+        mock_post.assert_called_once()
+        assert request_json["action"] == "multi"
+        assert [a["action"] for a in request_json["params"]["actions"]] == [
+            "deckNames",
+            "findNotes",
+        ]
+        assert decks.result() == ["Default"]
+        assert note_ids.result() == [1, 2]
+
+    @patch("requests.Session.post")
+    def test_batch_flushes_when_size_is_reached(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response(
+            {
+                "result": [{"result": None, "error": None}] * 2,
+                "error": None,
+            }
+        )
+        mock_post.return_value = mock_response
+        batch = anki_connection.batch(size=2)
+
+        # act
+        first = batch("updateNoteFields", note={"id": 1, "fields": {}})
+        second = batch("updateNoteFields", note={"id": 2, "fields": {}})
+        third = batch("updateNoteFields", note={"id": 3, "fields": {}})
+
+        # assert
+        assert mock_post.call_count == 1
+        assert first.done and second.done
+        assert not third.done
+        assert len(batch) == 1
+        with pytest.raises(RuntimeError):
+            third.result()
+
+    @patch("requests.Session.post")
+    def test_batch_keeps_per_action_errors(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response(
+            {
+                "result": [
+                    {"result": None, "error": "note was not found: 1"},
+                    {"result": None, "error": None},
+                ],
+                "error": None,
+            }
+        )
+        mock_post.return_value = mock_response
+
+        # act
+        with anki_connection.batch() as batch:
+            failed = batch("updateNoteFields", note={"id": 1, "fields": {}})
+            updated = batch("updateNoteFields", note={"id": 2, "fields": {}})
+
+        # assert
+        assert failed.error == "note was not found: 1"
+        with pytest.raises(Exception, match="note was not found"):
+            failed.result()
+        assert updated.error is None
+        assert updated.result() is None
+
+    @patch("requests.Session.post")
+    def test_batch_fails_actions_left_unanswered(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response(
+            {"result": [{"result": [1], "error": None}], "error": None}
+        )
+        mock_post.return_value = mock_response
+
+        # act
+        with anki_connection.batch() as batch:
+            answered = batch("findNotes", query="deck:current")
+            unanswered = batch("findNotes", query="deck:other")
+
+        # assert
+        assert answered.result() == [1]
+        assert unanswered.done
+        with pytest.raises(Exception, match="multi answered 1 of 2 actions"):
+            unanswered.result()
+
+
+class TestAsyncAnkiConnection:
+    @pytest.mark.asyncio
+    @patch("requests.Session.post")
+    async def test_invoke_success(self, mock_post, anki_connection):
+        # arrange
+        mock_response = _mock_response({"result": ["Default"], "error": None})
+        mock_post.return_value = mock_response
+        async_connection = AsyncAnkiConnection(connection=anki_connection)
+
+        # act
+        result = await async_connection("deckNames")
+
+        # assert
+        assert result == ["Default"]
+        mock_post.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_in_flight_requests_are_bounded(self):
+        # arrange
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_invoke(action, **params):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return params["note"]
+
+        connection = Mock(spec=AnkiConnection)
+        connection.invoke.side_effect = slow_invoke
+        async_connection = AsyncAnkiConnection(connection=connection, max_concurrency=3)
+
+        # act
+        results = await asyncio.gather(
+            *[async_connection("notesInfo", note=i) for i in range(10)]
+        )
+
+        # assert
+        assert results == list(range(10))
+        assert peak == 3
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from manki.anki.domain import AnkiNote
+from manki.anki.encoding import encode_array, encode_notes, encode_request
+
+
+def _create_anki_notes():
+    return [
+        AnkiNote(deckName="vocabulary", modelName="basic", front="chat", back="cat"),
+        AnkiNote(
+            deckName="vocabulary",
+            modelName="basic",
+            front='l\'"été" \\ été\n',
+            back="中文 \U0001f600",
+            audio={"url": "https://example.com/a.mp3", "filename": "a.mp3"},
+            tags=["fr", "été", "fr"],
+            key="abc",
+        ),
+    ]
+
+
+class TestEncoding:
+    @pytest.mark.parametrize("allow_duplicate", [False, True])
+    def test_encoded_notes_match_anki_dicts(self, allow_duplicate):
+        # arrange
+        anki_notes = _create_anki_notes()
+
+        # act
+        encoded_notes = encode_notes(anki_notes, allow_duplicate)
+
+        # assert
+        assert [json.loads(encoded_note) for encoded_note in encoded_notes] == [
+            anki_note.to_anki_dict(allow_duplicate) for anki_note in anki_notes
+        ]
+
+    def test_encoded_request_matches_request(self):
+        # arrange
+        anki_notes = _create_anki_notes()
+        request = {"action": "addNotes", "params": {}, "version": 6, "key": None}
+
+        # act
+        body = encode_request(request, notes=encode_array(encode_notes(anki_notes)))
+
+        # assert
+        assert json.loads(body) == {
+            **request,
+            "params": {"notes": [anki_note.to_anki_dict() for anki_note in anki_notes]},
+        }
+
+    def test_from_trusted_validates_the_first_record(self):
+        # arrange
+        record = {"deckName": "vocabulary", "modelName": "basic", "front": "chat"}
+
+        # act / assert
+        with pytest.raises(ValidationError):
+            AnkiNote.from_trusted([{**record, "back": None}])
+        notes = AnkiNote.from_trusted(
+            [{**record, "back": "cat"}, {**record, "back": "dog"}]
+        )
+        assert [note.back for note in notes] == ["cat", "dog"]
+        assert notes[1].tags == [] and notes[1].tags is not notes[0].tags
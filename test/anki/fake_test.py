@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from manki.anki.domain import AnkiNote
+from manki.anki.fake import FakeAnkiConnectServer
+from manki.anki.xport import AnkiImporterExporter
+
+
+@pytest.fixture
+def anki_importer_exporter(fake_anki_connection):
+    return AnkiImporterExporter(fake_anki_connection)
+
+
+def _create_anki_notes(deck_name="current"):
+    return [
+        AnkiNote(deckName=deck_name, modelName="basic", front="chat", back="cat"),
+        AnkiNote(deckName=deck_name, modelName="basic", front="chien", back="dog"),
+    ]
+
+
+class TestFakeAnkiConnectServer:
+    def test_import_update_and_export_round_trip(
+        self, fake_anki, anki_importer_exporter, tmp_path
+    ):
+        # arrange
+        anki_notes = _create_anki_notes()
+        output_file = tmp_path / "current.txt"
+
+        # act
+        anki_importer_exporter.import_and_update_notes(
+            input_file="", anki_notes=anki_notes, deck_name="current"
+        )
+        changed_notes = _create_anki_notes()
+        changed_notes[1].back = "hound"
+        anki_importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=changed_notes,
+            deck_name="current",
+            reference_fields=["front"],
+            changing_fields=["back"],
+        )
+        anki_importer_exporter.export_to_txt("current", str(output_file))
+
+        # assert
+        assert output_file.read_text(encoding="utf-8") == "chat\tcat\nchien\thound\n"
+        assert fake_anki.requests.count("addNotes") == 1
+        assert fake_anki.requests.count("multi") == 1
+
+    def test_add_notes_reports_duplicates(self, fake_anki, fake_anki_connection):
+        # arrange
+        fake_anki_connection("createDeck", deck="current")
+        notes = [note.to_anki_dict() for note in _create_anki_notes()]
+        fake_anki_connection("addNotes", notes=notes)
+
+        new_note = AnkiNote(
+            deckName="current", modelName="basic", front="oiseau", back="bird"
+        )
+
+        # act / assert
+        with pytest.raises(Exception, match="duplicate"):
+            fake_anki_connection("addNotes", notes=[new_note.to_anki_dict(), *notes])
+        assert len(fake_anki.collection.notes) == 2
+
+    def test_multi_returns_per_action_results(self, fake_anki_connection):
+        # act
+        with fake_anki_connection.batch() as batch:
+            created = batch("createDeck", deck="current")
+            missing = batch("updateNoteFields", note={"id": 1, "fields": {}})
+
+        # assert
+        assert created.result()
+        assert missing.error == "note was not found: 1"
+
+    def test_latency_is_applied_per_request(self):
+        # arrange
+        server = FakeAnkiConnectServer(latency=0.05, jitter=0.01, seed=0)
+
+        # act
+        with server:
+            start = time.perf_counter()
+            response = server.respond(b'{"action": "deckNames", "params": {}}')
+            elapsed = time.perf_counter() - start
+
+        # assert
+        assert response == b'{"result": ["Default"], "error": null}'
+        assert 0.05 <= elapsed
@@ -0,0 +1,75 @@
+import json
+
+from manki.anki.domain import AnkiNote
+from manki.anki.encoding import encode_notes
+from manki.anki.fields import FieldPlans
+
+
+def _create_anki_note(**overrides):
+    return AnkiNote(
+        **{
+            "deckName": "vocabulary",
+            "modelName": "vocab",
+            "front": "chat",
+            "back": "cat",
+            "extra_fields": {"Example": 'Le "chat" dort.'},
+            **overrides,
+        }
+    )
+
+
+class TestFieldPlan:
+    def test_plan_names_fields_as_in_anki(self):
+        # arrange
+        plans = FieldPlans()
+        plan = plans.add("vocab", ["Front", "Back", "Example"])
+        anki_note = _create_anki_note()
+
+        # act
+        encoded_note = encode_notes([anki_note], plans=plans)[0]
+
+        # assert
+        assert plan.values(anki_note) == {
+            "Front": "chat",
+            "Back": "cat",
+            "Example": 'Le "chat" dort.',
+        }
+        assert json.loads(encoded_note) == anki_note.to_anki_dict(plan=plan)
+
+    def test_diff_returns_only_changed_fields(self):
+        # arrange
+        plan = FieldPlans().add("vocab", ["Front", "Back", "Example"])
+        existing_note = _create_anki_note()
+        new_note = _create_anki_note(
+            back="cat", extra_fields={"Example": "Le chat mange."}
+        )
+
+        # act
+        changes = plan.diff(new_note, existing_note, ["back", "example", "unknown"])
+
+        # assert
+        assert changes == {"Example": "Le chat mange."}
+        assert existing_note.extra_fields == {"Example": "Le chat mange."}
+
+    def test_plan_from_note_info_follows_field_order(self):
+        # arrange
+        plans = FieldPlans()
+        note_info = {
+            "modelName": "vocab",
+            "fields": {
+                "Example": {"value": "Le chat dort.", "order": 2},
+                "Front": {"value": "chat", "order": 0},
+                "Back": {"value": "cat", "order": 1},
+            },
+        }
+
+        # act
+        plan = plans.from_note_info(note_info)
+
+        # assert
+        assert plan.field_names == ("Front", "Back", "Example")
+        assert plans.from_note_info(note_info) is plan
+        assert plan.record({"Front": "chat", "Example": "Le chat dort."}) == {
+            "front": "chat",
+            "extra_fields": {"Example": "Le chat dort."},
+        }
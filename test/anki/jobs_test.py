@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+from manki.anki.domain import MatchStrategy
+from manki.anki.jobs import ImportJob, load_jobs, run_jobs
+from manki.anki.xport import AnkiImporterExporter
+
+
+class TestJobs:
+    def test_load_jobs_applies_defaults(self, tmp_path):
+        # arrange
+        jobs_file = tmp_path / "jobs.json"
+        jobs_file.write_text(
+            json.dumps(
+                [
+                    {"input_path": "notes", "deck_name": "General"},
+                    {
+                        "input_path": "words.json",
+                        "deck_name": "Vocabulary",
+                        "match_strategy": "key",
+                        "source_lang": "en",
+                        "target_lang": "fr",
+                    },
+                ]
+            ),
+            encoding="utf-8",
+        )
+
+        # act
+        jobs = load_jobs(
+            str(jobs_file), {"reference_fields": ["front"], "source_lang": None}
+        )
+
+        # assert
+        assert [job.reference_fields for job in jobs] == [["front"], ["front"]]
+        assert [job.match_strategy for job in jobs] == [
+            MatchStrategy.DECK,
+            MatchStrategy.KEY,
+        ]
+        assert jobs[1].source_lang == "en"
+
+    def test_run_jobs_imports_every_deck(
+        self, fake_anki, fake_anki_connection, samples_path
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        samples = Path(samples_path)
+        jobs = [
+            ImportJob(**entry)
+            for entry in [
+                {
+                    "input_path": str(samples / "translations.json"),
+                    "deck_name": "English to French",
+                    "source_lang": "en",
+                    "target_lang": "fr",
+                },
+                {"input_path": str(samples / "missing.md"), "deck_name": "General"},
+                {
+                    "input_path": str(samples / "translations.json"),
+                    "deck_name": "English to Spanish",
+                    "source_lang": "en",
+                    "target_lang": "es",
+                },
+                {"input_path": str(samples / "md.md"), "deck_name": "General"},
+            ]
+        ]
+
+        # act
+        results = run_jobs(importer_exporter, jobs, max_concurrent_decks=2)
+
+        # assert
+        decks = [note["deckName"] for note in fake_anki.collection.notes.values()]
+        assert [result.job.deck_name for result in results] == [
+            job.deck_name for job in jobs
+        ]
+        assert [bool(result.error) for result in results] == [
+            False,
+            True,
+            False,
+            False,
+        ]
+        assert decks.count("English to French") == 3
+        assert decks.count("English to Spanish") == 3
+        assert decks.count("General") == 1
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import sqlite3
+import zipfile
+
+import pytest
+
+from manki.anki.collection import AnkiCollectionReader
+from manki.anki.domain import AnkiNote
+from manki.anki.fake import FakeAnkiCollection
+from manki.anki.package import AnkiPackageWriter, field_checksum, write_package
+
+
+def _create_vocabulary_notes(start, stop, suffix=""):
+    return [
+        AnkiNote(
+            deckName="Vocabulary::French",
+            modelName="advanced",
+            front=f"word{i} (noun)",
+            back=f"mot{i}{suffix}",
+            extra_fields={"audio": f"[sound:word{i}.mp3]"},
+            tags=["en", "fr"],
+            key=f"word{i}",
+        )
+        for i in range(start, stop)
+    ]
+
+
+def _extract_collection(package_path, tmp_path):
+    with zipfile.ZipFile(package_path) as package:
+        package.extract("collection.anki2", tmp_path)
+        media = json.loads(package.read("media"))
+        media_files = {
+            filename: package.read(entry) for entry, filename in media.items()
+        }
+    return tmp_path / "collection.anki2", media_files
+
+
+class TestAnkiPackageWriter:
+    def test_package_holds_notes_and_media(self, tmp_path):
+        # arrange
+        media_folder = tmp_path / "media"
+        media_folder.mkdir()
+        for i in range(3):
+            (media_folder / f"word{i}.mp3").write_bytes(f"mp3 {i}".encode())
+        attachment = tmp_path / "extra.mp3"
+        attachment.write_bytes(b"extra")
+        anki_notes = _create_vocabulary_notes(0, 3)
+        anki_notes[0].audio = {
+            "path": str(attachment),
+            "filename": "extra.mp3",
+            "fields": ["Back"],
+        }
+        package_path = tmp_path / "build" / "vocabulary.apkg"
+
+        # act
+        notes_written = write_package(
+            str(package_path),
+            [anki_notes[:2], anki_notes[1:]],
+            media_folder=str(media_folder),
+        )
+
+        # assert
+        collection_path, media_files = _extract_collection(package_path, tmp_path)
+        with AnkiCollectionReader(str(collection_path)) as reader:
+            note_ids = reader("findNotes", query='deck:"Vocabulary"')
+            notes_info = reader("notesInfo", notes=note_ids)
+            deck_names = reader("deckNames")
+        assert notes_written == 3
+        assert deck_names == ["Default", "Vocabulary::French"]
+        assert [note["fields"]["back"]["value"] for note in notes_info] == [
+            "mot0[sound:extra.mp3]",
+            "mot1",
+            "mot2",
+        ]
+        assert notes_info[0]["tags"] == ["en", "fr", "manki-id::word0"]
+        assert media_files == {
+            "extra.mp3": b"extra",
+            "word0.mp3": b"mp3 0",
+            "word1.mp3": b"mp3 1",
+            "word2.mp3": b"mp3 2",
+        }
+
+    def test_rebuilt_package_keeps_note_identity(self, tmp_path):
+        # arrange
+        first_path, second_path = tmp_path / "first.apkg", tmp_path / "second.apkg"
+
+        # act
+        write_package(str(first_path), [_create_vocabulary_notes(0, 5)])
+        write_package(str(second_path), [_create_vocabulary_notes(0, 5, " (v2)")])
+
+        # assert
+        identities = []
+        for package_path in (first_path, second_path):
+            collection_path, _ = _extract_collection(package_path, tmp_path)
+            with sqlite3.connect(str(collection_path)) as db:
+                identities.append(
+                    db.execute(
+                        "select n.guid, n.mid, c.did from notes n join cards c on c.nid = n.id"
+                    ).fetchall()
+                )
+            db.close()
+        assert identities[0] == identities[1]
+        assert len(set(guid for guid, _, _ in identities[0])) == 5
+
+    def test_checksum_ignores_html_in_the_first_field(self, tmp_path):
+        # arrange
+        anki_notes = _create_vocabulary_notes(0, 1)
+        anki_notes[0].front = "<b>word0</b> (noun)"
+        collection = FakeAnkiCollection()
+        collection.createDeck("vocabulary")
+        collection.addNote(
+            {
+                "deckName": "vocabulary",
+                "modelName": "basic",
+                "fields": {"front": "<b>word0</b> (noun)", "back": "mot0"},
+                "tags": [],
+            }
+        )
+        package_path = tmp_path / "vocabulary.apkg"
+        fake_path = tmp_path / "fake.anki2"
+
+        # act
+        write_package(str(package_path), [anki_notes])
+        collection.save(str(fake_path))
+
+        # assert
+        expected = int(hashlib.sha1(b"word0 (noun)").hexdigest()[:8], 16)
+        assert field_checksum("<b>word0</b> (noun)") == expected
+        collection_path, _ = _extract_collection(package_path, tmp_path)
+        for path in (collection_path, fake_path):
+            with sqlite3.connect(str(path)) as db:
+                [(csum,)] = db.execute("select csum from notes").fetchall()
+            db.close()
+            assert csum == expected
+
+    def test_failed_build_leaves_no_package(self, tmp_path):
+        # arrange
+        package_path = tmp_path / "vocabulary.apkg"
+
+        # act
+        with pytest.raises(ValueError):
+            with AnkiPackageWriter(str(package_path)) as package:
+                package.add_notes(_create_vocabulary_notes(0, 5))
+                raise ValueError("broken batch")
+
+        # assert
+        assert list(tmp_path.iterdir()) == []
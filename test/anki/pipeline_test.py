@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+import pytest
+
+from manki.anki.domain import AnkiNote, MatchStrategy
+from manki.anki.pipeline import ImportPipeline, run_pipeline
+from manki.anki.xport import AnkiImporterExporter
+
+
+def _create_vocabulary_notes(start, stop):
+    return [
+        AnkiNote(
+            deckName="vocabulary",
+            modelName="basic",
+            front=f"word{i} (noun)",
+            back=f"mot{i}",
+        )
+        for i in range(start, stop)
+    ]
+
+
+class TestRunPipeline:
+    def test_batches_flow_through_stages_in_order(self):
+        # arrange
+        batches = [[1, 2, 3], [4], [], [5, 6]]
+        written = []
+
+        # act
+        stats = run_pipeline(
+            iter(batches),
+            [
+                ("odd", lambda batch: [item for item in batch if item % 2]),
+                ("write", lambda batch: written.extend(batch) or batch),
+            ],
+            queue_size=1,
+        )
+
+        # assert
+        assert written == [1, 3, 5]
+        assert [(s.name, s.batches, s.notes_in, s.notes_out) for s in stats] == [
+            ("parse", 4, 6, 6),
+            ("odd", 3, 6, 3),
+            ("write", 2, 3, 3),
+        ]
+
+    def test_stage_errors_stop_the_pipeline(self):
+        # arrange
+        def fail(batch):
+            raise ValueError("broken batch")
+
+        # act / assert
+        with pytest.raises(ValueError, match="broken batch"):
+            run_pipeline(
+                ([i] for i in range(1000)),
+                [("fail", fail), ("write", lambda batch: batch)],
+                queue_size=1,
+            )
+
+
+class TestImportPipeline:
+    def test_import_dedupes_and_syncs_batches(self, fake_anki, fake_anki_connection):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=_create_vocabulary_notes(0, 50),
+            deck_name="vocabulary",
+        )
+        batches = [
+            _create_vocabulary_notes(0, 100),
+            _create_vocabulary_notes(50, 150),
+            _create_vocabulary_notes(150, 200),
+        ]
+        for anki_note in batches[0][:10]:
+            anki_note.back += " (v2)"
+        pipeline = ImportPipeline(
+            importer_exporter,
+            "vocabulary",
+            reference_fields=["front"],
+            changing_fields=["back"],
+            match_strategy=MatchStrategy.DECK,
+            queue_size=1,
+            shuffle=True,
+        )
+
+        # act
+        with fake_anki_connection.record() as recording:
+            stats = pipeline.run(iter(batches))
+
+        # assert
+        backs = {
+            note["fields"]["front"]: note["fields"]["back"]
+            for note in fake_anki.collection.notes.values()
+        }
+        assert len(backs) == 200
+        assert backs["word3 (noun)"] == "mot3 (v2)"
+        assert recording.calls("findNotes") == 1
+        assert recording.batched("updateNoteFields") == 10
+        assert {s.name: s.notes_out for s in stats} == {
+            "parse": 250,
+            "normalize": 200,
+            "match": 200,
+            "write": 150,
+        }
+
+    def test_failed_updates_are_retried_on_the_next_sync(
+        self, fake_anki, fake_anki_connection, tmp_path
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+
+        def run(batches):
+            ImportPipeline(
+                importer_exporter,
+                "vocabulary",
+                reference_fields=["front"],
+                changing_fields=["back"],
+                manifest_path=str(tmp_path / "manifest.json"),
+                queue_size=1,
+            ).run(batches)
+
+        def edited_batches():
+            # Generated lazily, like batches read from a file.
+            for start in range(0, 200, 10):
+                batch = _create_vocabulary_notes(start, start + 10)
+                for anki_note in batch:
+                    anki_note.back += " (v2)"
+                yield batch
+
+        run([_create_vocabulary_notes(0, 200)])
+        [word3_id] = [
+            note_id
+            for note_id, note in fake_anki.collection.notes.items()
+            if note["fields"]["front"] == "word3 (noun)"
+        ]
+        update_note_fields = fake_anki.collection.updateNoteFields
+
+        def fail_word3(note):
+            if note["id"] == word3_id:
+                raise Exception("collection is locked")
+            update_note_fields(note)
+
+        with patch.object(
+            fake_anki.collection, "updateNoteFields", side_effect=fail_word3
+        ):
+            run(edited_batches())
+
+        # act
+        with fake_anki_connection.record() as recording:
+            run(edited_batches())
+
+        # assert
+        assert recording.batched("updateNoteFields") == 1
+        assert fake_anki.collection.notes[word3_id]["fields"]["back"] == "mot3 (v2)"
@@ -0,0 +1,88 @@
+import pytest
+
+from manki.anki.search import escape_value, parse_query, search_notes
+
+
+@pytest.fixture
+def notes():
+    return [
+        {
+            "noteId": 1,
+            "deckName": "Vocabulary::French",
+            "modelName": "basic",
+            "fields": {"front": "chat (noun)", "back": "cat"},
+            "tags": ["fr", "animals::pets"],
+            "mod": 1_000,
+        },
+        {
+            "noteId": 2,
+            "deckName": "Vocabulary",
+            "modelName": "basic",
+            "fields": {"front": 'say "hi"', "back": "a_b*c"},
+            "tags": ["en"],
+            "mod": 90_000,
+        },
+        {
+            "noteId": 3,
+            "deckName": "General Learning",
+            "modelName": "advanced",
+            "fields": {"front": "Chat (Noun)", "back": "chat", "audio": ""},
+            "tags": [],
+            "mod": 5_000,
+        },
+    ]
+
+
+class TestSearch:
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("", [1, 2, 3]),
+            ("deck:Vocabulary", [1, 2]),
+            ('deck:"General Learning"', [3]),
+            ('"deck:General Learning"', [3]),
+            ('deck:Vocabulary front:"chat (noun)"', [1]),
+            ('front:"chat (noun)"', [1, 3]),
+            ("front:chat*", [1, 3]),
+            ("back:a\\_b\\*c", [2]),
+            ("back:a_b*c", [2]),
+            ('front:"say \\"hi\\""', [2]),
+            ("tag:animals", [1]),
+            ("-tag:fr deck:Vocabulary", [2]),
+            ("(back:cat OR back:chat) note:advanced", [3]),
+            ("deck:Vocabulary -(tag:en OR tag:fr)", []),
+            ("nid:1,3", [1, 3]),
+            ("cat", [1]),
+            ("edited:1", [2]),
+        ],
+    )
+    def test_search_notes(self, notes, query, expected):
+        # act
+        result = search_notes(query, notes, now=100_000)
+
+        # assert
+        assert result == expected
+
+    @pytest.mark.parametrize("query", ['front:"open', "(deck:a", "deck:a)"])
+    def test_malformed_queries_raise(self, query):
+        with pytest.raises(ValueError):
+            parse_query(query)
+
+    @pytest.mark.parametrize("value", ['say "hi"', "a_b*c", "back\\slash"])
+    def test_escaped_values_match_literally(self, value):
+        # arrange
+        note = {
+            "noteId": 1,
+            "deckName": "Default",
+            "modelName": "basic",
+            "fields": {"front": value, "back": ""},
+            "tags": [],
+            "mod": 0,
+        }
+        decoy = {**note, "noteId": 2, "fields": {"front": "axb-c", "back": ""}}
+
+        # act
+        result = search_notes(f'front:"{escape_value(value)}"', [note, decoy])
+
+        # assert
+        assert result == [1]
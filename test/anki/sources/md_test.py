@@ -51,3 +51,33 @@ class TestMarkdownAnkiFileParser:
             json.dumps(result, indent=4),
             "malformed_md_file_snapshot",
         )
+
+    def test_keys_follow_the_source_file(self, parser, samples_path, tmp_path):
+        # arrange
+        sample_md_path = Path(samples_path) / "md.md"
+        edited_md_path = tmp_path / "md.md"
+        edited_md_path.write_text(
+            sample_md_path.read_text(encoding="utf-8") + "\nedited\n",
+            encoding="utf-8",
+        )
+
+        # act
+        original = parser.parse([str(sample_md_path)])
+        edited = parser.parse([str(edited_md_path)])
+
+        # assert
+        assert original[0].key is not None
+        assert original[0].back != edited[0].back
+        assert original[0].key == edited[0].key
+
+    def test_invalid_notes_are_reported_per_file(self, samples_path, capsys):
+        # arrange
+        parser = MarkdownAnkiFileParser(deck_name=None)
+        sample_md_path = Path(samples_path) / "md.md"
+
+        # act
+        result = parser.parse([str(sample_md_path), str(sample_md_path)])
+
+        # assert
+        assert result == []
+        assert capsys.readouterr().out.count("deckName") == 2
@@ -55,3 +55,18 @@ class TestVocabularyAnkiFileParser:
             json.dumps(result, indent=4),
             "malformed_vocab_file_snapshot",
         )
+
+    def test_keys_are_unique_and_stable(self, parser, samples_path):
+        # arrange
+        vocab_file_path = Path(samples_path) / "translations.json"
+
+        # act
+        first = parser.parse([str(vocab_file_path)], "fr", "ca")
+        second = parser.parse([str(vocab_file_path)], "fr", "ca")
+        other_languages = parser.parse([str(vocab_file_path)], "fr", "es")
+
+        # assert
+        keys = [note.key for note in first]
+        assert len(set(keys)) == len(keys)
+        assert keys == [note.key for note in second]
+        assert not set(keys) & {note.key for note in other_languages}
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from manki.anki.stats import ConnectionStats
+
+
+@pytest.fixture
+def stats():
+    return ConnectionStats()
+
+
+class TestConnectionStats:
+    def test_record_aggregates_per_action(self, stats):
+        # act
+        stats.record("findNotes", 100, 20, 3.0)
+        stats.record("findNotes", 120, 30, 30.0, error=True)
+        stats.record("notesInfo", 50, 500, 0.5)
+
+        # assert
+        find_notes = stats.actions["findNotes"]
+        assert stats.http_calls == 3
+        assert stats.errors == 1
+        assert find_notes.calls == 2
+        assert find_notes.request_bytes == 220
+        assert find_notes.response_bytes == 50
+        assert find_notes.to_dict()["latency_histogram"] == {
+            "<=5ms": 1,
+            "<=50ms": 1,
+        }
+
+    def test_recording_only_sees_calls_inside_block(self, stats):
+        # arrange
+        stats.record("deckNames", 10, 10, 1.0)
+
+        # act
+        with stats.recording() as recording:
+            stats.record("findNotes", 10, 10, 1.0)
+            stats.record_batched(["updateNoteFields", "updateNoteFields"])
+        stats.record("addNotes", 10, 10, 1.0)
+
+        # assert
+        assert list(recording.history) == ["findNotes"]
+        assert recording.actions["updateNoteFields"].batched == 2
+        assert stats.http_calls == 3
+
+    def test_history_keeps_the_latest_calls(self):
+        # arrange
+        stats = ConnectionStats(history_size=3)
+
+        # act
+        with stats.recording() as recording:
+            for action in ["deckNames", "findNotes", "notesInfo", "addNotes", "multi"]:
+                stats.record(action, 10, 10, 1.0)
+
+        # assert
+        assert list(stats.history) == ["notesInfo", "addNotes", "multi"]
+        assert len(recording.history) == 5
+        assert stats.http_calls == 5
+
+    def test_assert_round_trips(self, stats):
+        # arrange
+        stats.record("findNotes", 10, 10, 1.0)
+        stats.record("findNotes", 10, 10, 1.0)
+
+        # act / assert
+        stats.assert_round_trips(2)
+        stats.assert_round_trips(0, action="addNotes")
+        with pytest.raises(AssertionError, match="findNotes=2"):
+            stats.assert_round_trips(1)
+
+    def test_dump_writes_json(self, stats, tmp_path):
+        # arrange
+        stats.record("deckNames", 10, 40, 1.0)
+        output_file = tmp_path / "stats.json"
+
+        # act
+        stats.dump(str(output_file), extra={"cache": {"hits": 1, "misses": 0}})
+
+        # assert
+        dumped = json.loads(output_file.read_text(encoding="utf-8"))
+        assert dumped["http_calls"] == 1
+        assert dumped["actions"]["deckNames"]["response_bytes"] == 40
+        assert dumped["cache"] == {"hits": 1, "misses": 0}
@@ -1,13 +1,16 @@
+import inspect
 import json
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 import requests_mock
 from tqdm import tqdm
 
-from manki.anki.connection import AnkiConnection
-from manki.anki.domain import AnkiNote
-from manki.anki.xport import AnkiImporterExporter
+from manki.anki.connection import AnkiConnection, AsyncAnkiConnection
+from manki.anki.domain import AnkiNote, MatchStrategy, WriteReport, identity_key
+from manki.anki.fake import FakeAnkiCollection, FakeAnkiConnectServer
+from manki.anki.xport import AnkiImporterExporter, AsyncAnkiImporterExporter
 
 
 @pytest.fixture(scope="session")
@@ -20,6 +23,11 @@ def anki_importer_exporter(anki_connection):
     return AnkiImporterExporter(anki_connection)
 
 
+@pytest.fixture
+def async_anki_importer_exporter(anki_connection):
+    return AsyncAnkiImporterExporter(AsyncAnkiConnection(connection=anki_connection))
+
+
 @pytest.fixture
 def requests_mocker():
     with requests_mock.Mocker() as m:
@@ -78,16 +86,55 @@ def mock_add_notes_response(requests_mocker):
     )
 
 
+@pytest.fixture
+def mock_model_field_names_response(requests_mocker):
+    requests_mocker.post(
+        "http://localhost:8765",
+        json={"result": ["front", "back"], "error": None},
+        additional_matcher=lambda request: json.loads(request.text)["action"]
+        == "modelFieldNames",
+    )
+
+
 @pytest.fixture
 def mock_update_notes_response(requests_mocker):
+    def respond(request, context):
+        actions = json.loads(request.text)["params"]["actions"]
+        return {
+            "result": [{"result": None, "error": None} for _ in actions],
+            "error": None,
+        }
+
     requests_mocker.post(
         "http://localhost:8765",
-        json={"result": None, "error": None},
+        json=respond,
         additional_matcher=lambda request: json.loads(request.text)["action"]
-        == "updateNoteFields",
+        == "multi",
     )
 
 
+@pytest.fixture
+def mock_empty_deck(requests_mocker):
+    results = {
+        "deckNames": [],
+        "createDeck": 1,
+        "findNotes": [],
+        "notesInfo": [],
+        "modelFieldNames": ["front", "back"],
+    }
+
+    def respond(request, context):
+        payload = json.loads(request.text)
+        if payload["action"] == "addNotes":
+            return {
+                "result": list(range(len(payload["params"]["notes"]))),
+                "error": None,
+            }
+        return {"result": results[payload["action"]], "error": None}
+
+    requests_mocker.post("http://localhost:8765", json=respond)
+
+
 class TestAnkiImporterExporter:
     def test_export_to_txt(
         self,
@@ -112,7 +159,253 @@ class TestAnkiImporterExporter:
                 "front2\tback2\n",
             ]
 
-    def test_add_anki_notes(self, anki_importer_exporter, mock_add_notes_response):
+    @pytest.mark.parametrize("prefetch", [True, False])
+    def test_export_to_txt_streams_chunks(
+        self, fake_anki_connection, tmp_path, prefetch
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=self._create_vocabulary_notes(25, "My Vocabulary"),
+            deck_name="My Vocabulary",
+            match_strategy=MatchStrategy.DECK,
+        )
+        output_file = tmp_path / "export" / "vocabulary.txt"
+
+        # act
+        with fake_anki_connection.record() as recording:
+            importer_exporter.export_to_txt(
+                "My Vocabulary", str(output_file), chunk_size=10, prefetch=prefetch
+            )
+
+        # assert
+        lines = output_file.read_text(encoding="utf-8").splitlines()
+        assert lines == [f"word{i} (noun)\tmot{i}" for i in range(25)]
+        assert recording.calls("notesInfo") == 3
+
+    def test_incremental_export_only_fetches_changed_notes(self, tmp_path):
+        # arrange
+        clock = iter(range(1_000, 2_000)).__next__
+        output_file = tmp_path / "vocabulary.txt"
+        server = FakeAnkiConnectServer(collection=FakeAnkiCollection(clock=clock))
+
+        with server, AnkiConnection(url=server.url, api_version=6) as connection:
+            importer_exporter = AnkiImporterExporter(connection)
+            importer_exporter.import_and_update_notes(
+                input_file="",
+                anki_notes=self._create_vocabulary_notes(20),
+                deck_name="vocabulary",
+                match_strategy=MatchStrategy.DECK,
+            )
+            importer_exporter.export_to_txt(
+                "vocabulary", str(output_file), incremental=True
+            )
+            note_ids = connection("findNotes", query="deck:vocabulary")
+            connection(
+                "updateNoteFields",
+                note={"id": note_ids[3], "fields": {"back": "changed"}},
+            )
+            connection("deleteNotes", notes=[note_ids[5]])
+
+            # act
+            with patch.object(
+                server.collection, "notesInfo", wraps=server.collection.notesInfo
+            ) as notes_info, connection.record() as recording:
+                importer_exporter.export_to_txt(
+                    "vocabulary", str(output_file), incremental=True
+                )
+
+        # assert
+        lines = output_file.read_text(encoding="utf-8").splitlines()
+        expected = [f"word{i} (noun)\tmot{i}" for i in range(20) if i != 5]
+        expected[3] = "word3 (noun)\tchanged"
+        assert lines == expected
+        assert recording.calls("notesModTime") == 1
+        notes_info.assert_called_once_with(notes=[note_ids[3]])
+        assert (tmp_path / "vocabulary.txt.state.json").exists()
+
+    def test_incremental_export_skips_notes_deleted_while_exporting(self, tmp_path):
+        # arrange
+        clock = iter(range(1_000, 2_000)).__next__
+        output_file = tmp_path / "vocabulary.txt"
+        server = FakeAnkiConnectServer(collection=FakeAnkiCollection(clock=clock))
+
+        with server, AnkiConnection(url=server.url, api_version=6) as connection:
+            importer_exporter = AnkiImporterExporter(connection)
+            importer_exporter.import_and_update_notes(
+                input_file="",
+                anki_notes=self._create_vocabulary_notes(5),
+                deck_name="vocabulary",
+                match_strategy=MatchStrategy.DECK,
+            )
+            importer_exporter.export_to_txt(
+                "vocabulary", str(output_file), incremental=True
+            )
+            note_ids = connection("findNotes", query="deck:vocabulary")
+            connection(
+                "updateNoteFields",
+                note={"id": note_ids[1], "fields": {"back": "changed"}},
+            )
+            notes_mod_time = server.collection.notesModTime
+
+            def delete_after_mod_times(notes):
+                mod_times = notes_mod_time(notes)
+                server.collection.deleteNotes([note_ids[1]])
+                return mod_times
+
+            # act
+            with patch.object(
+                server.collection, "notesModTime", side_effect=delete_after_mod_times
+            ):
+                importer_exporter.export_to_txt(
+                    "vocabulary", str(output_file), incremental=True
+                )
+            importer_exporter.export_to_txt(
+                "vocabulary", str(output_file), incremental=True
+            )
+
+        # assert
+        lines = output_file.read_text(encoding="utf-8").splitlines()
+        assert lines == [f"word{i} (noun)\tmot{i}" for i in range(5) if i != 1]
+
+    def test_incremental_export_keeps_line_breaks_in_fields(self, tmp_path):
+        # arrange
+        output_file = tmp_path / "vocabulary.txt"
+        anki_notes = self._create_vocabulary_notes(4)
+        anki_notes[1].back = "mot1\r\nsecond line"
+        anki_notes[2].back = "mot2\rsecond line"
+        clock = iter(range(1_000, 2_000)).__next__
+        server = FakeAnkiConnectServer(collection=FakeAnkiCollection(clock=clock))
+
+        with server, AnkiConnection(url=server.url, api_version=6) as connection:
+            importer_exporter = AnkiImporterExporter(connection)
+            importer_exporter.import_and_update_notes(
+                input_file="",
+                anki_notes=anki_notes,
+                deck_name="vocabulary",
+                match_strategy=MatchStrategy.DECK,
+            )
+            importer_exporter.export_to_txt(
+                "vocabulary", str(output_file), incremental=True
+            )
+            note_ids = connection("findNotes", query="deck:vocabulary")
+            connection(
+                "updateNoteFields",
+                note={"id": note_ids[3], "fields": {"back": "changed"}},
+            )
+
+            # act
+            with patch.object(
+                server.collection, "notesInfo", wraps=server.collection.notesInfo
+            ) as notes_info:
+                importer_exporter.export_to_txt(
+                    "vocabulary", str(output_file), incremental=True
+                )
+
+        # assert
+        notes_info.assert_called_once_with(notes=[note_ids[3]])
+        assert output_file.read_bytes().decode("utf-8") == (
+            "word0 (noun)\tmot0\n"
+            "word1 (noun)\tmot1\r\nsecond line\n"
+            "word2 (noun)\tmot2\rsecond line\n"
+            "word3 (noun)\tchanged\n"
+        )
+
+    def test_manifest_skips_unchanged_notes(
+        self, fake_anki, fake_anki_connection, tmp_path
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        manifest_path = str(tmp_path / "manifest.json")
+        self._sync_with_manifest(
+            importer_exporter, self._create_vocabulary_notes(10), manifest_path
+        )
+
+        # act
+        with fake_anki_connection.record() as unchanged_run:
+            self._sync_with_manifest(
+                importer_exporter, self._create_vocabulary_notes(10), manifest_path
+            )
+
+        anki_notes = self._create_vocabulary_notes(11)
+        anki_notes[2].back = "changed"
+        with fake_anki_connection.record() as changed_run:
+            self._sync_with_manifest(importer_exporter, anki_notes, manifest_path)
+
+        # assert
+        assert unchanged_run.http_calls == 0
+        assert changed_run.batched("updateNoteFields") == 1
+        assert changed_run.calls("addNotes") == 1
+        assert len(fake_anki.collection.notes) == 11
+
+    def test_verify_manifest_resyncs_drifted_notes(
+        self, fake_anki, fake_anki_connection, tmp_path
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        manifest_path = str(tmp_path / "manifest.json")
+        self._sync_with_manifest(
+            importer_exporter, self._create_vocabulary_notes(10), manifest_path
+        )
+        edited_id, deleted_id = list(fake_anki.collection.notes)[3:5]
+        fake_anki.collection.notes[edited_id]["fields"]["back"] = "edited in anki"
+        fake_anki.collection.deleteNotes([deleted_id])
+
+        # act
+        with fake_anki_connection.record() as unverified_run:
+            self._sync_with_manifest(
+                importer_exporter, self._create_vocabulary_notes(10), manifest_path
+            )
+        with fake_anki_connection.record() as verified_run:
+            self._sync_with_manifest(
+                importer_exporter,
+                self._create_vocabulary_notes(10),
+                manifest_path,
+                verify_manifest=True,
+            )
+
+        # assert
+        assert unverified_run.http_calls == 0
+        assert verified_run.batched("updateNoteFields") == 1
+        assert verified_run.calls("addNotes") == 1
+        fronts = {
+            note["fields"]["front"]: note["fields"]["back"]
+            for note in fake_anki.collection.notes.values()
+        }
+        assert fronts["word3 (noun)"] == "mot3"
+        assert fronts["word4 (noun)"] == "mot4"
+
+    def test_import_csv_in_batches(self, fake_anki, fake_anki_connection, tmp_path):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        input_file = tmp_path / "vocabulary.csv"
+        rows = [f"word{i} (noun),mot{i}" for i in range(25)]
+        rows.append("word3 (noun),mot3")
+        input_file.write_text("\n".join(rows) + "\n", encoding="utf-8")
+
+        # act
+        with fake_anki_connection.record() as recording:
+            importer_exporter.import_and_update_notes(
+                input_file=str(input_file),
+                anki_notes=None,
+                deck_name="vocabulary",
+                reference_fields=["front"],
+                match_strategy=MatchStrategy.DECK,
+                csv_batch_size=10,
+            )
+
+        # assert
+        assert len(fake_anki.collection.notes) == 25
+        assert recording.calls("findNotes") == 1
+        assert recording.calls("addNotes") == 3
+
+    def test_add_anki_notes(
+        self,
+        anki_importer_exporter,
+        mock_add_notes_response,
+        mock_model_field_names_response,
+    ):
         # arrange
         anki_notes = self._create_anki_notes()
 
@@ -122,6 +415,73 @@ class TestAnkiImporterExporter:
         # assert
         assert len(anki_notes) == 2
 
+    def test_add_anki_notes_bisects_failing_chunks(
+        self, fake_anki, fake_anki_connection
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        fake_anki_connection("createDeck", deck="vocabulary")
+        fake_anki_connection(
+            "addNote", note=self._create_vocabulary_notes(1)[0].to_anki_dict()
+        )
+        anki_notes = self._create_vocabulary_notes(20)
+        anki_notes[7].front = " "
+
+        # act
+        report = importer_exporter.add_anki_notes(anki_notes, max_notes=8)
+
+        # assert
+        assert len(fake_anki.collection.notes) == 19
+        assert len(report.succeeded) == 18
+        assert all(note.id is not None for note in report.succeeded)
+        assert [(failure.note.front, failure.error) for failure in report.failed] == [
+            ("word0 (noun)", "cannot create note because it is a duplicate"),
+            (" ", "cannot create note because it is empty"),
+        ]
+
+    def test_add_anki_notes_splits_chunks_by_size(
+        self, fake_anki, fake_anki_connection
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        fake_anki_connection("createDeck", deck="vocabulary")
+        anki_notes = self._create_vocabulary_notes(10)
+        anki_notes[3].back = "x" * 5000
+
+        # act
+        with fake_anki_connection.record() as recording:
+            report = importer_exporter.add_anki_notes(
+                anki_notes, max_notes=100, max_bytes=4096
+            )
+
+        # assert
+        assert len(report.succeeded) == 10
+        assert recording.calls("addNotes") == 3
+        assert [note.front for note in report.succeeded] == [
+            note.front for note in anki_notes
+        ]
+
+    def test_added_note_ids_follow_input_order(self):
+        # arrange
+        anki_notes = self._create_vocabulary_notes(40)
+
+        # act
+        with FakeAnkiConnectServer(jitter=0.005, seed=1) as server, AnkiConnection(
+            url=server.url, api_version=6
+        ) as connection:
+            connection("createDeck", deck="vocabulary")
+            report = AnkiImporterExporter(connection).add_anki_notes(
+                anki_notes, max_notes=4
+            )
+
+        # assert
+        note_ids = [note.id for note in report.succeeded]
+        assert len(note_ids) == 40
+        assert note_ids == sorted(note_ids)
+        assert [note.front for note in report.succeeded] == [
+            note.front for note in anki_notes
+        ]
+
     def test_update_anki_notes(
         self,
         anki_importer_exporter,
@@ -140,6 +500,476 @@ class TestAnkiImporterExporter:
         # assert
         assert new_notes == []
 
+    @pytest.mark.asyncio
+    async def test_async_export_to_txt(
+        self,
+        async_anki_importer_exporter,
+        tmp_path,
+        mock_find_notes_response,
+        mock_notes_info_response,
+    ):
+        # arrange
+        output_file = tmp_path / "output.txt"
+
+        # act
+        await async_anki_importer_exporter.export_to_txt("current", str(output_file))
+
+        # assert
+        with open(output_file, "r", encoding="utf-8") as file:
+            assert file.readlines() == ["front1\tback1\n", "front2\tback2\n"]
+
+    def test_async_importer_inherits_no_blocking_methods(self):
+        # arrange
+        sync_only = {
+            "_export_incremental",
+            "_skip_unchanged_notes",
+            "_find_drifted_notes",
+            "_iter_notes_info",
+            "_csv_fields",
+        }
+
+        # act
+        shared = {
+            name
+            for name in dir(AsyncAnkiImporterExporter)
+            if not name.startswith("__")
+            and inspect.getattr_static(AsyncAnkiImporterExporter, name)
+            is inspect.getattr_static(AnkiImporterExporter, name, None)
+        }
+
+        # assert
+        assert not issubclass(AsyncAnkiImporterExporter, AnkiImporterExporter)
+        assert not sync_only & set(dir(AsyncAnkiImporterExporter))
+        assert {"_match_key", "_queue_update", "_chunk_new_notes"} <= shared
+        for name in shared:
+            assert not inspect.iscoroutinefunction(
+                getattr(AsyncAnkiImporterExporter, name)
+            )
+
+    @pytest.mark.asyncio
+    async def test_async_update_anki_notes(
+        self,
+        async_anki_importer_exporter,
+        requests_mocker,
+        mock_find_notes_response,
+        mock_notes_info_response,
+        mock_update_notes_response,
+    ):
+        # arrange
+        anki_notes = self._create_anki_notes()
+        anki_notes[0].back = "changed"
+
+        # act
+        new_notes = await async_anki_importer_exporter.update_anki_notes(
+            anki_notes, reference_fields=["front"], changing_fields=["back"]
+        )
+
+        # assert
+        actions = [
+            json.loads(r.text)["action"] for r in requests_mocker.request_history
+        ]
+        assert new_notes == []
+        assert actions.count("findNotes") == 2
+        assert actions.count("multi") == 1
+
+    @pytest.mark.asyncio
+    async def test_async_tag_changes_are_sent_in_batches(
+        self, fake_anki, fake_anki_connection
+    ):
+        # arrange
+        AnkiImporterExporter(fake_anki_connection).import_and_update_notes(
+            input_file="",
+            anki_notes=self._create_vocabulary_notes(10),
+            deck_name="vocabulary",
+        )
+        anki_notes = self._create_vocabulary_notes(10)
+        for i, anki_note in enumerate(anki_notes):
+            anki_note.tags = [f"lesson{i}"]
+        importer_exporter = AsyncAnkiImporterExporter(
+            AsyncAnkiConnection(connection=fake_anki_connection)
+        )
+
+        # act
+        with fake_anki_connection.record() as recording:
+            await importer_exporter.update_anki_notes(
+                anki_notes,
+                reference_fields=["front"],
+                changing_fields=["tags"],
+                match_strategy=MatchStrategy.DECK,
+                update_batch_size=3,
+            )
+
+        # assert
+        assert recording.calls("multi") == 4
+        assert recording.batched("addTags") == 10
+        assert sorted(
+            tag for note in fake_anki.collection.notes.values() for tag in note["tags"]
+        ) == sorted(f"lesson{i}" for i in range(10))
+
+    @pytest.mark.parametrize(
+        "match_strategy, budget",
+        [
+            # deckNames + createDeck + one findNotes per note + modelFieldNames + 4 addNotes chunks
+            (MatchStrategy.QUERY, 1007),
+            # deckNames + createDeck + one findNotes for the deck + modelFieldNames + 4 addNotes chunks
+            (MatchStrategy.DECK, 8),
+        ],
+    )
+    def test_import_into_empty_deck_round_trip_budget(
+        self,
+        anki_connection,
+        anki_importer_exporter,
+        mock_empty_deck,
+        match_strategy,
+        budget,
+    ):
+        # arrange
+        anki_notes = [
+            AnkiNote(
+                deckName="vocabulary",
+                modelName="basic",
+                front=f"word{i} (noun)",
+                back=f"mot{i}",
+                tags=["en", "fr"],
+            )
+            for i in range(1000)
+        ]
+
+        # act
+        with anki_connection.record() as recording:
+            anki_importer_exporter.import_and_update_notes(
+                input_file="",
+                anki_notes=anki_notes,
+                deck_name="vocabulary",
+                reference_fields=["front"],
+                match_strategy=match_strategy,
+            )
+
+        # assert
+        recording.assert_round_trips(budget)
+        recording.assert_round_trips(4, action="addNotes")
+
+    def test_reconcile_with_deck(self, fake_anki, fake_anki_connection):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=self._create_vocabulary_notes(1000),
+            deck_name="vocabulary",
+            match_strategy=MatchStrategy.DECK,
+        )
+        anki_notes = self._create_vocabulary_notes(1100)
+        for anki_note in anki_notes[:300]:
+            anki_note.back += " (v2)"
+        anki_notes[400].front = "WORD400  (NOUN)"
+
+        # act
+        with fake_anki_connection.record() as recording:
+            new_notes = importer_exporter.update_anki_notes(
+                anki_notes,
+                reference_fields=["front"],
+                changing_fields=["back"],
+                match_strategy=MatchStrategy.DECK,
+            )
+
+        # assert
+        assert [note.front for note in new_notes] == [
+            f"word{i} (noun)" for i in range(1000, 1100)
+        ]
+        assert recording.calls("findNotes") == 1
+        assert recording.calls("notesInfo") == 2
+        assert recording.calls("multi") == 3
+        assert recording.batched("updateNoteFields") == 300
+
+    def test_update_anki_notes_reports_each_note(self, fake_anki, fake_anki_connection):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=self._create_vocabulary_notes(10),
+            deck_name="vocabulary",
+        )
+        deck_index = importer_exporter._build_deck_index(
+            "vocabulary", ["front"], chunk_size=100
+        )
+        deleted_id = list(fake_anki.collection.notes)[4]
+        fake_anki.collection.deleteNotes([deleted_id])
+        anki_notes = self._create_vocabulary_notes(10)
+        for anki_note in anki_notes:
+            anki_note.back += " (v2)"
+        report = WriteReport()
+
+        # act
+        with fake_anki_connection.record() as recording:
+            importer_exporter.update_anki_notes(
+                anki_notes,
+                reference_fields=["front"],
+                changing_fields=["back"],
+                match_strategy=MatchStrategy.DECK,
+                deck_index=deck_index,
+                update_batch_size=4,
+                report=report,
+            )
+
+        # assert
+        assert recording.calls("multi") == 3
+        assert len(report.succeeded) == 9
+        assert [(failure.note.front, failure.error) for failure in report.failed] == [
+            ("word4 (noun)", f"note was not found: {deleted_id}")
+        ]
+
+    def test_batched_query_matches_notes_in_few_lookups(
+        self, fake_anki, fake_anki_connection
+    ):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        existing_notes = self._create_vocabulary_notes(600)
+        existing_notes[10].front = 'say "hi" (a_b*c)'
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=existing_notes,
+            deck_name="vocabulary",
+            match_strategy=MatchStrategy.DECK,
+        )
+        anki_notes = self._create_vocabulary_notes(700)[::2]
+        anki_notes[5].front = 'SAY "hi" (a_b*c)'
+        for anki_note in anki_notes:
+            anki_note.back += " (v2)"
+
+        # act
+        with fake_anki_connection.record() as recording:
+            new_notes = importer_exporter.update_anki_notes(
+                anki_notes,
+                reference_fields=["front"],
+                changing_fields=["back"],
+                match_strategy=MatchStrategy.BATCHED_QUERY,
+            )
+
+        # assert
+        assert [note.front for note in new_notes] == [
+            f"word{i} (noun)" for i in range(600, 700, 2)
+        ]
+        assert recording.calls("findNotes") == 2
+        assert recording.calls("notesInfo") == 1
+        assert recording.batched("updateNoteFields") == 300
+
+    def test_key_strategy_follows_edited_fields(self, fake_anki, fake_anki_connection):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        legacy_notes = self._create_vocabulary_notes(5)
+        importer_exporter.import_and_update_notes(
+            input_file="", anki_notes=legacy_notes, deck_name="vocabulary"
+        )
+        anki_notes = self._create_vocabulary_notes(10)
+        for i, anki_note in enumerate(anki_notes):
+            anki_note.key = identity_key("vocabulary", str(i))
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=anki_notes,
+            deck_name="vocabulary",
+            reference_fields=["front"],
+            match_strategy=MatchStrategy.KEY,
+        )
+        edited_notes = self._create_vocabulary_notes(10)
+        for i, anki_note in enumerate(edited_notes):
+            anki_note.key = identity_key("vocabulary", str(i))
+            anki_note.front = anki_note.front.replace("noun", "verb")
+
+        # act
+        with fake_anki_connection.record() as recording:
+            new_notes = importer_exporter.update_anki_notes(
+                edited_notes,
+                reference_fields=["front"],
+                changing_fields=["front"],
+                match_strategy=MatchStrategy.KEY,
+            )
+
+        # assert
+        stored = list(fake_anki.collection.notes.values())
+        assert new_notes == []
+        assert len(stored) == 10
+        assert all(note["fields"]["front"].endswith("(verb)") for note in stored)
+        assert {note.identity_tag for note in edited_notes} == {
+            tag for note in stored for tag in note["tags"]
+        }
+        assert recording.calls("findNotes") == 1
+        assert recording.calls("notesInfo") == 1
+
+    def test_tags_are_added_and_synced_in_bulk(self, fake_anki, fake_anki_connection):
+        # arrange
+        importer_exporter = AnkiImporterExporter(fake_anki_connection)
+        anki_notes = self._create_vocabulary_notes(300)
+        for i, anki_note in enumerate(anki_notes):
+            anki_note.key = identity_key("vocabulary", str(i))
+            anki_note.tags = ["en", "fr", "stale"]
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=anki_notes,
+            deck_name="vocabulary",
+            match_strategy=MatchStrategy.KEY,
+        )
+        retagged_notes = self._create_vocabulary_notes(300)
+        for i, anki_note in enumerate(retagged_notes):
+            anki_note.key = identity_key("vocabulary", str(i))
+            anki_note.tags = ["EN", "fr", "noun" if i % 2 else "verb"]
+
+        # act
+        with fake_anki_connection.record() as recording:
+            importer_exporter.update_anki_notes(
+                retagged_notes,
+                reference_fields=["front"],
+                changing_fields=["back", "tags"],
+                match_strategy=MatchStrategy.KEY,
+            )
+
+        # assert
+        stored = fake_anki.collection.notes[anki_notes[1].id]
+        assert stored["tags"] == [
+            "en",
+            "fr",
+            anki_notes[1].identity_tag,
+            "noun",
+        ]
+        assert recording.batched("addTags") == 2
+        assert recording.batched("removeTags") == 1
+        assert recording.batched("updateNoteFields") == 0
+        assert recording.calls("multi") == 1
+
+    def test_import_note_type_with_extra_fields(self, tmp_path):
+        # arrange
+        collection = FakeAnkiCollection(models={"vocab": ["Front", "Back", "Example"]})
+        input_file = tmp_path / "vocabulary.csv"
+        input_file.write_text(
+            "cat (noun),chat,The cat sleeps.\ndog (noun),chien,The dog barks.\n",
+            encoding="utf-8",
+        )
+        changed_file = tmp_path / "changed.csv"
+        changed_file.write_text(
+            "cat (noun),chat,The cat sleeps.\ndog (noun),chien,The dog runs.\n",
+            encoding="utf-8",
+        )
+
+        with FakeAnkiConnectServer(collection) as server, AnkiConnection(
+            url=server.url, api_version=6
+        ) as connection:
+            importer_exporter = AnkiImporterExporter(connection)
+            importer_exporter.import_and_update_notes(
+                input_file=str(input_file),
+                anki_notes=None,
+                deck_name="vocabulary",
+                model_name="vocab",
+                reference_fields=["front"],
+            )
+
+            # act
+            with connection.record() as recording:
+                importer_exporter.import_and_update_notes(
+                    input_file=str(changed_file),
+                    anki_notes=None,
+                    deck_name="vocabulary",
+                    model_name="vocab",
+                    reference_fields=["front"],
+                    changing_fields=["example"],
+                    match_strategy=MatchStrategy.DECK,
+                )
+
+        # assert
+        stored = {
+            note["fields"]["Front"]: note["fields"]
+            for note in collection.notes.values()
+        }
+        assert stored["cat (noun)"] == {
+            "Front": "cat (noun)",
+            "Back": "chat",
+            "Example": "The cat sleeps.",
+        }
+        assert stored["dog (noun)"]["Example"] == "The dog runs."
+        assert recording.calls("modelFieldNames") == 0
+        assert recording.batched("updateNoteFields") == 1
+
+    def test_import_note_type_without_front_and_back(self, tmp_path):
+        # arrange
+        collection = FakeAnkiCollection(
+            models={"words": ["Word", "Meaning", "Example"]}
+        )
+        input_file = tmp_path / "words.csv"
+        input_file.write_text(
+            "chat,cat,Le chat dort.\nchien,dog,Le chien aboie.\n", encoding="utf-8"
+        )
+        changed_file = tmp_path / "changed.csv"
+        changed_file.write_text(
+            "chat,cat,Le chat dort.\nchien,dog,Le chien court.\noiseau,bird,\n",
+            encoding="utf-8",
+        )
+
+        with FakeAnkiConnectServer(collection) as server, AnkiConnection(
+            url=server.url, api_version=6
+        ) as connection:
+            importer_exporter = AnkiImporterExporter(connection)
+            importer_exporter.import_and_update_notes(
+                input_file=str(input_file),
+                anki_notes=None,
+                deck_name="words",
+                model_name="words",
+                reference_fields=["word"],
+            )
+
+            # act
+            importer_exporter.import_and_update_notes(
+                input_file=str(changed_file),
+                anki_notes=None,
+                deck_name="words",
+                model_name="words",
+                reference_fields=["word"],
+                changing_fields=["example"],
+                match_strategy=MatchStrategy.DECK,
+            )
+            with pytest.raises(Exception, match="has no field front, back"):
+                importer_exporter.import_and_update_notes(
+                    input_file=str(changed_file),
+                    anki_notes=None,
+                    deck_name="words",
+                    model_name="words",
+                    match_strategy=MatchStrategy.DECK,
+                )
+
+        # assert
+        stored = {
+            note["fields"]["Word"]: note["fields"] for note in collection.notes.values()
+        }
+        assert len(stored) == 3
+        assert stored["chien"] == {
+            "Word": "chien",
+            "Meaning": "dog",
+            "Example": "Le chien court.",
+        }
+        assert stored["oiseau"]["Meaning"] == "bird"
+
+    def _sync_with_manifest(
+        self, importer_exporter, anki_notes, manifest_path, verify_manifest=False
+    ):
+        importer_exporter.import_and_update_notes(
+            input_file="",
+            anki_notes=anki_notes,
+            deck_name="vocabulary",
+            reference_fields=["front"],
+            changing_fields=["back"],
+            match_strategy=MatchStrategy.DECK,
+            manifest_path=manifest_path,
+            verify_manifest=verify_manifest,
+        )
+
+    def _create_vocabulary_notes(self, n_notes, deck_name="vocabulary"):
+        return [
+            AnkiNote(
+                deckName=deck_name,
+                modelName="basic",
+                front=f"word{i} (noun)",
+                back=f"mot{i}",
+            )
+            for i in range(n_notes)
+        ]
+
     def _create_anki_notes(self):
         return [
             AnkiNote(
@@ -2,8 +2,23 @@ from pathlib import Path
 
 import pytest
 
+from manki.anki.connection import AnkiConnection
+from manki.anki.fake import FakeAnkiConnectServer
+
 
 @pytest.fixture
 def samples_path():
     current_dir = Path(__file__).resolve().parent
     return current_dir / "samples"
+
+
+@pytest.fixture
+def fake_anki():
+    with FakeAnkiConnectServer() as server:
+        yield server
+
+
+@pytest.fixture
+def fake_anki_connection(fake_anki):
+    with AnkiConnection(url=fake_anki.url, api_version=6) as connection:
+        yield connection
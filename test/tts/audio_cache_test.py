@@ -0,0 +1,85 @@
+import itertools
+
+from manki.tts.cache import AudioCache, audio_key
+
+
+def _put(cache, tmp_path, key, size):
+    source = tmp_path / f"{key}.source"
+    source.write_bytes(b"x" * size)
+    return cache.put(key, source)
+
+
+class TestAudioCache:
+    def test_keys_depend_on_every_voice_setting(self):
+        # arrange
+        settings = [
+            ("chat", "fr", False, "gtts", "mp3"),
+            ("chat", "en", False, "gtts", "mp3"),
+            ("chat", "fr", True, "gtts", "mp3"),
+            ("chat", "fr", False, "espeak-ng", "mp3"),
+            ("chat", "fr", False, "espeak-ng", "wav"),
+        ]
+
+        # act
+        keys = {audio_key(*setting) for setting in settings}
+
+        # assert
+        assert len(keys) == len(settings)
+
+    def test_least_recently_used_clips_are_evicted(self, tmp_path):
+        # arrange
+        clock = itertools.count()
+        cache = AudioCache(
+            str(tmp_path / "cache"), max_bytes=300, clock=lambda: next(clock)
+        )
+        for key in ("aaaa1", "bbbb2", "cccc3"):
+            _put(cache, tmp_path, key, 100)
+
+        # act
+        cache.get("aaaa1")
+        _put(cache, tmp_path, "dddd4", 100)
+
+        # assert
+        assert sorted(cache._entries) == ["aaaa1", "cccc3", "dddd4"]
+        assert not cache.path("bbbb2").exists()
+        assert cache.path("aaaa1") == tmp_path / "cache" / "aa" / "aa" / "aaaa1"
+        assert cache.total_bytes == 300
+
+    def test_index_survives_reopening(self, tmp_path):
+        # arrange
+        root = str(tmp_path / "cache")
+        with AudioCache(root, max_entries=10) as cache:
+            _put(cache, tmp_path, "aaaa1", 10)
+            _put(cache, tmp_path, "bbbb2", 10)
+        destination = tmp_path / "media.mp3"
+
+        # act
+        reopened = AudioCache(root)
+        reopened.path("bbbb2").unlink()
+        reopened.link("aaaa1", str(destination))
+
+        # assert
+        assert reopened.get("aaaa1") is not None
+        assert reopened.get("bbbb2") is None
+        assert (reopened.hits, reopened.misses, len(reopened)) == (1, 1, 1)
+        assert destination.read_bytes() == b"x" * 10
+
+    def test_reopened_cache_keeps_sizes_and_recency(self, tmp_path):
+        # arrange
+        clock = itertools.count()
+        root = str(tmp_path / "cache")
+        with AudioCache(root, clock=lambda: next(clock)) as cache:
+            for key in ("aaaa1", "bbbb2", "cccc3"):
+                _put(cache, tmp_path, key, 100)
+            cache.get("aaaa1")
+            _put(cache, tmp_path, "cccc3", 50)
+
+        # act
+        reopened = AudioCache(root, max_bytes=250, clock=lambda: next(clock))
+        total_before = reopened.total_bytes
+        _put(reopened, tmp_path, "dddd4", 100)
+
+        # assert
+        assert total_before == 250
+        assert list(reopened._entries) == ["aaaa1", "cccc3", "dddd4"]
+        assert reopened.total_bytes == 250
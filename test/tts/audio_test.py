@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+
+import pytest
+
+from manki.tts.audio import AudioGenerator, RateLimiter
+from manki.tts.backends import TTSBackend
+from manki.tts.cache import AudioCache
+
+
+class FakeBackend(TTSBackend):
+    name = "fake"
+    extension = "mp3"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.texts = []
+
+    def synthesize(self, text, lang, slow, filename):
+        time.sleep(random.uniform(0, 0.01))
+        if text == "boom":
+            raise RuntimeError("TTS request failed")
+        with self.lock:
+            self.texts.append(text)
+        with open(filename, "w", encoding="utf-8") as file:
+            file.write(text)
+
+
+@pytest.fixture
+def fake_backend():
+    return FakeBackend()
+
+
+class TestAudioGenerator:
+    def test_generates_concurrently_in_input_order(self, fake_backend, tmp_path):
+        # arrange
+        input_file = tmp_path / "deck.txt"
+        output_file = tmp_path / "out" / "deck.txt"
+        words = [f"mot{i}" for i in range(20)]
+        lines = [f"word{i}\t{word}\n" for i, word in enumerate(words)]
+        lines.insert(5, "broken\tboom\n")
+        lines.insert(9, "again\tmot3\n")
+        input_file.write_text("#separator:tab\n" + "".join(lines), encoding="utf-8")
+        generator = AudioGenerator(
+            lang="fr",
+            anki_media_folder=str(tmp_path),
+            max_workers=4,
+            backend=fake_backend,
+        )
+
+        # act
+        generator.generate_audio_files_from_text(str(input_file), str(output_file))
+
+        # assert
+        output_lines = output_file.read_text(encoding="utf-8").splitlines()
+        assert output_lines[5] == "broken\tboom"
+        assert output_lines[9] == "again\tmot3\t[sound:mot3.mp3]"
+        assert [line for line in output_lines if "boom" not in line][:3] == [
+            "word0\tmot0\t[sound:mot0.mp3]",
+            "word1\tmot1\t[sound:mot1.mp3]",
+            "word2\tmot2\t[sound:mot2.mp3]",
+        ]
+        assert sorted(fake_backend.texts) == sorted(words)
+        assert (tmp_path / "mot19.mp3").read_text(encoding="utf-8") == "mot19"
+
+    def test_cached_clips_are_not_synthesized_again(self, fake_backend, tmp_path):
+        # arrange
+        cache = AudioCache(str(tmp_path / "cache"))
+        media_folders = [tmp_path / "fr", tmp_path / "en", tmp_path / "fr-again"]
+        for media_folder in media_folders:
+            media_folder.mkdir()
+        texts = ["chat", "chien", "boom"]
+
+        # act
+        results = [
+            AudioGenerator(
+                lang=lang,
+                anki_media_folder=str(media_folder),
+                cache=cache,
+                backend=fake_backend,
+            ).generate_audio_files(texts)
+            for lang, media_folder in zip(["fr", "en", "fr"], media_folders)
+        ]
+
+        # assert
+        assert fake_backend.texts.count("chat") == 2
+        assert results[0] == results[2]
+        assert results[0][0] != results[1][0]
+        assert results[0][2] is None
+        assert (media_folders[2] / results[2][1]).read_text(encoding="utf-8") == "chien"
+        assert cache.hits == 2
+        assert not list((tmp_path / "cache").rglob("*.tmp"))
+
+    def test_cached_clips_keep_the_format_they_were_written_in(
+        self, fake_backend, tmp_path
+    ):
+        # arrange
+        cache = AudioCache(str(tmp_path / "cache"))
+        media_folder = tmp_path / "media"
+        media_folder.mkdir()
+        fake_backend.extension = "wav"
+        wav_generator = AudioGenerator(
+            anki_media_folder=str(media_folder), cache=cache, backend=fake_backend
+        )
+        [wav_filename] = wav_generator.generate_audio_files(["chat"])
+
+        # act
+        # The same backend now writes mp3, as a local engine does once ffmpeg is installed.
+        fake_backend.extension = "mp3"
+        mp3_generator = AudioGenerator(
+            anki_media_folder=str(media_folder), cache=cache, backend=fake_backend
+        )
+        [mp3_filename] = mp3_generator.generate_audio_files(["chat"])
+
+        # assert
+        assert wav_filename.endswith(".wav") and mp3_filename.endswith(".mp3")
+        assert fake_backend.texts == ["chat", "chat"]
+        assert (cache.hits, len(cache)) == (0, 2)
+
+    def test_rate_limiter_caps_requests_across_threads(self):
+        # arrange
+        rate_limiter = RateLimiter(requests_per_second=50)
+        threads = [threading.Thread(target=rate_limiter.wait) for _ in range(10)]
+
+        # act
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+
+        # assert
+        assert elapsed >= 9 / 50
+
+    def test_clips_evicted_before_linking_are_synthesized_again(
+        self, fake_backend, tmp_path
+    ):
+        # arrange
+        cache = AudioCache(str(tmp_path / "cache"))
+        generator = AudioGenerator(
+            anki_media_folder=str(tmp_path), cache=cache, backend=fake_backend
+        )
+        generator.generate_audio_files(["chat"])
+        get = cache.get
+
+        def get_then_evict(key):
+            path = get(key)
+            # Another thread's put evicts the clip before this one links it.
+            cache.path(key).unlink()
+            return path
+
+        cache.get = get_then_evict
+        (tmp_path / generator.audio_filename("chat")).unlink()
+
+        # act
+        [filename] = generator.generate_audio_files(["chat"])
+
+        # assert
+        assert filename == generator.audio_filename("chat")
+        assert (tmp_path / filename).read_text(encoding="utf-8") == "chat"
+        assert fake_backend.texts == ["chat", "chat"]
+        assert get(generator._audio_key("chat")) is not None
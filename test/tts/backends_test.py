@@ -0,0 +1,97 @@
+import sys
+import wave
+
+import pytest
+
+from manki.tts.audio import AudioGenerator
+from manki.tts.backends import (
+    CommandBackend,
+    EspeakBackend,
+    StubBackend,
+    TTSBackend,
+    create_backend,
+)
+
+FAKE_ESPEAK = """#!{python}
+import sys
+
+args = sys.argv[1:]
+text = sys.stdin.read()
+if text == "boom":
+    sys.exit("espeak-ng: cannot speak")
+with open(args[args.index("-w") + 1], "w", encoding="utf-8") as file:
+    file.write(args[args.index("-v") + 1] + ":" + text)
+"""
+
+
+@pytest.fixture
+def fake_espeak(tmp_path, monkeypatch):
+    bin_folder = tmp_path / "bin"
+    bin_folder.mkdir()
+    executable = bin_folder / "espeak-ng"
+    executable.write_text(FAKE_ESPEAK.format(python=sys.executable), encoding="utf-8")
+    executable.chmod(0o755)
+    # Only the fake engine is found, so the backend writes wav files without ffmpeg.
+    monkeypatch.setenv("PATH", str(bin_folder))
+    return executable
+
+
+class TestBackends:
+    def test_stub_backend_is_deterministic(self, tmp_path):
+        # arrange
+        backend = StubBackend()
+        filenames = [tmp_path / f"clip{i}.wav" for i in range(3)]
+
+        # act
+        backend.synthesize("bonjour", "fr", False, str(filenames[0]))
+        backend.synthesize("bonjour", "fr", False, str(filenames[1]))
+        backend.synthesize("bonjour", "fr", True, str(filenames[2]))
+
+        # assert
+        assert filenames[0].read_bytes() == filenames[1].read_bytes()
+        with wave.open(str(filenames[0])) as clip, wave.open(str(filenames[2])) as slow:
+            assert clip.getnframes() == 560
+            assert slow.getnframes() == 2 * clip.getnframes()
+
+    def test_espeak_backend_runs_the_local_engine(self, fake_espeak, tmp_path):
+        # arrange
+        media_folder = tmp_path / "media"
+        media_folder.mkdir()
+        generator = AudioGenerator(
+            lang="fr",
+            anki_media_folder=str(media_folder),
+            backend=create_backend("local"),
+        )
+
+        # act
+        filenames = generator.generate_audio_files(["chat", "boom"])
+
+        # assert
+        assert isinstance(generator.backend, EspeakBackend)
+        assert filenames == ["chat.wav", None]
+        assert (media_folder / "chat.wav").read_text(encoding="utf-8") == "fr:chat"
+
+    def test_missing_engines_are_reported(self, tmp_path, monkeypatch):
+        # arrange
+        monkeypatch.setenv("PATH", str(tmp_path))
+
+        # act / assert
+        with pytest.raises(Exception, match="No local TTS engine found"):
+            create_backend("local")
+        with pytest.raises(Exception, match="Unknown TTS backend"):
+            create_backend("festival")
+
+    def test_incomplete_backends_cannot_be_created(self):
+        # arrange
+        class SilentBackend(TTSBackend):
+            name = "silent"
+
+        class EchoBackend(CommandBackend):
+            name = "echo"
+            executable = "echo"
+
+        # act / assert
+        with pytest.raises(TypeError, match="synthesize"):
+            SilentBackend()
+        with pytest.raises(TypeError, match="command"):
+            EchoBackend()
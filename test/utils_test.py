@@ -0,0 +1,47 @@
+import gc
+import threading
+
+from manki.utils import paused_gc
+
+
+class TestPausedGc:
+    def test_overlapping_pauses_on_threads(self):
+        # arrange
+        entered, outer_exited = threading.Event(), threading.Event()
+        states = []
+
+        def inner():
+            with paused_gc():
+                entered.set()
+                outer_exited.wait()
+                states.append(gc.isenabled())
+
+        # act
+        thread = threading.Thread(target=inner)
+        with paused_gc():
+            thread.start()
+            entered.wait()
+        outer_exited.set()
+        thread.join()
+        states.append(gc.isenabled())
+
+        # assert
+        assert states == [False, True]
+
+    def test_pause_keeps_a_disabled_collector_disabled(self):
+        # arrange
+        gc.disable()
+
+        # act
+        try:
+            try:
+                with paused_gc():
+                    raise ValueError("broken batch")
+            except ValueError:
+                pass
+            state = gc.isenabled()
+        finally:
+            gc.enable()
+
+        # assert
+        assert state is False